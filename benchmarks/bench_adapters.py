@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Phone connect -> first Treadmill Data at the phone, one adapter vs two.
+
+Runs the Pi-mode connection logic (watch_ftms_connections on a
+bluez_monitor.FakeBluezBus, ifit_client_loop over the simulated transport)
+from the moment a phone connects until its first Treadmill Data
+notification arrives:
+
+  shared  one adapter: the phone is kicked, advertising stops (silence
+          phase), the treadmill connects and unlocks, the link settles,
+          advertising resumes and the phone reconnects
+  split   iFit on hci1, FTMS on hci0: the phone stays connected throughout
+
+hciconfig / hcitool calls go to a recording stand-in that takes --hci-ms
+each; --phone-retry is how long the app waits after being kicked before it
+reconnects to the (again advertising) bridge.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import common  # noqa: F401  (puts src/ on sys.path)
+
+import main
+import transport
+from bluez_monitor import BluezMonitor, FakeBluezBus
+from centrals import CentralRegistry
+from hci_exec import CommandResult
+from transport import LinkProfile, SimFtmsCentral, SimIfitPeripheral, SimRadio
+
+PHONE = "00:00:5E:00:53:20"
+
+
+class FakeHci:
+    """Stands in for hci_exec.hci; tracks advertising from hciconfig calls."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = []
+        self.advertising = asyncio.Event()
+        self.advertising.set()
+
+    async def run(self, *argv, **kwargs):
+        self.calls.append(argv)
+        if "noleadv" in argv:
+            self.advertising.clear()
+        await asyncio.sleep(self.delay)
+        if "leadv" in argv and "noleadv" not in argv:
+            self.advertising.set()
+        return CommandResult(argv, 0, "Connections:\n")
+
+    def fire(self, *argv, **kwargs):
+        return asyncio.create_task(self.run(*argv, **kwargs))
+
+
+class Phone:
+    """A central that BlueZ (the fake bus) and the sim server both see."""
+
+    def __init__(self, hci, retry):
+        self.hci = hci
+        self.retry = retry
+        self.bus = PhoneBus(self)
+        self.central = SimFtmsCentral(address=PHONE)
+        self.path = None
+        self.first_data = asyncio.get_running_loop().create_future()
+        self.kicks = 0
+        self.central.callbacks.append(self._on_data)
+
+    def _on_data(self, uuid, data, t):
+        if uuid == main.FTMS_DATA_CHAR_UUID.lower() and not self.first_data.done():
+            self.first_data.set_result(t)
+
+    async def connect(self):
+        await self.central.connect()
+        if self.path is None:
+            self.path = self.bus.add_device(PHONE, "Phone", connected=True)
+        else:
+            self.bus.set_connected(self.path, True)
+
+    async def kicked(self):
+        self.kicks += 1
+        await self.central.disconnect()
+        await self.hci.advertising.wait() # Nothing to connect to while silent
+        await asyncio.sleep(self.retry)
+        await self.connect()
+
+
+class PhoneBus(FakeBluezBus):
+    def __init__(self, phone):
+        super().__init__()
+        self.phone = phone
+
+    async def call(self, msg):
+        reply = await super().call(msg)
+        if msg.member == "Disconnect" and msg.path == self.phone.path:
+            asyncio.create_task(self.phone.kicked())
+        return reply
+
+
+async def run(split, hci_delay, retry, latency):
+    radio = SimRadio(LinkProfile(latency=latency / 1000.0))
+    radio.add_peripheral(SimIfitPeripheral(main.IFIT_DEVICE_NAME))
+    ble = transport.sim_transport(radio)
+    main.PI_MODE = True
+    main.IFIT_ADAPTER, main.FTMS_ADAPTER = ("hci1", "hci0") if split else ("hci0", "hci0")
+    main.hci = hci = FakeHci(hci_delay)
+    main.state = main.BridgeState()
+    main.notifier = main.FtmsNotifier()
+    main.scheduler = main.ControlScheduler() # Fresh asyncio.Event per asyncio.run
+    main.centrals = CentralRegistry()
+    main.device_cache.path = None
+    main.device_cache.entries = {}
+    main.ui.update_status = lambda state: None
+
+    server = ble.server("bench")
+    await server.add_new_characteristic(main.FTMS_SERVICE_UUID, main.FTMS_DATA_CHAR_UUID, None, None, None)
+    await server.start()
+    phone = Phone(hci, retry)
+    bluez = BluezMonitor(phone.bus, is_ignored=main.is_ifit_device, adapter=main.FTMS_ADAPTER)
+    await bluez.start()
+    main.watch_ftms_connections(bluez)
+    tasks = [asyncio.create_task(main.notifier.run(server)),
+             asyncio.create_task(main.ifit_client_loop(server, ble))]
+
+    start = time.perf_counter()
+    await phone.connect()
+    arrived = await asyncio.wait_for(phone.first_data, 60.0)
+    for task in tasks:
+        task.cancel()
+    return {
+        "seconds": arrived - start,
+        "kicks": phone.kicks,
+        "hci_calls": len(hci.calls),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--hci-ms", type=float, default=30.0, help="Time per hciconfig/hcitool call (ms)")
+    parser.add_argument("--phone-retry", type=float, default=2.0, help="App reconnect delay after a kick (s)")
+    parser.add_argument("--latency", type=float, default=10.0, help="Simulated one-way link latency (ms)")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel("ERROR") # Link-lost warnings from cancelled sessions
+    results = {}
+    for mode in ("shared", "split"):
+        runs = [asyncio.run(run(mode == "split", args.hci_ms / 1000.0, args.phone_retry, args.latency))
+                for _ in range(args.runs)]
+        times = [r["seconds"] for r in runs]
+        results[mode] = {
+            "mean_s": round(statistics.mean(times), 2),
+            "min_s": round(min(times), 2),
+            "max_s": round(max(times), 2),
+            "kicks": runs[0]["kicks"],
+            "hci_calls": runs[0]["hci_calls"],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode, r in results.items():
+            print(f"{mode:>6}: phone connect -> first data {r['mean_s']}s "
+                  f"(min {r['min_s']}s, max {r['max_s']}s) | kicks={r['kicks']} hci calls={r['hci_calls']}")
+        print(f"({args.runs} runs, hci {args.hci_ms:g}ms/call, phone retry {args.phone_retry:g}s, "
+              f"link {args.latency:g}ms)")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Replay a burst of incline writes (an app sweeping a hill) and measure how
+long it takes for the final target to reach the treadmill.
+
+Compares the latest-wins ControlScheduler against a FIFO queue with the
+same send path, which is how control_queue behaved before coalescing.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+from common import FakeIfitClient
+
+import main
+
+
+class FifoScheduler(main.ControlScheduler):
+    """Old behaviour: every write is queued and sent in order."""
+
+    def __init__(self):
+        super().__init__()
+        self.fifo = deque()
+
+    def submit(self, cmd_type, value):
+        self.submitted += 1
+        self.fifo.append((cmd_type, value, time.perf_counter()))
+        self.wakeup.set()
+
+    def has_commands(self):
+        return bool(self.fifo)
+
+    def pop_command(self):
+        return self.fifo.popleft()
+
+
+async def run_burst(sched, writes, interval, write_latency):
+    main.scheduler = sched
+    main.state.pacer = main.ChunkPacer()
+    main.state.last_notify_time = time.time()
+    client = FakeIfitClient(main.state, write_latency)
+    session = asyncio.create_task(main.ifit_session_loop(client, None))
+
+    final_val = writes[-1]
+    final_chunk = bytes(main.create_control_command(main.TYPE_INCLINE, final_val))
+    for val in writes:
+        sched.submit(main.TYPE_INCLINE, val)
+        await asyncio.sleep(interval)
+    last_submit = time.perf_counter() - interval
+
+    while not any(final_chunk in pkt for _, pkt in client.writes):
+        await asyncio.sleep(0.005)
+    done = next(ts for ts, pkt in client.writes if final_chunk in pkt)
+
+    client.is_connected = False
+    await session
+    commands_sent = sum(1 for _, pkt in client.writes if pkt[:2] == bytes([0xFF, len(final_chunk)])
+                        and pkt[2:11] == final_chunk[:9])
+    return {
+        "time_to_final_target_s": round(done - last_submit, 4),
+        "commands_sent": commands_sent,
+        "coalesced": sched.coalesced,
+    }
+
+
+async def main_async(args):
+    # Sweep 0% -> 10% in equal steps (iFit units: 0.01 %)
+    writes = [int(i * 1000 / (args.writes - 1)) for i in range(args.writes)]
+    results = {}
+    for name, factory in (("fifo", FifoScheduler), ("latest_wins", main.ControlScheduler)):
+        results[name] = await run_burst(factory(), writes, args.interval, args.write_latency)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=50, help="Incline writes in the burst")
+    parser.add_argument("--interval", type=float, default=0.02, help="Seconds between FTMS writes")
+    parser.add_argument("--write-latency", type=float, default=0.015, help="Simulated BLE write time")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in results.items():
+            print(f"{name:12s} final target after {r['time_to_final_target_s']*1000:8.1f} ms "
+                  f"| commands sent {r['commands_sent']:3d} | coalesced {r['coalesced']}")
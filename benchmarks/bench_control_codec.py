@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Control command encoding: build per write vs precomputed packet table.
+
+  legacy  create_control_command as main.py had it (bytearray.fromhex,
+          struct.pack, checksum over a slice) + frame_message
+  encode  the profile encoder (pre-summed head) + frame_message
+  table   ControlCodec lookup: the framed packets, ready to write
+
+Also checks that every table entry, and values off the table, match the
+legacy encoder byte for byte (exit status 1 if not), including values the
+legacy encoder rejects (negative incline into its unsigned field), and
+reports what the table (FTMS 0.1 steps only) costs in memory and build
+time against a cache filled on demand.
+"""
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+import tracemalloc
+
+import common  # noqa: F401  (puts src/ on sys.path)
+
+from ifit_protocol import frame_message
+from profiles import ControlCodec, profiles
+
+TYPE_SPEED = 0x01
+TYPE_INCLINE = 0x02
+
+
+def legacy_create_control_command(type_id, value):
+    """create_control_command as main.py had it before profiles."""
+    if type_id == TYPE_SPEED:
+         base = bytearray.fromhex("020402090409020101")
+         base.extend(struct.pack('<H', int(value)))
+         base.extend(bytes([0x00]))
+         cs = sum(base[4:]) & 0xFF
+         base.append(cs)
+         return base
+    elif type_id == TYPE_INCLINE:
+         base = bytearray.fromhex("020402090409020102")
+         base.extend(struct.pack('<H', int(value))) # Scale 100
+         base.extend(bytes([0x00]))
+         cs = sum(base[4:]) & 0xFF
+         base.append(cs)
+         return base
+    return b''
+
+
+def outcome(fn, *args):
+    try:
+        return fn(*args)
+    except struct.error:
+        return "struct.error"
+
+
+def check_equal(profile):
+    # Table range plus a margin on each side (the on-the-spot path)
+    checked = mismatches = 0
+    for type_id, table in profile.codec.tables.items():
+        values = table.keys() or [0]
+        for value in range(min(values) - 700, max(values) + 50):
+            legacy = outcome(lambda t, v: frame_message(legacy_create_control_command(t, v)), type_id, value)
+            codec = outcome(profile.codec.packets, type_id, value)
+            checked += 1
+            if legacy != codec:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"MISMATCH type={type_id} value={value}: {legacy!r} != {codec!r}", file=sys.stderr)
+    return checked, mismatches
+
+
+def bench(fn, targets, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for type_id, value in targets:
+            fn(type_id, value)
+    return round((time.perf_counter() - start) / (rounds * len(targets)) * 1e9)
+
+
+def traced(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def session_targets(n, seed=1):
+    # An interval workout: speeds in 0.1 km/h steps, incline in 0.5 % steps
+    rng = random.Random(seed)
+    return [(TYPE_SPEED, rng.randrange(500, 1600, 10)) if rng.random() < 0.6
+            else (TYPE_INCLINE, rng.randrange(0, 1000, 50)) for _ in range(n)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commands", type=int, default=2000, help="Control writes per round")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    profile = profiles.default
+    checked, mismatches = check_equal(profile)
+
+    targets = session_targets(args.commands)
+    ranges = {t: list(table) for t, table in profile.codec.tables.items()}
+    codec, table_bytes = traced(lambda: ControlCodec(profile.encode_control, ranges))
+    start = time.perf_counter()
+    ControlCodec(profile.encode_control, ranges) # Timed without tracemalloc overhead
+    build_s = time.perf_counter() - start
+    def on_demand():
+        cache = {}
+        for key in targets:
+            if key not in cache:
+                cache[key] = frame_message(profile.encode_control(*key))
+        return cache
+    cache, cache_bytes = traced(on_demand)
+
+    results = {
+        "byte_equal": {"checked": checked, "mismatches": mismatches},
+        "ns_per_command": {
+            "legacy": bench(lambda t, v: frame_message(legacy_create_control_command(t, v)), targets, args.rounds),
+            "encode": bench(lambda t, v: frame_message(profile.encode_control(t, v)), targets, args.rounds),
+            "table": bench(codec.packets, targets, args.rounds),
+        },
+        "table": {"entries": len(codec), "kib": round(table_bytes / 1024, 1),
+                  "bytes_per_entry": round(table_bytes / len(codec)), "build_ms": round(build_s * 1000, 1)},
+        "on_demand_cache": {"entries": len(cache), "kib": round(cache_bytes / 1024, 1)},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        eq, ns, t, c = results["byte_equal"], results["ns_per_command"], results["table"], results["on_demand_cache"]
+        print(f"byte-for-byte vs legacy: {eq['checked'] - eq['mismatches']}/{eq['checked']} equal")
+        print(f"legacy (fromhex + pack + checksum + frame) {ns['legacy']:6d} ns/command")
+        print(f"profile encoder + frame                    {ns['encode']:6d} ns/command")
+        print(f"precomputed table lookup                   {ns['table']:6d} ns/command")
+        print(f"table: {t['entries']} entries, {t['kib']} KiB ({t['bytes_per_entry']} B/entry), "
+              f"built in {t['build_ms']} ms at profile load")
+        print(f"on-demand cache for this session: {c['entries']} entries, {c['kib']} KiB")
+    sys.exit(1 if mismatches else 0)
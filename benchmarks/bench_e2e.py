@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of the whole bridge over the simulated BLE transport.
+
+Runs main.ftms_server_loop (and with it ifit_client_loop, the FTMS notifier
+and the poll loop) against transport.SimIfitPeripheral and SimFtmsCentral,
+then measures:
+
+  control    FTMS Control Point write -> iFit command bytes at the treadmill
+  telemetry  last chunk of a 0x2F status delivered -> FTMS notification sent
+  reconnect  forced link drop -> first status after the bridge reconnects
+
+Each is reported as p50/p95/p99 in ms; --json prints machine-readable output
+for regression tracking. --discovery-ms adds BlueZ's service resolution to
+every connect that can't reuse a cached service tree; with --no-gatt-cache
+the bridge never keeps a GATT cache entry, so reconnect shows what the
+cache saves.
+"""
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+from common import percentiles
+
+import main
+import transport
+from transport import LinkProfile, SimBlessServer, SimFtmsCentral, SimIfitPeripheral, SimRadio
+
+STATUS_TOTAL_LEN = 51
+
+
+class BenchPeripheral(SimIfitPeripheral):
+    def __init__(self, name):
+        super().__init__(name)
+        self.control_arrivals = {}  # speed raw -> perf_counter
+        self.status_times = []
+        self.status_event = asyncio.Event()
+        self.rx_len = 0
+
+    def handle_message(self, msg):
+        if msg[6] == 0x02 and msg[3] == 0x09 and msg[8] == 0x01:
+            self.control_arrivals.setdefault(msg[9] | (msg[10] << 8), time.perf_counter())
+        super().handle_message(msg)
+
+    def _deliver(self, packets):
+        super()._deliver(packets)
+        pkt = packets[-1]
+        if pkt[0] == 0xFE:
+            self.rx_len = pkt[2]
+        elif pkt[0] == 0xFF and self.rx_len == STATUS_TOTAL_LEN and self.callback:
+            self.status_times.append(time.perf_counter())
+            self.status_event.set()
+
+
+class BenchServer(SimBlessServer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_times = []
+
+    def update_value(self, service_uuid, char_uuid):
+        if char_uuid == main.FTMS_DATA_CHAR_UUID:
+            self.data_times.append(time.perf_counter())
+        return super().update_value(service_uuid, char_uuid)
+
+    def update_value_to(self, addresses, service_uuid, char_uuid):
+        if char_uuid == main.FTMS_DATA_CHAR_UUID:
+            self.data_times.append(time.perf_counter())
+        return super().update_value_to(addresses, service_uuid, char_uuid)
+
+
+async def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("bench condition not reached")
+        await asyncio.sleep(0.005)
+
+
+async def run(args):
+    radio = SimRadio(LinkProfile(
+        latency=args.latency / 1000.0, jitter=args.jitter / 1000.0, loss=args.loss, seed=1))
+    radio.discovery_time = args.discovery_ms / 1000.0
+    if args.no_gatt_cache:
+        async def no_gatt_cache(*_args):
+            pass
+        main.refresh_gatt_cache = no_gatt_cache
+    ble = transport.sim_transport(radio)
+    ble.server = BenchServer
+    peripheral = radio.add_peripheral(BenchPeripheral(main.IFIT_DEVICE_NAME))
+    main.device_cache.path = None
+    main.device_cache.entries = {}
+    main.ui.update_status = lambda state: None
+
+    bridge = asyncio.create_task(main.ftms_server_loop(ble))
+    central = SimFtmsCentral()
+    await central.connect()
+    server = central.server
+    await central.write(main.FTMS_CONTROL_POINT_UUID, b'\x00')
+    await wait_for(lambda: len(peripheral.status_times) >= 3, timeout=20.0)
+
+    # (a) Control: distinct speeds, spaced so latest-wins never merges them
+    sent = {}
+    for i in range(args.controls):
+        speed = 300 + i
+        sent[speed] = time.perf_counter()
+        await central.write(main.FTMS_CONTROL_POINT_UUID, struct.pack('<BH', 0x02, speed))
+        await asyncio.sleep(args.control_gap)
+    await asyncio.sleep(0.5)
+    control = [peripheral.control_arrivals[s] - t for s, t in sent.items() if s in peripheral.control_arrivals]
+
+    # (b) Telemetry: each notification vs the newest status delivered before it
+    telemetry = []
+    statuses = peripheral.status_times
+    j = 0
+    for t in server.data_times:
+        while j + 1 < len(statuses) and statuses[j + 1] <= t:
+            j += 1
+        if statuses and statuses[j] <= t:
+            telemetry.append(t - statuses[j])
+
+    # (c) Reconnect: drop the iFit link, wait for telemetry on the new one
+    reconnect = []
+    for _ in range(args.reconnects):
+        await asyncio.sleep(0.5)
+        peripheral.status_event.clear()
+        start = time.perf_counter()
+        peripheral.drop()
+        await asyncio.wait_for(peripheral.status_event.wait(), 30.0)
+        reconnect.append(time.perf_counter() - start)
+
+    bridge.cancel()
+    return {
+        "control": control,
+        "telemetry": telemetry,
+        "reconnect": reconnect,
+        "lost_controls": args.controls - len(control),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--controls", type=int, default=40)
+    parser.add_argument("--control-gap", type=float, default=0.3, help="Seconds between control writes")
+    parser.add_argument("--reconnects", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=5.0, help="Simulated one-way link latency (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Simulated jitter (ms)")
+    parser.add_argument("--loss", type=float, default=0.0, help="Simulated packet loss ratio")
+    parser.add_argument("--discovery-ms", type=float, default=0.0, help="Simulated service resolution per connect (ms)")
+    parser.add_argument("--no-gatt-cache", action="store_true", help="Never store a GATT cache entry")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel("WARNING")
+    raw = asyncio.run(run(args))
+    results = {name: {"n": len(raw[name]),
+                      **{k: round(v * 1000, 2) for k, v in percentiles(raw[name]).items()},
+                      "unit": "ms"}
+               for name in ("control", "telemetry", "reconnect")}
+    results["lost_controls"] = raw["lost_controls"]
+    results["link"] = {"latency_ms": args.latency, "jitter_ms": args.jitter, "loss": args.loss,
+                       "discovery_ms": args.discovery_ms, "gatt_cache": not args.no_gatt_cache}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name in ("control", "telemetry", "reconnect"):
+            r = results[name]
+            print(f"{name:>9}: n={r['n']:<4} p50={r['p50']}ms p95={r['p95']}ms p99={r['p99']}ms")
+        print(f"link: {args.latency:g}ms +/- {args.jitter:g}ms, loss {args.loss:g}, "
+              f"discovery {args.discovery_ms:g}ms, GATT cache {'off' if args.no_gatt_cache else 'on'} "
+              f"(lost controls: {raw['lost_controls']})")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+FTMS notification fan-out to N simulated subscribers.
+
+Connects N transport.SimFtmsCentral phones to a SimBlessServer and runs the
+bridge's FtmsNotifier against changing telemetry, in two modes:
+
+  paced      10 Hz telemetry, bridge cap --max-rate, centrals cycling
+             through --rates (negotiated per central): checks each one
+             gets its own rate
+  saturated  no rate limits, telemetry as fast as the loop allows:
+             notifications/s the fan-out sustains
+
+Reports delivered notifications/s per rate class, totals and the cost of
+one fan-out round.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import percentiles
+
+import main
+import transport
+from centrals import CentralRegistry
+from transport import LinkProfile, SimFtmsCentral, SimRadio
+
+
+async def run(n, rates, max_rate, seconds, hz):
+    radio = SimRadio(LinkProfile(latency=0.001))
+    ble = transport.sim_transport(radio)
+    radio.connect_time = 0.0
+    addresses = [f"00:00:5E:00:54:{i:02X}" for i in range(n)]
+    main.centrals = CentralRegistry(max_rate, {a: rates[i % len(rates)] for i, a in enumerate(addresses)})
+    main.state = main.BridgeState()
+    main.state.connected_to_ifit = True
+    main.ftms_encoder = main.TreadmillDataEncoder()
+
+    server = ble.server("bench")
+    await server.add_new_characteristic(main.FTMS_SERVICE_UUID, main.FTMS_DATA_CHAR_UUID, None, None, None)
+    await server.start()
+    server.on_connect = lambda path, address: main.centrals.connect(address, path)
+    subs = [SimFtmsCentral(address=a) for a in addresses]
+    for sub in subs:
+        await sub.connect()
+
+    rounds = []
+    fan_out = main.fan_out_ftms
+    def timed_fan_out(*args):
+        start = time.perf_counter()
+        try:
+            return fan_out(*args)
+        finally:
+            rounds.append(time.perf_counter() - start)
+    main.fan_out_ftms = timed_fan_out
+
+    notifier = main.FtmsNotifier(max_rate=max_rate)
+    task = asyncio.create_task(notifier.run(server))
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        main.state.speed_kph = 5.0 + (i % 50) / 10.0 # A new payload every tick
+        main.state.elapsed_time = int(time.perf_counter() - start)
+        notifier.kick()
+        i += 1
+        await asyncio.sleep(1.0 / hz if hz else 0)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05) # In-flight deliveries
+    task.cancel()
+    main.fan_out_ftms = fan_out
+
+    by_rate = {}
+    for sub in subs:
+        rate = main.centrals.centrals[sub.address].rate
+        by_rate.setdefault(rate, []).append(sub.received / elapsed)
+    return {
+        "subscribers": n,
+        "telemetry_per_s": round(i / elapsed, 1),
+        "notifications_per_s": round(sum(s.received for s in subs) / elapsed, 1),
+        "per_central_hz": {f"{rate:g}" if rate else "max": round(sum(v) / len(v), 2) for rate, v in sorted(by_rate.items())},
+        "round_us": {k: round(v * 1e6, 1) for k, v in percentiles(rounds).items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=str, default="1,4,16,64", help="Comma-separated N values")
+    parser.add_argument("--rates", type=str, default="4,2,1", help="Requested Hz, assigned round-robin")
+    parser.add_argument("--max-rate", type=float, default=4.0, help="Bridge notification cap (Hz)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel("WARNING")
+    counts = [int(n) for n in args.subscribers.split(",")]
+    rates = [float(r) for r in args.rates.split(",")]
+    results = {
+        "paced": [asyncio.run(run(n, rates, args.max_rate, args.seconds, 10)) for n in counts],
+        "saturated": [asyncio.run(run(n, [0], 0, args.seconds, 0)) for n in counts],
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode, rows in results.items():
+            print(f"{mode}:")
+            for r in rows:
+                rates_str = " ".join(f"{k}{'' if k == 'max' else 'Hz'}->{v}" for k, v in r["per_central_hz"].items())
+                print(f"  N={r['subscribers']:<3} {r['notifications_per_s']:>9} notif/s "
+                      f"(telemetry {r['telemetry_per_s']}/s) | per central: {rates_str} | "
+                      f"round p50={r['round_us']['p50']}us p99={r['round_us']['p99']}us")
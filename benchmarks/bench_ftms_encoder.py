@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+CPU cost of update_ftms per call, legacy payload rebuild vs cached encoder.
+
+Replays the mock loop's state changes (5 km/h, 1 %, +1 m and +1 s per
+second) with update_ftms called 7x per simulated second, the rate of 5 Hz
+telemetry plus the 2 Hz ftms_telemetry_loop tick. Also checks that both
+produce identical Treadmill Data bytes.
+"""
+import argparse
+import json
+import struct
+import time
+
+from common import FakeFtmsServer
+
+import main
+from main import state
+
+
+def legacy_update_ftms(server):
+    """update_ftms as it was before TreadmillDataEncoder (logging removed)."""
+    if not server or not state.connected_to_ifit: return
+    flags = 0x048C
+    speed_val = int(state.speed_kph * 100)
+    dist_val = int(state.distance_m)
+    inc_val = int(state.incline_pct * 10)
+    payload = bytearray()
+    payload.extend(struct.pack('<H', flags))
+    payload.extend(struct.pack('<H', speed_val))
+    payload.extend(struct.pack('<I', dist_val)[:3])
+    payload.extend(struct.pack('<h', inc_val))
+    payload.extend(struct.pack('<h', 0))
+    payload.extend(struct.pack('<H', min(state.calories, 65535)))
+    payload.extend(struct.pack('<H', 0xFFFF))
+    payload.extend(struct.pack('<B', 0xFF))
+    payload.extend(struct.pack('<H', min(state.elapsed_time, 65535)))
+    now = time.time()
+    if payload == state.last_ftms_payload and (now - state.last_update_ts) < 5.0:
+        return
+    state.last_ftms_payload = payload
+    state.last_update_ts = now
+    server.get_characteristic(main.FTMS_DATA_CHAR_UUID).value = bytes(payload)
+    server.update_value(main.FTMS_SERVICE_UUID, main.FTMS_DATA_CHAR_UUID)
+
+
+def replay(update, seconds, calls_per_second):
+    server = FakeFtmsServer()
+    state.connected_to_ifit = True
+    state.speed_kph, state.incline_pct = 5.0, 1.0
+    state.distance_m = state.elapsed_time = state.calories = 0
+    state.last_ftms_payload = None
+    main.ftms_encoder = main.TreadmillDataEncoder()
+    start = time.process_time()
+    for sec in range(seconds):
+        state.distance_m += 1
+        state.elapsed_time = sec
+        state.calories = sec // 20
+        for _ in range(calls_per_second):
+            update(server)
+    cpu = time.process_time() - start
+    return cpu, server.notifications
+
+
+def run(args):
+    main.logger.setLevel("INFO")  # Keep debug formatting out of both runs
+    calls = args.seconds * args.calls
+    legacy_cpu, legacy_out = replay(legacy_update_ftms, args.seconds, args.calls)
+    cached_cpu, cached_out = replay(main.update_ftms, args.seconds, args.calls)
+    return {
+        "calls": calls,
+        "notifications": len(cached_out),
+        "identical_payloads": legacy_out == cached_out,
+        "legacy_us_per_call": round(legacy_cpu / calls * 1e6, 2),
+        "cached_us_per_call": round(cached_cpu / calls * 1e6, 2),
+        "encoder_cache_hits": main.ftms_encoder.cache_hits,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=20000, help="Simulated seconds of mock loop")
+    parser.add_argument("--calls", type=int, default=7, help="update_ftms calls per second")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['calls']} calls, {results['notifications']} notifications, "
+              f"identical payloads: {results['identical_payloads']}")
+        print(f"legacy  {results['legacy_us_per_call']:6.2f} us CPU/call")
+        print(f"cached  {results['cached_us_per_call']:6.2f} us CPU/call "
+              f"({results['encoder_cache_hits']} cache hits)")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Handshake duration: fixed sleeps vs advancing on the treadmill's echo.
+
+A fake iFit link reassembles what the bridge writes and answers every
+message with a response echoing its command byte after --reply-latency
+(the capabilities query gets the reply from doc/packet_inventory.md).
+The fixed-sleep run replays the old robust_handshake timing (0.1-1.0 s
+after every command regardless of the answer).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import FakeIfitClient
+
+import main
+from ifit_protocol import CAPABILITIES_COMMAND, HANDSHAKE_STEPS, PacketReassembler
+from replay import CAPABILITIES_REPLY
+
+
+class EchoingIfitClient(FakeIfitClient):
+    def __init__(self, state, write_latency, reply_latency):
+        super().__init__(state, write_latency)
+        self.reply_latency = reply_latency
+        self.reassembler = PacketReassembler()
+
+    async def write_gatt_char(self, target, data, response=None):
+        await super().write_gatt_char(target, data, response)
+        msg = self.reassembler.process_chunk(data)
+        if msg is not None:
+            if msg[6] == CAPABILITIES_COMMAND:
+                reply = CAPABILITIES_REPLY
+            else:
+                reply = bytes([0x01, 0x04, 0x02, 0x04, 0x04, 0x04, msg[6], 0x00])
+            asyncio.get_running_loop().call_later(self.reply_latency, self.state.ifit_responses.feed, reply)
+
+
+async def run(mode, rounds, write_latency, reply_latency):
+    main.state.pacer = main.ChunkPacer()
+    samples = []
+    for _ in range(rounds):
+        client = EchoingIfitClient(main.state, write_latency, reply_latency)
+        start = time.perf_counter()
+        if mode == "echo":
+            await main.robust_handshake(client, None)
+        else:
+            for step in HANDSHAKE_STEPS:
+                await main.send_packets(client, step.packets, None)
+                await asyncio.sleep(step.timeout)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--write-latency", type=float, default=0.015)
+    parser.add_argument("--reply-latency", type=float, default=0.03)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel("WARNING")
+    results = {}
+    for mode in ("fixed", "echo"):
+        samples = asyncio.run(run(mode, args.rounds, args.write_latency, args.reply_latency))
+        results[mode] = round(sum(samples) / len(samples) * 1000, 1)
+
+    if args.json:
+        print(json.dumps({"mean_ms": results, "steps": len(HANDSHAKE_STEPS)}, indent=2))
+    else:
+        print(f"Handshake ({len(HANDSHAKE_STEPS)} steps, reply after {args.reply_latency * 1000:.0f}ms): "
+              f"fixed sleeps {results['fixed']:.0f}ms -> echo-driven {results['echo']:.0f}ms")
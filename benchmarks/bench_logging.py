@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Event loop blocking from logging and the status line under 10 Hz telemetry.
+
+Replays a synthetic 10 Hz session in real time with --debug logging and a
+(simulated) terminal, twice:
+
+  sync   ScrollingLogHandler and ConsoleUI writes inline on the event loop
+  queue  logqueue's DeferredQueueHandler plus the ConsoleUI render thread
+         (4 fps, diff-only, one batched write per frame: the default)
+
+and reports how long each telemetry / FTMS notify callback held the loop,
+the total per second, and loop lag. The terminal is a sink whose flush()
+takes --flush-ms, standing in for an SSH session or serial console. Also
+times disabled debug calls: f-string vs level check + %-style + Hex().
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from bench_replay import write_session
+from common import FakeFtmsServer, percentiles
+
+import main
+from logqueue import Hex
+from metrics import LoopLagMonitor
+
+
+class SlowTerminal:
+    def __init__(self, flush_s):
+        self.flush_s = flush_s
+        self.bytes = 0
+        self.flushes = 0
+
+    def write(self, s):
+        self.bytes += len(s)
+        return len(s)
+
+    def flush(self):
+        self.flushes += 1
+        time.sleep(self.flush_s)
+
+    def isatty(self):
+        return True
+
+
+def timed(fn, samples):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+async def run(path, mode, queue_handler):
+    main.state = main.BridgeState()
+    main.notifier = main.FtmsNotifier()
+    if mode == "sync":
+        main.logger.handlers = [main.handler]
+    else:
+        main.logger.handlers = [queue_handler]
+        main.ui.start()
+
+    samples = []
+    decode, update = main.TelemetryPipeline.decode_telemetry, main.update_ftms
+    main.TelemetryPipeline.decode_telemetry = timed(decode, samples)
+    main.update_ftms = timed(update, samples)
+    monitor = LoopLagMonitor(interval=0.01)
+    lag_task = asyncio.create_task(monitor.run())
+    notify_task = asyncio.create_task(main.notifier.run(FakeFtmsServer()))
+    try:
+        await main.replay_client_loop(path, 1.0)
+    finally:
+        main.TelemetryPipeline.decode_telemetry, main.update_ftms = decode, update
+        notify_task.cancel()
+        lag_task.cancel()
+    if mode == "queue":
+        while not main.log_listener.queue.empty():
+            await asyncio.sleep(0.01) # Let the listener drain into the UI
+        main.ui.stop()
+    return samples, list(monitor.lag.samples), monitor.max_lag
+
+
+def disabled_debug_ns(n=200000):
+    log = logging.getLogger("bench-logging")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    payload = bytes(18)
+    out = {}
+    for name, fn in (("fstring", lambda: log.debug(f"FTMS NOTIFY: {payload.hex()}")),
+                     ("lazy", lambda: log.isEnabledFor(logging.DEBUG)
+                      and log.debug("FTMS NOTIFY: %s", Hex(payload)))):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        out[name] = round((time.perf_counter() - start) / n * 1e9)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of each replay")
+    parser.add_argument("--flush-ms", type=float, default=0.5, help="Simulated terminal flush time")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel(logging.DEBUG)
+    queue_handler = main.logger.handlers[0]
+    real_stdout = sys.stdout
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.ifr")
+        write_session(path, args.seconds, hz=10)
+        for mode in ("sync", "queue"):
+            terminal = SlowTerminal(args.flush_ms / 1000.0)
+            sys.stdout = terminal
+            main.ui.is_tty = True
+            try:
+                samples, lag, max_lag = asyncio.run(run(path, mode, queue_handler))
+            finally:
+                sys.stdout = real_stdout
+            results[mode] = {
+                "callback": {**{k: round(v * 1000, 3) for k, v in percentiles(samples).items()},
+                             "max": round(max(samples) * 1000, 3), "n": len(samples)},
+                "blocked_ms_per_s": round(sum(samples) * 1000 / args.seconds, 2),
+                "loop_lag": {**{k: round(v * 1000, 2) for k, v in percentiles(lag).items()},
+                             "max": round(max_lag * 1000, 2)},
+                "terminal_flushes": terminal.flushes,
+                "terminal_bytes": terminal.bytes,
+                "unit": "ms",
+            }
+    results["disabled_debug_ns"] = disabled_debug_ns()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode in ("sync", "queue"):
+            r = results[mode]
+            c, l = r["callback"], r["loop_lag"]
+            print(f"{mode:>5}: callback p50={c['p50']}ms p99={c['p99']}ms max={c['max']}ms | "
+                  f"blocked {r['blocked_ms_per_s']}ms/s | loop lag p99={l['p99']}ms max={l['max']}ms | "
+                  f"{r['terminal_flushes']} flushes, {r['terminal_bytes']} bytes")
+        d = results["disabled_debug_ns"]
+        print(f"disabled logger.debug: f-string {d['fstring']}ns, level check + Hex {d['lazy']}ns")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Event loop lag while shelling out: blocking subprocess.run vs hci_exec.
+
+Runs a slow command (`sleep <delay>`, standing in for bluetoothctl /
+hcitool) repeatedly while a LoopLagMonitor measures how late the loop wakes
+up. With subprocess.run every call stalls BLE callbacks for the whole
+command; through CommandExecutor the loop keeps ticking.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+
+from common import percentiles
+
+from hci_exec import CommandExecutor
+from metrics import LoopLagMonitor
+
+
+async def measure(mode, calls, delay):
+    monitor = LoopLagMonitor(interval=0.01)
+    lag_task = asyncio.create_task(monitor.run())
+    executor = CommandExecutor(min_interval=0)
+    await asyncio.sleep(0.05)
+    for _ in range(calls):
+        if mode == "blocking":
+            subprocess.run(["sleep", str(delay)], check=False)
+            await asyncio.sleep(0)
+        else:
+            await executor.run("sleep", str(delay))
+    lag_task.cancel()
+    return list(monitor.lag.samples), monitor.max_lag
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds per command")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("blocking", "async"):
+        samples, max_lag = asyncio.run(measure(mode, args.calls, args.delay))
+        results[mode] = {**{k: round(v * 1000, 2) for k, v in percentiles(samples).items()},
+                         "max": round(max_lag * 1000, 2), "unit": "ms"}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode, r in results.items():
+            print(f"{mode:>8}: loop lag p50={r['p50']}ms p99={r['p99']}ms max={r['max']}ms "
+                  f"({args.calls} x sleep {args.delay}s)")
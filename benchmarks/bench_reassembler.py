@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: iFit chunk reassembly throughput (chunks/sec).
+
+Feeds a stream of chunked 51-byte status messages (header + 3 data chunks,
+the shape the treadmill sends at ~5 Hz) through the legacy main.py
+reassembler and the shared ifit_protocol.PacketReassembler. The legacy
+one checks nothing but builds a bytearray and a bytes copy per message;
+the shared one validates length, chunk count and sequence and hands out
+one memoryview per message. Runs are
+interleaved and the best of --repeat is reported, since a single pass is
+easily off by 20% on a busy machine.
+"""
+import argparse
+import json
+import time
+
+import common  # noqa: F401  (puts src/ on sys.path)
+
+from ifit_protocol import PacketReassembler
+
+
+class LegacyReassembler:
+    """The main.py implementation before ifit_protocol existed."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.in_progress = False
+
+    def process_chunk(self, data):
+        if not data: return []
+        messages = []
+        seq = data[0]
+        if seq == 0xFE:
+            self.buffer = bytearray()
+            self.in_progress = True
+        elif seq == 0xFF:
+            if self.in_progress:
+                chunk_len = data[1]
+                self.buffer.extend(data[2:2+chunk_len])
+                messages.append(bytes(self.buffer))
+                self.in_progress = False
+        else:
+            if self.in_progress:
+                chunk_len = data[1]
+                self.buffer.extend(data[2:2+chunk_len])
+        return messages
+
+
+def chunk_message(msg):
+    slices = [msg[i:i + 18] for i in range(0, len(msg), 18)]
+    chunks = [bytearray([0xFE, 0x02, len(msg), 1 + len(slices)]) + b"\x00" * 16]
+    for i, part in enumerate(slices):
+        seq = 0xFF if i == len(slices) - 1 else i
+        chunks.append(bytearray([seq, len(part)]) + part + b"\x00" * (18 - len(part)))
+    return chunks
+
+
+def build_stream(messages):
+    stream = []
+    for n in range(messages):
+        msg = bytearray(51)
+        msg[0:4] = b"\x01\x04\x02\x2F"
+        msg[8] = n & 0xFF
+        stream.extend(chunk_message(bytes(msg)))
+    return stream
+
+
+def run(impl, stream, legacy):
+    r = impl()
+    got = 0
+    start = time.perf_counter()
+    if legacy:
+        for chunk in stream:
+            for _ in r.process_chunk(chunk):
+                got += 1
+    else:
+        for chunk in stream:
+            if r.process_chunk(chunk) is not None:
+                got += 1
+    elapsed = time.perf_counter() - start
+    return {"chunks_per_sec": round(len(stream) / elapsed), "messages": got}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per implementation (best is reported)")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    stream = build_stream(args.messages)
+    impls = {"legacy": (LegacyReassembler, True), "shared": (PacketReassembler, False)}
+    results = {}
+    for _ in range(args.repeat):
+        for name, (impl, legacy) in impls.items():
+            r = run(impl, stream, legacy)
+            if name not in results or r["chunks_per_sec"] > results[name]["chunks_per_sec"]:
+                results[name] = r
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in results.items():
+            print(f"{name:8s} {r['chunks_per_sec']:>10,d} chunks/s ({r['messages']} messages)")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Per-frame cost of the binary session recorder vs --debug hex logging.
+
+Feeds the same 20-byte iFit chunks through SessionRecorder.record() and
+through a logger.debug(hex) call routed to a file handler (what --debug
+capture costs today), then reads the recording back to check every frame
+survived, including across a rotation.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from common import percentiles
+
+from ifit_protocol import build_status_message, frame_message
+from recorder import IFIT_RX, SessionRecorder, read_session
+
+
+def chunks(frames):
+    packets = frame_message(build_status_message(speed_raw=500, incline_raw=200, elapsed_s=60))
+    return [packets[i % len(packets)] for i in range(frames)]
+
+
+def time_calls(fn, data):
+    samples = []
+    for pkt in data:
+        start = time.perf_counter()
+        fn(pkt)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=50000)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    data = chunks(args.frames)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.ifr")
+        rec = SessionRecorder(path, max_bytes=256 * 1024)
+        record_samples = time_calls(lambda pkt: rec.record(IFIT_RX, pkt), data)
+        rec.close()
+        read_back = sum(1 for _ in read_session(path))
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        rotations = rec.rotations
+
+        log = logging.getLogger("bench-recorder")
+        log.propagate = False
+        log.setLevel(logging.DEBUG)
+        handler = logging.FileHandler(os.path.join(tmp, "debug.log"))
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S'))
+        log.addHandler(handler)
+        log_samples = time_calls(lambda pkt: log.debug(f"RX: {pkt.hex()}"), data)
+        handler.close()
+        log_size = os.path.getsize(os.path.join(tmp, "debug.log"))
+
+    assert read_back == args.frames or rotations >= rec.backups, f"read {read_back}/{args.frames} frames"
+    results = {
+        "frames": args.frames,
+        "recorder_us": {k: round(v * 1e6, 2) for k, v in percentiles(record_samples).items()},
+        "hexlog_us": {k: round(v * 1e6, 2) for k, v in percentiles(log_samples).items()},
+        "recorder_bytes_per_frame": round(size / args.frames, 1),
+        "hexlog_bytes_per_frame": round(log_size / args.frames, 1),
+        "rotations": rotations,
+        "frames_read_back": read_back,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"recorder: p50={results['recorder_us']['p50']}us p99={results['recorder_us']['p99']}us "
+              f"{results['recorder_bytes_per_frame']} B/frame ({rotations} rotations, {read_back} frames kept)")
+        print(f"hex log : p50={results['hexlog_us']['p50']}us p99={results['hexlog_us']['p99']}us "
+              f"{results['hexlog_bytes_per_frame']} B/frame")
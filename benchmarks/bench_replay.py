@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Whole decode -> FTMS path throughput, driven by a replayed session.
+
+Writes a synthetic recording (5 Hz 0x2F status chunks plus a Control Point
+speed change every 10 s), replays it through main.replay_client_loop at
+full speed with the FTMS notifier unthrottled, and reports frames/s and
+notifications. Replays twice to check the run is deterministic.
+"""
+import argparse
+import asyncio
+import json
+import os
+import struct
+import tempfile
+import time
+
+from common import FakeFtmsServer
+
+import main
+from ifit_protocol import build_status_message, frame_message
+from recorder import FILE_HEADER, FRAME_HEADER, FTMS_CONTROL, IFIT_RX, MAGIC
+
+
+def write_session(path, seconds, hz=5):
+    with open(path, "wb") as f:
+        f.write(FILE_HEADER.pack(MAGIC, time.time()))
+        speed = 500
+        for i in range(int(seconds * hz)):
+            ms = int(i * 1000 / hz)
+            if i % (10 * hz) == 0 and i:
+                speed = 500 + (i // (10 * hz)) % 5 * 100
+                cp = bytes([0x02]) + struct.pack("<H", speed)
+                f.write(FRAME_HEADER.pack(len(cp), FTMS_CONTROL, ms) + cp)
+            msg = build_status_message(speed_raw=speed, incline_raw=100, elapsed_s=i // hz,
+                                       calories_raw=i * 1000, distance_raw=i * 28)
+            for pkt in frame_message(msg):
+                f.write(FRAME_HEADER.pack(len(pkt), IFIT_RX, ms) + pkt)
+
+
+async def run(path, speed):
+    main.state = main.BridgeState()
+    server = FakeFtmsServer()
+    main.notifier = main.FtmsNotifier(max_rate=0)  # Fresh Event per asyncio.run
+    notify_task = asyncio.create_task(main.notifier.run(server))
+    start = time.perf_counter()
+    pipeline = await main.replay_client_loop(path, speed)
+    elapsed = time.perf_counter() - start - main.state.handshake_time.total
+    await asyncio.sleep(0.01)
+    notify_task.cancel()
+    return {
+        "elapsed_s": elapsed,
+        "chunks": pipeline.reassembler.chunks,
+        "messages": pipeline.reassembler.messages,
+        "decoded": pipeline.status_decoder.decoded,
+        "notifications": len(server.notifications),
+        "final": (main.state.speed_kph, main.state.incline_pct, main.state.elapsed_time, main.state.calories),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=60.0, help="Length of the synthetic session")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed, 0 = as fast as possible")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel("WARNING")
+    main.ui.update_status = lambda state: None  # Keep the terminal out of the measurement
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.ifr")
+        write_session(path, args.minutes * 60)
+        first = asyncio.run(run(path, args.speed))
+        second = asyncio.run(run(path, args.speed))
+
+    deterministic = all(first[k] == second[k] for k in ("chunks", "messages", "decoded", "final"))
+    results = {
+        "session_minutes": args.minutes,
+        "chunks_per_s": round(first["chunks"] / first["elapsed_s"]),
+        "messages_per_s": round(first["messages"] / first["elapsed_s"]),
+        "realtime_factor": round(args.minutes * 60 / first["elapsed_s"], 1),
+        "notifications": first["notifications"],
+        "decoded": first["decoded"],
+        "deterministic": deterministic,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.minutes:g} min session replayed in {first['elapsed_s']:.2f}s "
+              f"({results['realtime_factor']}x real time): {results['chunks_per_s']} chunks/s, "
+              f"{results['messages_per_s']} messages/s, {results['notifications']} FTMS notifications, "
+              f"deterministic={deterministic}")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Phone connect -> first Treadmill Data, lazy connect vs warm standby.
+
+Same setup as bench_adapters.py (Pi mode, one shared adapter, BlueZ events
+from a FakeBluezBus, simulated treadmill):
+
+  lazy   the bridge waits for a phone, kicks it, scans, connects and unlocks
+         the treadmill, then lets the phone back in
+  warm   --warm-standby: the link is already unlocked when the phone shows
+         up, so it only waits for the FTMS side
+
+Warm runs first sit in standby for --standby-seconds and report what the
+idle link costs: keepalive polls/s and FTMS notifications sent (should be 0).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import common  # noqa: F401  (puts src/ on sys.path)
+
+import main
+import transport
+from bench_adapters import FakeHci, Phone
+from bluez_monitor import BluezMonitor
+from centrals import CentralRegistry
+from transport import LinkProfile, SimIfitPeripheral, SimRadio
+
+
+async def run(warm, hci_delay, retry, latency, standby_s, standby_poll):
+    radio = SimRadio(LinkProfile(latency=latency / 1000.0))
+    radio.add_peripheral(SimIfitPeripheral(main.IFIT_DEVICE_NAME))
+    ble = transport.sim_transport(radio)
+    main.PI_MODE = True
+    main.WARM_STANDBY = warm
+    main.STANDBY_POLL_INTERVAL = standby_poll
+    main.IFIT_ADAPTER = main.FTMS_ADAPTER = "hci0"
+    main.hci = hci = FakeHci(hci_delay)
+    main.state = main.BridgeState()
+    main.notifier = main.FtmsNotifier()
+    main.scheduler = main.ControlScheduler()
+    main.centrals = CentralRegistry()
+    main.device_cache.path = None
+    main.device_cache.entries = {}
+    main.ui.update_status = lambda state: None
+
+    polls = []
+    send_packets = main.send_packets
+    async def counted(client, packets, char_obj=None):
+        if packets is main.state.profile.poll_packets:
+            polls.append(time.perf_counter())
+        return await send_packets(client, packets, char_obj)
+    main.send_packets = counted
+
+    server = ble.server("bench")
+    await server.add_new_characteristic(main.FTMS_SERVICE_UUID, main.FTMS_DATA_CHAR_UUID, None, None, None)
+    await server.start()
+    phone = Phone(hci, retry)
+    bluez = BluezMonitor(phone.bus, is_ignored=main.is_ifit_device, adapter=main.FTMS_ADAPTER)
+    await bluez.start()
+    main.watch_ftms_connections(bluez)
+    tasks = [asyncio.create_task(main.notifier.run(server)),
+             asyncio.create_task(main.ifit_client_loop(server, ble))]
+
+    idle = {}
+    try:
+        if warm:
+            while not (main.state.standby and hci.advertising.is_set()):
+                await asyncio.sleep(0.05)
+            sent, start = main.notifier.sent, time.perf_counter()
+            await asyncio.sleep(standby_s)
+            window = [t for t in polls if t >= start]
+            idle = {
+                "polls_per_s": round((len(window) - 1) / (window[-1] - window[0]), 2) if len(window) > 1 else 0.0,
+                "notifications": main.notifier.sent - sent,
+            }
+
+        start = time.perf_counter()
+        await phone.connect()
+        arrived = await asyncio.wait_for(phone.first_data, 60.0)
+    finally:
+        for task in tasks:
+            task.cancel()
+        main.send_packets = send_packets
+    return {"seconds": arrived - start, "kicks": phone.kicks, **idle}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--hci-ms", type=float, default=30.0, help="Time per hciconfig/hcitool call (ms)")
+    parser.add_argument("--phone-retry", type=float, default=2.0, help="App reconnect delay after a kick (s)")
+    parser.add_argument("--latency", type=float, default=10.0, help="Simulated one-way link latency (ms)")
+    parser.add_argument("--standby-seconds", type=float, default=6.0, help="Time spent in standby before the phone connects")
+    parser.add_argument("--standby-poll", type=float, default=main.STANDBY_POLL_INTERVAL, help="Keepalive poll interval (s)")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    main.logger.setLevel("ERROR")
+    results = {}
+    for mode in ("lazy", "warm"):
+        runs = [asyncio.run(run(mode == "warm", args.hci_ms / 1000.0, args.phone_retry, args.latency,
+                                args.standby_seconds, args.standby_poll))
+                for _ in range(args.runs)]
+        times = [r["seconds"] for r in runs]
+        results[mode] = {
+            "mean_s": round(statistics.mean(times), 3),
+            "min_s": round(min(times), 3),
+            "max_s": round(max(times), 3),
+            "kicks": runs[0]["kicks"],
+        }
+        if mode == "warm":
+            results[mode]["standby_polls_per_s"] = round(statistics.mean(r["polls_per_s"] for r in runs), 2)
+            results[mode]["standby_notifications"] = max(r["notifications"] for r in runs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode, r in results.items():
+            print(f"{mode:>4}: phone connect -> first data {r['mean_s']}s "
+                  f"(min {r['min_s']}s, max {r['max_s']}s) | kicks={r['kicks']}")
+        w = results["warm"]
+        print(f"standby: {w['standby_polls_per_s']} keepalive polls/s "
+              f"(active {1 / main.POLL_INTERVAL:g}/s), {w['standby_notifications']} FTMS notifications")
+        print(f"({args.runs} runs, hci {args.hci_ms:g}ms/call, phone retry {args.phone_retry:g}s, "
+              f"link {args.latency:g}ms)")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Cost of one flight-recorder event vs the --debug logging it replaces.
+
+Times trace() against logger.debug with an f-string (the formatting runs
+even when DEBUG is off) and with DEBUG on into a file handler, then times
+a full-buffer dump.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import common  # noqa: F401  (puts src/ on sys.path)
+
+from tracing import CHUNK_RX, FlightRecorder
+
+CHUNK = bytes.fromhex("00120204022804289007018d68492815f0e9c0bd")
+
+
+def per_call_ns(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rec = FlightRecorder(directory=tmp)
+        trace = rec.record
+        results = {"trace_ns": round(per_call_ns(lambda: trace(CHUNK_RX, len(CHUNK), CHUNK[0]), args.events))}
+
+        log = logging.getLogger("bench-tracing")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        results["debug_off_ns"] = round(per_call_ns(lambda: log.debug(f"RX chunk: {CHUNK.hex()}"), args.events))
+
+        log.setLevel(logging.DEBUG)
+        handler = logging.FileHandler(os.path.join(tmp, "debug.log"))
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S'))
+        log.addHandler(handler)
+        results["debug_on_ns"] = round(per_call_ns(lambda: log.debug(f"RX chunk: {CHUNK.hex()}"), args.events // 10))
+        handler.close()
+
+        start = time.perf_counter()
+        path = rec.dump("bench")  # No running loop: writes synchronously
+        results["dump_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        results["dump_events"] = len(rec.events)
+        assert os.path.exists(path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"trace()            {results['trace_ns']:>6} ns/event")
+        print(f"debug log (off)    {results['debug_off_ns']:>6} ns/event")
+        print(f"debug log (on)     {results['debug_on_ns']:>6} ns/event")
+        print(f"dump {results['dump_events']} events: {results['dump_ms']} ms")
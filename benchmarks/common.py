@@ -0,0 +1,62 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks import the bridge straight from src/ and drive it with fake
+links, so they run on any machine without Bluetooth hardware.
+"""
+import asyncio
+import os
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+class FakeIfitClient:
+    """Stands in for BleakClient on the iFit side of a connected session.
+
+    Each write costs write_latency seconds and counts as a telemetry answer,
+    so the watchdog stays fed while the benchmark runs.
+    """
+
+    def __init__(self, state, write_latency=0.015):
+        self.state = state
+        self.write_latency = write_latency
+        self.is_connected = True
+        self.writes = []  # (perf_counter, bytes)
+
+    async def write_gatt_char(self, target, data, response=None):
+        await asyncio.sleep(self.write_latency)
+        self.writes.append((time.perf_counter(), bytes(data)))
+        self.state.last_notify_time = time.time()
+
+
+class FakeFtmsServer:
+    """Stands in for BlessServer; keeps every notified value."""
+
+    class Char:
+        value = None
+
+    def __init__(self):
+        self.char = self.Char()
+        self.notifications = []
+
+    def get_characteristic(self, uuid):
+        return self.char
+
+    def update_value(self, service_uuid, char_uuid):
+        self.notifications.append(bytes(self.char.value))
+        return True
+
+
+def percentiles(samples, pcts=(50, 95, 99)):
+    if not samples:
+        return {f"p{p}": 0.0 for p in pcts}
+    ordered = sorted(samples)
+    out = {}
+    for p in pcts:
+        idx = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        out[f"p{p}"] = ordered[idx]
+    return out
@@ -26,4 +26,5 @@ fi
 # 5. Start the Bridge
 echo "Starting iFitPi Bridge..."
 # --pi-mode required for Pi optimization
-python3 src/main.py --pi-mode
+# Metrics on localhost only (curl http://127.0.0.1:9105/metrics)
+python3 src/main.py --pi-mode --metrics-port "${IFIT_METRICS_PORT:-9105}"
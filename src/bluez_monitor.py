@@ -0,0 +1,209 @@
+"""
+Event-driven BlueZ connection tracking over the system D-Bus.
+
+Replaces polling `hcitool con` / `bluetoothctl show` with BlueZ signals:
+PropertiesChanged on org.bluez.Device1 ("Connected") and org.bluez.Adapter1
+("Pairable"), plus ObjectManager InterfacesAdded/InterfacesRemoved.
+Callbacks fire from the D-Bus reader on the event loop, within milliseconds
+of the controller reporting the change.
+
+FakeBluezBus speaks just enough of the same API to drive BluezMonitor
+without a radio or a system bus (benchmarks, --mock runs, tests).
+"""
+import logging
+
+try:
+    from dbus_next import BusType, Message, MessageType, Variant
+    from dbus_next.aio import MessageBus
+    DBUS_AVAILABLE = True
+except ImportError: # macOS / Windows: bless uses a different backend
+    DBUS_AVAILABLE = False
+
+logger = logging.getLogger("IFIT-FTMS")
+
+BLUEZ = "org.bluez"
+DEVICE_IFACE = "org.bluez.Device1"
+ADAPTER_IFACE = "org.bluez.Adapter1"
+PROPS_IFACE = "org.freedesktop.DBus.Properties"
+OM_IFACE = "org.freedesktop.DBus.ObjectManager"
+
+MATCH_RULES = (
+    f"type='signal',sender='{BLUEZ}',interface='{PROPS_IFACE}',member='PropertiesChanged'",
+    f"type='signal',sender='{BLUEZ}',interface='{OM_IFACE}',member='InterfacesAdded'",
+    f"type='signal',sender='{BLUEZ}',interface='{OM_IFACE}',member='InterfacesRemoved'",
+)
+
+
+def _unwrap(value):
+    return getattr(value, "value", value)
+
+
+class BluezMonitor:
+    """Tracks connected centrals and adapter flags from BlueZ signals.
+
+    adapter ("hci0") limits centrals to devices under that adapter, so links
+    on another adapter (the iFit one, a keyboard on a second dongle) never
+    count; None watches every adapter. is_ignored(address, name) filters out
+    links that are not FTMS centrals (our own outgoing iFit connection).
+    Callbacks:
+        on_connect(path, address), on_disconnect(path, address),
+        on_pairable(adapter_path, pairable)
+    """
+
+    def __init__(self, bus, is_ignored=lambda address, name: False, adapter=None):
+        self.bus = bus
+        self.is_ignored = is_ignored
+        self.device_prefix = f"/org/bluez/{adapter}/" if adapter else "/"
+        self.devices = {}      # path -> {"Address", "Name", "Connected"}
+        self.centrals = set()  # Paths of connected FTMS centrals
+        self.adapters = {}     # path -> {"Pairable", "Discoverable"}
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_pairable = None
+
+    @classmethod
+    async def connect_system_bus(cls, **kwargs):
+        if not DBUS_AVAILABLE:
+            raise RuntimeError("dbus_next is not installed")
+        bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+        return cls(bus, **kwargs)
+
+    async def start(self):
+        self.bus.add_message_handler(self._handle_message)
+        for rule in MATCH_RULES:
+            await self._call("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus",
+                             "AddMatch", "s", [rule])
+        # Initial snapshot (a phone may already be connected)
+        reply = await self._call(BLUEZ, "/", OM_IFACE, "GetManagedObjects")
+        for path, ifaces in reply.body[0].items():
+            self._interfaces_added(path, ifaces)
+
+    async def _call(self, destination, path, interface, member, signature="", body=None):
+        reply = await self.bus.call(Message(destination=destination, path=path, interface=interface,
+                                            member=member, signature=signature, body=body or []))
+        if reply.message_type == MessageType.ERROR:
+            raise RuntimeError(f"{member} failed: {reply.error_name} {reply.body}")
+        return reply
+
+    # --- Signal handling ---
+    def _handle_message(self, msg):
+        if msg.message_type != MessageType.SIGNAL:
+            return
+        if msg.member == "PropertiesChanged" and msg.interface == PROPS_IFACE:
+            iface, changed, _invalidated = msg.body
+            self._properties_changed(msg.path, iface, changed)
+        elif msg.member == "InterfacesAdded" and msg.interface == OM_IFACE:
+            self._interfaces_added(*msg.body)
+        elif msg.member == "InterfacesRemoved" and msg.interface == OM_IFACE:
+            path, ifaces = msg.body
+            if DEVICE_IFACE in ifaces:
+                self._device_update(path, {"Connected": False})
+                self.devices.pop(path, None)
+
+    def _interfaces_added(self, path, ifaces):
+        if DEVICE_IFACE in ifaces:
+            self._device_update(path, ifaces[DEVICE_IFACE])
+        if ADAPTER_IFACE in ifaces:
+            self._adapter_update(path, ifaces[ADAPTER_IFACE])
+
+    def _properties_changed(self, path, iface, changed):
+        if iface == DEVICE_IFACE:
+            self._device_update(path, changed)
+        elif iface == ADAPTER_IFACE:
+            self._adapter_update(path, changed)
+
+    def _device_update(self, path, props):
+        dev = self.devices.setdefault(path, {"Address": "", "Name": "", "Connected": False})
+        for key in ("Address", "Name", "Connected"):
+            if key in props:
+                dev[key] = _unwrap(props[key])
+        if not path.startswith(self.device_prefix) or self.is_ignored(dev["Address"], dev["Name"]):
+            return
+
+        if dev["Connected"] and path not in self.centrals:
+            self.centrals.add(path)
+            if self.on_connect:
+                self.on_connect(path, dev["Address"])
+        elif not dev["Connected"] and path in self.centrals:
+            self.centrals.discard(path)
+            if self.on_disconnect:
+                self.on_disconnect(path, dev["Address"])
+
+    def _adapter_update(self, path, props):
+        adapter = self.adapters.setdefault(path, {"Pairable": False, "Discoverable": False})
+        for key in ("Pairable", "Discoverable"):
+            if key in props:
+                adapter[key] = _unwrap(props[key])
+        if "Pairable" in props and self.on_pairable:
+            self.on_pairable(path, adapter["Pairable"])
+
+    # --- Actions ---
+    async def disconnect(self, path):
+        await self._call(BLUEZ, path, DEVICE_IFACE, "Disconnect")
+
+    async def set_adapter_property(self, adapter_path, name, value):
+        await self._call(BLUEZ, adapter_path, PROPS_IFACE, "Set", "ssv",
+                         [ADAPTER_IFACE, name, Variant("b", bool(value))])
+
+
+class FakeBluezBus:
+    """In-memory stand-in for the system bus, as seen by BluezMonitor.
+
+    Tests/benchmarks add devices and flip their state; the fake emits the
+    same signals BlueZ would. Method calls are recorded in self.calls.
+    """
+
+    class _Reply:
+        def __init__(self, body=None, error=None):
+            self.message_type = MessageType.ERROR if error else MessageType.METHOD_RETURN
+            self.error_name = error
+            self.body = body or []
+
+    class _Signal:
+        def __init__(self, path, interface, member, body):
+            self.message_type = MessageType.SIGNAL
+            self.path = path
+            self.interface = interface
+            self.member = member
+            self.body = body
+
+    def __init__(self, adapter_path="/org/bluez/hci0"):
+        self.handlers = []
+        self.objects = {adapter_path: {ADAPTER_IFACE: {"Pairable": False, "Discoverable": True}}}
+        self.adapter_path = adapter_path
+        self.calls = []
+
+    def add_message_handler(self, handler):
+        self.handlers.append(handler)
+
+    async def call(self, msg):
+        self.calls.append((msg.path, msg.interface, msg.member, list(msg.body)))
+        if msg.member == "GetManagedObjects":
+            return self._Reply([{p: {i: dict(v) for i, v in ifaces.items()} for p, ifaces in self.objects.items()}])
+        if msg.member == "Disconnect" and msg.path in self.objects:
+            self.set_connected(msg.path, False)
+        elif msg.member == "Set":
+            iface, name, value = msg.body
+            self.set_property(msg.path, iface, name, _unwrap(value))
+        return self._Reply()
+
+    def _emit(self, path, interface, member, body):
+        sig = self._Signal(path, interface, member, body)
+        for handler in list(self.handlers):
+            handler(sig)
+
+    # --- Test controls ---
+    def add_device(self, address, name="", connected=False):
+        path = f"{self.adapter_path}/dev_{address.replace(':', '_')}"
+        props = {"Address": address, "Name": name, "Connected": connected}
+        self.objects[path] = {DEVICE_IFACE: props}
+        self._emit("/", OM_IFACE, "InterfacesAdded", [path, {DEVICE_IFACE: dict(props)}])
+        return path
+
+    def set_connected(self, path, connected):
+        self.set_property(path, DEVICE_IFACE, "Connected", connected)
+
+    def set_property(self, path, iface, name, value):
+        self.objects.setdefault(path, {}).setdefault(iface, {})[name] = value
+        self._emit(path, PROPS_IFACE, "PropertiesChanged", [iface, {name: value}, []])
+
@@ -0,0 +1,148 @@
+"""
+Connected FTMS centrals: who is subscribed, at what rate, and who owns the
+Control Point.
+
+Several apps can follow one treadmill (a phone running a training plan plus
+a watch or tablet recording the run). Each central gets a notification rate
+negotiated down from what it asked for (--central-rate) to the bridge's own
+cap, and remembers the last payload it was sent, so a slow subscriber
+still gets every change, just later. Only the central that issued Request
+Control (opcode 0x00) may set targets until it resets or disconnects.
+
+Addresses are the identity. None means the backend could not tell who
+wrote (bless on macOS/Windows); those writes are always allowed, since
+there is nothing to arbitrate with.
+"""
+import logging
+import time
+
+logger = logging.getLogger("IFIT-FTMS")
+
+
+def parse_rates(specs):
+    """['AA:BB:..=2', ...] (--central-rate) -> {address: Hz}"""
+    rates = {}
+    for spec in specs or ():
+        address, _, hz = spec.partition("=")
+        rates[address.strip().upper()] = float(hz)
+    return rates
+
+
+class Central:
+    __slots__ = ("address", "path", "rate", "interval", "connected_at", "last_sent", "last_payload", "sent")
+
+    def __init__(self, address, path, rate):
+        self.address = address
+        self.path = path
+        self.rate = rate
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.connected_at = time.time()
+        self.last_sent = 0.0
+        self.last_payload = None
+        self.sent = 0
+
+
+class CentralRegistry:
+    def __init__(self, max_rate=4.0, rates=None):
+        self.max_rate = max_rate
+        self.rates = rates or {} # Requested Hz per address
+        self.centrals = {}       # address -> Central
+        self.owner = None        # Address holding the Control Point
+        self.writer = None       # Origin of the Control Point write in progress (BlueZ), see take_writer()
+
+    def __len__(self):
+        return len(self.centrals)
+
+    def __iter__(self):
+        return iter(list(self.centrals.values()))
+
+    def configure(self, max_rate, rates=None):
+        self.max_rate = max_rate
+        if rates is not None:
+            self.rates = rates
+
+    def negotiate(self, address):
+        requested = self.rates.get(address, self.max_rate)
+        if self.max_rate > 0 and (requested <= 0 or requested > self.max_rate):
+            return self.max_rate
+        return requested
+
+    # --- Connections ---
+    def connect(self, address, path=None):
+        address = address.upper()
+        central = self.centrals.get(address)
+        if central is None:
+            central = self.centrals[address] = Central(address, path, self.negotiate(address))
+            logger.info(f"FTMS central {address} subscribed at {central.rate:g} Hz ({len(self)} connected)")
+        return central
+
+    def disconnect(self, address):
+        address = address.upper()
+        if self.centrals.pop(address, None) is None:
+            return
+        if self.owner == address:
+            self.owner = None
+            logger.info(f"FTMS control released ({address} disconnected)")
+
+    def sync(self, addresses):
+        # Polling fallback: make the registry match a list of connected addresses
+        addresses = {a.upper() for a in addresses}
+        for address in set(self.centrals) - addresses:
+            self.disconnect(address)
+        for address in addresses:
+            self.connect(address)
+
+    # --- Notification fan-out ---
+    def fastest_rate(self):
+        # Broadcast-only servers (BlueZ) notify at the rate of the most demanding central
+        rates = [c.rate for c in self.centrals.values()]
+        if not rates or 0 in rates:
+            return self.max_rate
+        return max(rates)
+
+    def due(self, payload, now, heartbeat):
+        """Centrals that should get this payload now; marks them as sent."""
+        targets = []
+        for c in self.centrals.values():
+            if now - c.last_sent < c.interval:
+                continue
+            if payload is c.last_payload and now - c.last_sent < heartbeat:
+                continue
+            c.last_sent = now
+            c.last_payload = payload
+            c.sent += 1
+            targets.append(c)
+        return targets
+
+    def next_due(self, payload, now):
+        """Seconds until a central still missing this payload may get it (None: nobody)."""
+        waits = [c.last_sent + c.interval - now for c in self.centrals.values() if c.last_payload is not payload]
+        return max(0.0, min(waits)) if waits else None
+
+    # --- Control Point ownership ---
+    def take_writer(self):
+        # Origin left by the BlueZ WriteValue hook, consumed by the one write
+        # it belongs to, so a later anonymous write is never credited to it
+        writer, self.writer = self.writer, None
+        return writer
+
+    def request_control(self, address):
+        address = address.upper() if address else None
+        if address is None:
+            return True
+        if self.owner and self.owner != address and self.owner in self.centrals:
+            return False
+        self.owner = address
+        return True
+
+    def may_control(self, address):
+        if address is None:
+            return True
+        return self.owner == address.upper()
+
+    def release(self, address):
+        if address and self.owner == address.upper():
+            self.owner = None
+
+
+centrals = CentralRegistry()
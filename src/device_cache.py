@@ -0,0 +1,69 @@
+"""
+Small persistent per-device store (keyed by treadmill MAC).
+
+Values survive restarts so the bridge can reuse what it learned about a
+particular treadmill. Writes are rare (end of session, new stable values),
+so a plain JSON file replaced atomically is good enough.
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger("IFIT-FTMS")
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "IFIT_CACHE_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "treadmill-connect", "devices.json"),
+)
+
+
+class DeviceCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.entries = data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Device cache unreadable ({e}). Starting fresh.")
+
+    def get(self, address):
+        if not address:
+            return {}
+        return self.entries.get(address.upper(), {})
+
+    def update(self, address, **fields):
+        if not address:
+            return
+        entry = self.entries.setdefault(address.upper(), {})
+        entry.update(fields)
+        self.save()
+
+    def last_address(self, name):
+        # Most recently connected device advertising under this name
+        seen = [(e.get("last_seen", 0), addr) for addr, e in self.entries.items() if e.get("name") == name]
+        return max(seen)[1] if seen else None
+
+    def save(self):
+        if not self.path: # In-memory only (--sim)
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Device cache save failed: {e}")
+
+
+device_cache = DeviceCache()
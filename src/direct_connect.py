@@ -8,6 +8,8 @@ import tty
 import termios
 from bleak import BleakClient, BleakScanner
 
+from ifit_protocol import PacketReassembler, StatusDecoder
+
 # =============================================================================
 # CONSTANTS & PROTOCOL
 # =============================================================================
@@ -38,38 +40,6 @@ HS_STEPS = [
 # =============================================================================
 # HELPERS
 # =============================================================================
-class PacketReassembler:
-    def __init__(self):
-        self.buffer = bytearray()
-        self.expected_chunks = 0
-        self.total_len = 0
-        self.in_progress = False
-
-    def process_chunk(self, data):
-        if not data: return []
-        
-        messages = []
-        seq = data[0]
-
-        if seq == 0xFE: # Header
-            self.buffer = bytearray()
-            self.total_len = data[2]
-            # self.expected_chunks = data[3] # Approximate - not used
-            self.in_progress = True
-        elif seq == 0xFF: # EOF
-            if self.in_progress:
-                chunk_len = data[1]
-                self.buffer.extend(data[2:2+chunk_len])
-                # Validate length?
-                messages.append(bytes(self.buffer))
-                self.in_progress = False
-        else: # Data Chunk
-            if self.in_progress:
-                chunk_len = data[1]
-                self.buffer.extend(data[2:2+chunk_len])
-        
-        return messages
-
 def create_control_command(type_id, value):
     if type_id == TYPE_SPEED:
          # 020402090409020101VVVV00CS
@@ -119,23 +89,23 @@ class TreadmillController:
         self.target_incline_pct = None
         self.pending_command = None
         self.reassembler = PacketReassembler()
+        self.decoder = StatusDecoder()
         self.client = None
         self.loop = None
 
     def decode_telemetry(self, payload):
-        if len(payload) < 30 or payload[3] != 0x2F: return
+        rec = self.decoder.decode(payload)
+        if rec is None: return
 
         try:
             # Speed (8)
-            s_raw = struct.unpack_from('<H', payload, 8)[0]
-            current_speed_mph = (s_raw / 100.0) * 0.621371
+            current_speed_mph = rec.speed_kph * 0.621371
             
             # Sync Target on First Packet
             if self.target_speed_mph is None:
                 self.target_speed_mph = round(current_speed_mph, 1)
             
-            i_raw = struct.unpack_from('<H', payload, 10)[0]
-            current_incline_pct = i_raw / 100.0
+            current_incline_pct = rec.incline_pct
             
             if self.target_incline_pct is None:
                 self.target_incline_pct = round(current_incline_pct, 1)
@@ -143,19 +113,12 @@ class TreadmillController:
             self.state["speed_actual"] = current_speed_mph
             self.state["incline_actual"] = current_incline_pct
             
-            # ... (Rest of decode unchanged) ...
-            t_sec = struct.unpack_from('<I', payload, 27)[0]
-            m, s = divmod(t_sec, 60)
+            m, s = divmod(rec.elapsed_s, 60)
             h, m = divmod(m, 60)
             self.state["time_str"] = f"{h:02}:{m:02}:{s:02}"
             
-            if len(payload) >= 42 + 4:
-                d_raw = struct.unpack_from('<I', payload, 42)[0]
-                d_km = d_raw / 100.0 / 1000.0
-                self.state["dist_mi"] = d_km * 0.621371
-            
-            c_raw = struct.unpack_from('<I', payload, 31)[0]
-            self.state["cals"] = c_raw / 97656.0
+            self.state["dist_mi"] = rec.distance_m / 1000.0 * 0.621371
+            self.state["cals"] = rec.calories
             
             self.print_status()
                 
@@ -337,7 +300,8 @@ class TreadmillController:
                 await asyncio.sleep(0.2)
 
     def notification_handler(self, sender, data):
-        for msg in self.reassembler.process_chunk(data):
+        msg = self.reassembler.process_chunk(data)
+        if msg is not None:
             self.decode_telemetry(msg)
 
     async def send_command_bytes(self, cmd_tuple, char_obj):
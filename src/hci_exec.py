@@ -0,0 +1,135 @@
+"""
+Async executor for the BlueZ command-line tools (hciconfig, hcitool,
+bluetoothctl).
+
+subprocess.run() inside a coroutine freezes the whole event loop until the
+tool exits -- up to several seconds for `bluetoothctl disconnect`. Here every
+call runs through asyncio.create_subprocess_exec with a per-call timeout, and:
+
+- a timed-out or cancelled call kills its child process;
+- read-only queries (`hcitool con`, `bluetoothctl show`) opt in with
+  shared=True: identical ones already in flight are shared (one fork, many
+  waiters) and repeats within min_interval reuse the last result.
+
+State-changing commands (leadv, noleadv, ledc, pairable off) always run:
+a cached "ok" from 200 ms ago says nothing about the adapter now.
+"""
+import asyncio
+import logging
+import time
+
+from metrics import LatencyHistogram
+from tracing import SUBPROCESS, trace
+
+logger = logging.getLogger("IFIT-FTMS")
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MIN_INTERVAL = 0.25
+
+
+class CommandResult:
+    __slots__ = ("argv", "returncode", "stdout", "stderr", "timed_out")
+
+    def __init__(self, argv, returncode=None, stdout="", stderr="", timed_out=False):
+        self.argv = argv
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+class CommandExecutor:
+    def __init__(self, default_timeout=DEFAULT_TIMEOUT, min_interval=DEFAULT_MIN_INTERVAL):
+        self.default_timeout = default_timeout
+        self.min_interval = min_interval
+        self.inflight = {}  # argv -> Task
+        self.waiters = {}   # argv -> number of callers awaiting it
+        self.last = {}      # argv -> (monotonic finish time, CommandResult)
+        self.durations = LatencyHistogram("subprocess")
+        self.runs = 0
+        self.deduped = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+
+    async def run(self, *argv, timeout=None, shared=False, min_interval=None):
+        key = tuple(argv)
+        if not shared:
+            return await self._exec(key, timeout or self.default_timeout)
+        task = self.inflight.get(key)
+        if task is not None:
+            self.deduped += 1
+        else:
+            min_interval = self.min_interval if min_interval is None else min_interval
+            last = self.last.get(key)
+            if last is not None and time.monotonic() - last[0] < min_interval:
+                self.rate_limited += 1
+                return last[1]
+            task = asyncio.create_task(self._exec(key, timeout or self.default_timeout))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _t: self.inflight.pop(key, None))
+
+        # Shared task: one caller cancelling only detaches it; the last one kills the child
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.waiters.get(key) == 1:
+                task.cancel()
+            raise
+        finally:
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+
+    def fire(self, *argv, **kwargs):
+        # For sync callbacks: schedule and forget (errors are logged by _exec)
+        return asyncio.create_task(self.run(*argv, **kwargs))
+
+    async def _exec(self, argv, timeout):
+        self.runs += 1
+        start = time.perf_counter()
+        result = CommandResult(argv)
+        proc = None
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+            result.returncode = proc.returncode
+            result.stdout = out.decode(errors="replace")
+            result.stderr = err.decode(errors="replace")
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            result.timed_out = True
+            logger.warning(f"{' '.join(argv)} timed out after {timeout:.1f}s")
+            await self._kill(proc)
+        except asyncio.CancelledError:
+            await self._kill(proc)
+            raise
+        except Exception as e: # Missing binary, no sudo, ...
+            result.stderr = str(e)
+            logger.warning(f"{' '.join(argv)} failed: {e}")
+        finally:
+            self.durations.record(time.perf_counter() - start)
+            trace(SUBPROCESS, result.returncode, argv)
+        self.last[argv] = (time.monotonic(), result)
+        return result
+
+    @staticmethod
+    async def _kill(proc):
+        if proc is not None and proc.returncode is None:
+            try:
+                proc.kill()
+                await proc.wait()
+            except ProcessLookupError:
+                pass
+
+    def stats(self):
+        return (f"runs={self.runs} deduped={self.deduped} rate_limited={self.rate_limited} "
+                f"timeouts={self.timeouts} {self.durations.summary()}")
+
+
+hci = CommandExecutor()
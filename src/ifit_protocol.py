@@ -0,0 +1,359 @@
+"""
+iFit BLE wire protocol helpers shared by the bridge and the CLI tools.
+
+Messages longer than one notification are split into chunks:
+
+    Header: FE 02 <total_len> <total_chunks> <padding...>
+    Data:   <seq 00, 01, ... or FF for the last> <chunk_len> <data...>
+
+total_chunks counts the header too (see doc/packet_inventory.md).
+
+Reassembled messages look like 01 04 02 <len> ... <checksum>, where <len>
+is the message length minus 4 and the checksum is sum(msg[4:-1]) & 0xFF.
+"""
+import asyncio
+import logging
+import operator
+import struct
+import zlib
+
+logger = logging.getLogger("IFIT-FTMS")
+
+MAX_MESSAGE_LEN = 255 # Total length travels in a single header byte
+CHUNK_DATA_LEN = 18   # 20-byte ATT payload minus seq/len
+LENGTH_INDEX = 3      # Message length minus 4
+COMMAND_INDEX = 6     # Command byte; responses echo it at the same offset
+
+
+def frame_message(payload):
+    """Split a message into the chunk packets that go over the wire."""
+    total_len = len(payload)
+    slices = [bytes(payload[i:i + CHUNK_DATA_LEN]) for i in range(0, total_len, CHUNK_DATA_LEN)]
+    packets = [bytes([0xFE, 0x02, total_len, 1 + len(slices)]) + bytes(16)]
+    for i, data in enumerate(slices):
+        seq = 0xFF if i == len(slices) - 1 else i
+        packets.append(bytes([seq, len(data)]) + data)
+    return tuple(packets)
+
+
+class PacketReassembler:
+    """Rebuilds iFit messages from notification chunks.
+
+    A single preallocated buffer is reused for every message. process_chunk()
+    returns a memoryview into it once a message completes (None otherwise);
+    the view is only valid until the next chunk is fed, so copy it with
+    bytes(view) if it has to outlive the callback.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray(MAX_MESSAGE_LEN)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+        self.expected_len = 0
+        self.expected_chunks = 0
+        self.next_seq = 0
+        self.in_progress = False
+
+        # Counters (cumulative)
+        self.chunks = 0
+        self.messages = 0
+        self.dropped = 0       # Chunks arriving with no message in progress, or abandoned messages
+        self.out_of_order = 0  # Data chunk sequence gaps
+        self.short = 0         # Truncated chunks or messages shorter than the header promised
+
+    def reset(self):
+        self.in_progress = False
+        self.filled = 0
+
+    def process_chunk(self, data):
+        """Feed one notification; returns the completed message or None.
+
+        The message is a memoryview into the reused buffer, valid only
+        until the next process_chunk() call: copy it (bytes(msg)) to keep it.
+        """
+        self.chunks += 1
+        size = len(data)
+        if size < 2:
+            self.short += 1
+            return None
+
+        seq = data[0]
+        if seq == 0xFE: # Header
+            if size < 4:
+                self.short += 1
+                return None
+            if self.in_progress:
+                self.dropped += 1
+            self.expected_len = data[2]
+            self.expected_chunks = data[3]
+            self.filled = 0
+            self.next_seq = 0
+            self.in_progress = True
+            return None
+
+        if not self.in_progress:
+            self.dropped += 1
+            return None
+
+        chunk_len = data[1]
+        start = self.filled
+        end = start + chunk_len
+        if chunk_len > size - 2:
+            self.short += 1
+            self.reset()
+            return None
+        if seq != 0xFF and seq != self.next_seq:
+            self.out_of_order += 1
+            self.reset()
+            return None
+        if end > self.expected_len:
+            self.dropped += 1
+            self.reset()
+            return None
+
+        self.buffer[start:end] = data[2:2 + chunk_len]
+        self.filled = end
+        self.next_seq += 1
+        if seq != 0xFF:
+            return None
+
+        # EOF: validate against what the header promised
+        self.in_progress = False
+        if end != self.expected_len or self.next_seq + 1 != self.expected_chunks:
+            self.short += 1
+            return None
+        self.messages += 1
+        return self.view[:end]
+
+    def stats(self):
+        return (f"chunks={self.chunks} messages={self.messages} dropped={self.dropped} "
+                f"out_of_order={self.out_of_order} short={self.short}")
+
+
+# =============================================================================
+# STATUS (0x2F) TELEMETRY
+# =============================================================================
+STATUS_LEN_BYTE = 0x2F
+STATUS_MSG_LEN = STATUS_LEN_BYTE + 4
+CALORIE_DIVISOR = 97656.0
+
+# Speed(8) Incline(10) Time(27) Calories(31) Distance(42), decoded in one pass
+STATUS_STRUCT = struct.Struct('<8xHH15xII7xI')
+STATUS_FIELDS = ("speed", "incline", "elapsed", "calories", "distance") # TelemetryRecord order
+STATUS_DIVISORS = (100.0, 100.0, 1, CALORIE_DIVISOR, 100.0)
+
+
+def checksum(msg):
+    # sum(msg[4:-1]) & 0xFF, in C: Adler-32's low half is 1 + the byte sum
+    # mod 65521, and a 255-byte message sums to at most 65025
+    return (zlib.adler32(msg[4:-1]) - 1) & 0xFF
+
+
+class TelemetryRecord:
+    __slots__ = ("speed_raw", "incline_raw", "elapsed_s", "calories_raw", "distance_raw")
+    divisors = STATUS_DIVISORS # raw -> units, in STATUS_FIELDS order (per-layout subclasses override)
+
+    def __init__(self, speed_raw, incline_raw, elapsed_s, calories_raw, distance_raw):
+        self.speed_raw = speed_raw        # 0.01 km/h (reference layout)
+        self.incline_raw = incline_raw    # 0.01 %
+        self.elapsed_s = elapsed_s        # Seconds (machine clock)
+        self.calories_raw = calories_raw  # / CALORIE_DIVISOR = kcal
+        self.distance_raw = distance_raw  # 0.01 m (often static in remote mode)
+
+    @property
+    def speed_kph(self):
+        return self.speed_raw / self.divisors[0]
+
+    @property
+    def incline_pct(self):
+        return self.incline_raw / self.divisors[1]
+
+    @property
+    def calories(self):
+        return self.calories_raw / self.divisors[3]
+
+    @property
+    def distance_m(self):
+        return self.distance_raw / self.divisors[4]
+
+
+class StatusLayout:
+    """Where one treadmill model keeps the status fields, compiled once.
+
+    fields maps each STATUS_FIELDS name to (offset, struct type, divisor).
+    The offsets become a single Struct with pad bytes in between; if the
+    model stores them in another order than TelemetryRecord takes them, an
+    itemgetter puts them back, chosen here rather than per packet. Records
+    come out as a TelemetryRecord subclass carrying the layout's divisors.
+    """
+
+    def __init__(self, len_byte, fields):
+        self.len_byte = len_byte
+        self.msg_len = len_byte + 4
+        self.divisors = tuple(fields[name][2] for name in STATUS_FIELDS)
+        self.calorie_divisor = self.divisors[3]
+        self.record = type("TelemetryRecord", (TelemetryRecord,), {"__slots__": (), "divisors": self.divisors})
+        by_offset = sorted(STATUS_FIELDS, key=lambda name: fields[name][0])
+        fmt, pos = "<", 0
+        for name in by_offset:
+            offset, kind, _divisor = fields[name]
+            if offset < pos:
+                raise ValueError(f"Status field {name} at {offset} overlaps the previous one")
+            fmt += (f"{offset - pos}x" if offset > pos else "") + kind
+            pos = offset + struct.calcsize("<" + kind)
+        if pos > self.msg_len - 1:
+            raise ValueError(f"Status fields run into the checksum (end {pos}, message {self.msg_len})")
+        self.struct = struct.Struct(fmt)
+        if by_offset == list(STATUS_FIELDS):
+            self.unpack = self.struct.unpack_from
+        else:
+            reorder = operator.itemgetter(*(by_offset.index(name) for name in STATUS_FIELDS))
+            unpack_from = self.struct.unpack_from
+            self.unpack = lambda payload: reorder(unpack_from(payload))
+
+
+# The reference machine (doc/packet_inventory.md); profiles/default.json describes the same
+DEFAULT_STATUS_LAYOUT = StatusLayout(STATUS_LEN_BYTE, {
+    name: (offset, kind, divisor) for name, offset, kind, divisor in zip(
+        STATUS_FIELDS, (8, 10, 27, 31, 42), "HHIII", STATUS_DIVISORS)})
+
+
+class StatusDecoder:
+    """Decodes 0x2F status messages, rejecting anything with a bad checksum."""
+
+    def __init__(self, layout=DEFAULT_STATUS_LAYOUT):
+        self.decoded = 0
+        self.checksum_errors = 0
+        self.set_layout(layout)
+
+    def set_layout(self, layout):
+        # Flattened onto the decoder: decode() does no attribute chasing
+        self.layout = layout
+        self.len_byte = layout.len_byte
+        self.msg_len = layout.msg_len
+        self.unpack = layout.unpack
+        self.record = layout.record
+
+    def decode(self, payload):
+        msg_len = self.msg_len
+        if len(payload) < msg_len or payload[3] != self.len_byte:
+            return None
+        if (zlib.adler32(payload[4:msg_len - 1]) - 1) & 0xFF != payload[msg_len - 1]: # See checksum()
+            if not self.checksum_errors:
+                # Loud once: a console that sums differently would otherwise just go quiet
+                logger.warning(f"Status checksum mismatch (expected {checksum(payload[:msg_len]):02X}): "
+                               f"{bytes(payload[:msg_len]).hex()}. Dropping such messages, "
+                               f"counted in checksum_errors")
+            self.checksum_errors += 1
+            return None
+        self.decoded += 1
+        return self.record(*self.unpack(payload))
+
+
+def build_status_message(speed_raw=0, incline_raw=0, elapsed_s=0, calories_raw=0, distance_raw=0):
+    """Encode a status message the way the treadmill does (simulators, benchmarks)."""
+    msg = bytearray(STATUS_MSG_LEN)
+    STATUS_STRUCT.pack_into(msg, 0, speed_raw, incline_raw, elapsed_s, calories_raw, distance_raw)
+    # Header goes in after pack_into, whose pad bytes write zeros
+    msg[0:7] = bytes([0x01, 0x04, 0x02, STATUS_LEN_BYTE, 0x04, STATUS_LEN_BYTE, 0x02])
+    msg[-1] = checksum(msg)
+    return bytes(msg)
+
+
+# =============================================================================
+# HANDSHAKE
+# =============================================================================
+# Unlock sequence from the app capture (see doc/reverse_engineering.md):
+# (message, fallback wait). The treadmill echoes each command byte; the wait
+# only applies if no echo shows up. The bridge runs the copy in its
+# treadmill profile (profiles/default.json); this one is the reference.
+HANDSHAKE_MESSAGES = (
+    ("0204020402048187", 0.1),            # 0x81 Equipment info
+    ("0204020404048088", 0.1),            # 0x80 Capabilities
+    ("0204020404048890", 0.1),            # 0x88 Supported commands
+    ("020402070207820000008B", 0.1),      # 0x82 Info 2
+    ("0204020602068400008C", 0.1),        # 0x84 Info 3
+    ("020402040204959B", 0.1),            # 0x95
+    ("0204022804289007018D68492815F0E9C0BDA89988756079704D484948757069609D88B9A8D5C0A0020000AD", 0.5), # 0x90 Enable
+    ("020402150415020E000000000000000000000000001001003A", 0.5),
+    ("020402130413020C0000000000000000000000800000A5", 1.0), # Start stream
+)
+
+
+CAPABILITIES_COMMAND = 0x80
+
+
+def capability_codes(msg):
+    """Codes listed in a SupportedCapabilities (0x80) response, b'' if it isn't one.
+
+    01 04 02 <len> 04 10 80 02 <count> <codes...> <checksum>
+    """
+    if len(msg) < 10 or msg[COMMAND_INDEX] != CAPABILITIES_COMMAND:
+        return b""
+    return bytes(msg[9:min(9 + msg[8], len(msg) - 1)])
+
+
+class HandshakeStep:
+    """One unlock message, framed, and how to recognise its reply.
+
+    The command byte alone is ambiguous: the last two steps, the poll and
+    every status message all use 0x02. A step with a known reply_length
+    only accepts replies of that length; otherwise anything but a status
+    message (status_len_byte) counts.
+    """
+    __slots__ = ("command", "packets", "timeout", "reply_length", "status_len_byte")
+
+    def __init__(self, message, timeout, reply_length=None, status_len_byte=STATUS_LEN_BYTE):
+        self.command = message[COMMAND_INDEX]
+        self.packets = frame_message(message)
+        self.timeout = timeout
+        self.reply_length = reply_length
+        self.status_len_byte = status_len_byte
+
+    def accepts(self, msg):
+        if self.reply_length is not None:
+            return msg[LENGTH_INDEX] == self.reply_length
+        return msg[LENGTH_INDEX] != self.status_len_byte
+
+
+# Framed once at import, reused on every reconnect. The capabilities reply
+# length comes from doc/packet_inventory.md.
+HANDSHAKE_STEPS = tuple(HandshakeStep(bytes.fromhex(m), t, 0x10 if m[12:14] == "80" else None)
+                        for m, t in HANDSHAKE_MESSAGES)
+
+
+class ResponseWaiter:
+    """Lets a sender await the response echoing a given command byte.
+
+    accepts(msg), if given, further narrows which messages with that
+    command byte count (see HandshakeStep.accepts); the others are left
+    alone. feed() is called with every reassembled message and is a no-op
+    when nobody is waiting, so it can sit on the telemetry hot path.
+    """
+
+    def __init__(self):
+        self.pending = {}  # command byte -> (Future, accepts or None)
+
+    def expect(self, command, accepts=None):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[command] = (future, accepts)
+        return future
+
+    def discard(self, command):
+        entry = self.pending.pop(command, None)
+        if entry is not None and not entry[0].done():
+            entry[0].cancel()
+
+    def feed(self, msg):
+        if not self.pending or len(msg) <= COMMAND_INDEX:
+            return
+        command = msg[COMMAND_INDEX]
+        entry = self.pending.get(command)
+        if entry is None:
+            return
+        future, accepts = entry
+        if accepts is not None and not accepts(msg):
+            return
+        del self.pending[command]
+        if not future.done():
+            future.set_result(bytes(msg))
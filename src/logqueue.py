@@ -0,0 +1,69 @@
+"""
+Logging off the event loop.
+
+The bridge's log output ends up on a terminal (with ANSI status redraws) or
+in the journal, and either can stall for milliseconds. Records are put on a
+queue as-is and a QueueListener thread formats and writes them, so the
+event loop only pays for building the LogRecord.
+
+Hot paths log with %-style arguments and wrap byte strings in Hex(), so
+nothing gets formatted unless the record is actually emitted. Per-message
+debug lines also check the level first, which skips building the record
+(and the Hex) entirely when DEBUG is off:
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("FTMS NOTIFY: %s", Hex(payload))
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+
+class Hex:
+    """Lazy bytes.hex() for log arguments."""
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        # bytearrays get reused by BLE callbacks: snapshot (free for bytes)
+        self.data = bytes(data)
+
+    def __str__(self):
+        return self.data.hex()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() renders the message on the caller's thread, which is
+    the cost this module exists to avoid. Arguments must be immutable (or
+    wrapped in Hex) since they are read later; exceptions are still rendered
+    here, while the traceback is current.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            return super().prepare(record)
+        return record
+
+
+_listeners = []
+
+
+def start_queue_logging(logger, handlers):
+    """Move a logger's output to a background thread. Returns the listener."""
+    q = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    for h in handlers:
+        logger.removeHandler(h)
+    logger.addHandler(DeferredQueueHandler(q))
+    listener.start()
+    _listeners.append(listener)
+    return listener
+
+
+@atexit.register
+def stop_queue_logging():
+    """Flush whatever is still queued and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 import asyncio
+import contextlib
+import json
 import logging
+import signal
 import sys
 import struct
+import threading
 import time
 
 # --- MONKEY PATCH FOR BLESS <-> BLEAK 0.22.x COMPATIBILITY ---
@@ -35,6 +39,20 @@ from bless import (
 )
 from bleak import BleakClient, BleakScanner
 
+from metrics import LatencyHistogram, LoopLagMonitor, registry
+from device_cache import device_cache
+from ifit_protocol import (CAPABILITIES_COMMAND, PacketReassembler, ResponseWaiter, StatusDecoder,
+                           capability_codes)
+from profiles import profiles
+from hci_exec import hci
+from centrals import centrals, parse_rates
+from logqueue import Hex, start_queue_logging, stop_queue_logging
+import tracing
+from tracing import trace, tracer
+from recorder import FTMS_CONTROL, IFIT_RX, SessionRecorder
+from replay import TreadmillEmulator, replay_frames
+from transport import BleTransport, LinkProfile, SimFtmsCentral, SimIfitPeripheral, SimRadio, sim_transport
+
 # =============================================================================
 # LOGGING
 # =============================================================================
@@ -48,6 +66,9 @@ logger = logging.getLogger(__name__)
 # CONSOLE UI & LOGGING
 # =============================================================================
 class ConsoleUI:
+    FPS = 4.0               # Status line redraws per second (tty)
+    HEADLESS_INTERVAL = 1.0 # Status lines per second at most (text / json)
+
     def __init__(self):
         self.status_line = ""
         self.is_tty = sys.stdout.isatty()
@@ -59,10 +80,72 @@ class ConsoleUI:
         self.last_calc_time = 0
         self.target_speed_kph = 0.0 # Echo Strategy
         self.last_print_time = 0
-        
+        self.status_format = "text"
+        self.interval = 1.0 / self.FPS
+        self.state = None
+        self.last_status = None # What the last status write showed
+        self.lines = []         # Log lines waiting for the next frame
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.writes = 0
+
+    def configure(self, status_format="text", fps=FPS):
+        self.status_format = status_format
+        self.interval = 1.0 / fps if fps > 0 else self.HEADLESS_INTERVAL
+
+    def start(self):
+        # Terminal writes (and their back-pressure) live on this thread;
+        # the event loop only swaps a reference per telemetry message
+        self.thread = threading.Thread(target=self._run, name="console-ui", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        thread, self.thread = self.thread, None
+        if thread:
+            self.wake.set()
+            thread.join(1.0)
+        self.render()
+        if self.is_tty and self.status_format == "text":
+            sys.stdout.write("\n") # Leave the status line behind
+            sys.stdout.flush()
+
+    def _run(self):
+        while self.thread is not None:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.render()
+
     def update_status(self, state):
+        self.state = state
+        if self.thread is None:
+            self.render() # Renderer not started (tools/benchmarks): draw inline
+
+    def log(self, message, record=None):
+        with self.lock:
+            self.lines.append((message, record))
+        if self.thread is None:
+            self.render()
+
+    def render(self):
+        # One write + flush per frame: queued log lines, then the status
+        # line, skipped entirely when nothing changed
+        with self.lock:
+            lines, self.lines = self.lines, []
+            if self.status_format == "json":
+                out = self._frame_json(lines)
+            elif self.is_tty:
+                out = self._frame_tty(lines)
+            else:
+                out = self._frame_text(lines)
+            if out:
+                sys.stdout.write(out)
+                sys.stdout.flush()
+                self.writes += 1
+
+    def format_status(self, state):
         # Format: [Linked] Spd: 5.0 | Inc: 1.0 | Dist: 1.25 | Time: 20:30 | Cal: 150
-        conn_str = "Linked" if state.connected_to_ifit else "Searching..."
+        conn_str = "Standby" if state.standby else "Linked" if state.connected_to_ifit else "Searching..."
         m, s = divmod(state.elapsed_time, 60)
         h, m = divmod(m, 60)
         time_str = f"{h:02d}:{m:02d}:{s:02d}"
@@ -71,7 +154,7 @@ class ConsoleUI:
         spd_mph = state.speed_kph * 0.621371
         dist_mi = (state.distance_m / 1000.0) * 0.621371
         
-        self.status_line = (
+        return (
             f"[{conn_str}] "
             f"Spd: {spd_mph:.1f}mph | "
             f"Inc: {state.incline_pct:.1f}% | "
@@ -79,46 +162,81 @@ class ConsoleUI:
             f"Time: {time_str} | "
             f"Cal: {state.calories}"
         )
-        self.refresh()
 
-    def refresh(self):
-        if self.is_tty:
-            # Interactive: Update line in place with ANSI codes
-            sys.stdout.write(f"\r\x1b[K{self.status_line}")
-            sys.stdout.flush()
-        else:
-            # Headless: Print cleanly (no control chars) and throttle (1s) to avoid log spam
-            if time.time() - self.last_print_time > 1.0:
-                 print(self.status_line, flush=True) 
-                 self.last_print_time = time.time()
-        
-    def log(self, message):
-        if self.is_tty:
-            # Clear status line
-            sys.stdout.write("\r\x1b[K")
-            # Print message (scrolled)
-            sys.stdout.write(f"{message}\n")
-            # Reprint status line
-            sys.stdout.write(self.status_line)
-            sys.stdout.flush()
-        else:
-            print(message, flush=True)
+    def _frame_tty(self, lines):
+        # Interactive: Update line in place with ANSI codes
+        if self.state is not None:
+            self.status_line = self.format_status(self.state)
+        if lines:
+            # Clear status line, print messages (scrolled), reprint status line
+            logs = "".join(f"{message}\n" for message, _ in lines)
+            self.last_status = self.status_line
+            return f"\r\x1b[K{logs}{self.status_line}"
+        if self.status_line != self.last_status:
+            self.last_status = self.status_line
+            return f"\r\x1b[K{self.status_line}"
+        return ""
+
+    def _status_due(self, status):
+        # Headless: only changed values, and at most every HEADLESS_INTERVAL
+        if status == self.last_status or time.time() - self.last_print_time < self.HEADLESS_INTERVAL:
+            return False
+        self.last_status = status
+        self.last_print_time = time.time()
+        return True
+
+    def _frame_text(self, lines):
+        # Headless: Print cleanly (no control chars)
+        out = "".join(f"{message}\n" for message, _ in lines)
+        if self.state is not None:
+            self.status_line = self.format_status(self.state)
+            if self._status_due(self.status_line):
+                out += f"{self.status_line}\n"
+        return out
+
+    def _frame_json(self, lines):
+        # JSON lines for log shippers: {"type": "log"|"status", "ts": ...}
+        out = []
+        for message, record in lines:
+            if record is None:
+                out.append(json.dumps({"type": "log", "ts": round(time.time(), 3), "msg": message}))
+            else:
+                out.append(json.dumps({"type": "log", "ts": round(record.created, 3), "level": record.levelname,
+                                       "msg": getattr(record, "message", message)}))
+        state = self.state
+        if state is not None:
+            status = {
+                "type": "status",
+                "linked": state.connected_to_ifit,
+                "standby": state.standby,
+                "speed_kph": round(state.speed_kph, 2),
+                "incline_pct": round(state.incline_pct, 1),
+                "distance_m": round(state.distance_m, 1),
+                "elapsed_s": state.elapsed_time,
+                "calories": state.calories,
+            }
+            if self._status_due(status):
+                out.append(json.dumps({**status, "ts": round(time.time(), 3)}))
+        return "".join(f"{line}\n" for line in out)
 
 ui = ConsoleUI()
 
 class ScrollingLogHandler(logging.Handler):
     def emit(self, record):
         msg = self.format(record)
-        ui.log(msg)
+        ui.log(msg, record)
 
 # Setup Logger
 logger = logging.getLogger("IFIT-FTMS")
 # Default to INFO (Hide Debug noise)
 logger.setLevel(logging.INFO) 
+logger.propagate = False # basicConfig's root handler would print every line twice
 handler = ScrollingLogHandler()
 formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S')
 handler.setFormatter(formatter)
 logger.addHandler(handler)
+# Formatting and terminal writes happen on a background thread
+log_listener = start_queue_logging(logger, [handler])
 # logging.basicConfig(level=logging.INFO)
 
 # =============================================================================
@@ -126,25 +244,17 @@ logger.addHandler(handler)
 # =============================================================================
 import os
 IFIT_DEVICE_NAME = os.environ.get("IFIT_DEVICE_NAME", "I_TL")
+# BLE adapters for the iFit client (bleak) and the FTMS server (bless).
+# Sharing one (the default) means kicking the phone off and going silent
+# while the treadmill connects; with two, both links stay up.
+IFIT_ADAPTER = os.environ.get("IFIT_ADAPTER", "hci0")
+FTMS_ADAPTER = os.environ.get("FTMS_ADAPTER", "hci0")
 UUID_TX = "00001534-1412-efde-1523-785feabcd123"
 UUID_RX = "00001535-1412-efde-1523-785feabcd123"
-POLL_CMD = bytes.fromhex("02040210041002000A13943300104010008018F2")
-
-# Handshake Steps
-HS_STEPS = [
-    ("FE02080200000000000000000000000000000000", "FF080204020402048187"),
-    ("FE02080200000000000000000000000000000000", "FF080204020404048088"),
-    ("FE02080200000000000000000000000000000000", "FF080204020404048890"),
-    ("FE020B0200000000000000000000000000000000", "FF0B020402070207820000008B"),
-    ("FE020A0200000000000000000000000000000000", "FF0A0204020602068400008C"),
-    ("FE02080200000000000000000000000000000000", "FF08020402040204959B"),
-    ("FE022C0400000000000000000000000000000000", "00120204022804289007018D68492815F0E9C0BD"),
-    ("0112A89988756079704D484948757069609D88B9", "FF08A8D5C0A0020000AD"),
-    ("FE02190300000000000000000000000000000000", "0012020402150415020E00000000000000000000"),
-    ("0000001001003A", "FF070000001001003A"),
-    ("FE02170300000000000000000000000000000000", "0012020402130413020C00000000000000000000"),
-    ("0000800000A5", "FF0500800000A5")
-]
+SCAN_TIMEOUT = 5.0 # One search round (filtered scan + full discovery), as long as the old discover()
+DISCOVER_MIN_S = 1.0 # Full discovery only if at least this much of the round is left
+DIS_SERVICE_UUID = "0000180A-0000-1000-8000-00805F9B34FB"
+DIS_FIRMWARE_UUID = "00002A26-0000-1000-8000-00805F9B34FB"
 
 # =============================================================================
 # FTMS SERVER CONSTANTS
@@ -160,6 +270,18 @@ FTMS_INCLINE_RANGE_UUID = "00002AD5-0000-1000-8000-00805F9B34FB"
 
 SERVER_NAME = "mytm"
 
+# Runtime modes (overridden from argv in __main__)
+PI_MODE = False
+MOCK_MODE = False
+recorder = None # SessionRecorder when --record is given
+REPLAY_FILE = None # Recording to replay instead of connecting (--replay)
+REPLAY_SPEED = 1.0 # 0 = as fast as possible
+SIM_MODE = False # In-memory BLE transport (--sim)
+BLUETOOTH = BleTransport(BleakClient, BleakScanner, BlessServer) # Real radio; --sim passes transport.sim_transport()
+FORCED_PROFILE = None # --profile: skip auto-selection
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 0 # 0 = no metrics endpoint
+
 # Feature Mask: 
 # Byte 0: Bits 0-7. 0x62 = (Bit 1: Total Dist, Bit 5: Inclination, Bit 6: Stop/Pause)
 # Byte 1: Bits 8-15. 0x11 = (Bit 8: Expended Energy, Bit 12: Elapsed Time)
@@ -180,19 +302,131 @@ class BridgeState:
         self.ftms_client_connected = False
         self.ftms_last_activity_time = time.time()  # Initialize to now, not 0
         self.pause_hci_monitor = False  # Pause hcitool while scanning/connecting to iFit
-        self.control_queue = asyncio.Queue()
+        self.handoff_requested = False  # Phone was kicked so iFit can connect (D-Bus monitor)
+        self.standby = False  # Link up, no app: keepalive polls only, telemetry not forwarded
+        self.ifit_wakeup = asyncio.Event()  # Set when a phone shows up
+        self.ifit_address = None
         self.last_notify_time = time.time()
         self.response_queue = asyncio.Queue()
         self.last_ftms_payload = None
-        self.last_ftms_payload = None
         self.last_update_ts = 0
         self.initial_t_raw = None
         self.initial_cal_raw = None
         self.target_speed_kph = 0.0 # For echo strategy
         self.target_incline_pct = 0.0 # For echo strategy
+        self.control_latency = LatencyHistogram("FTMS->iFit control")
+        self.send_time = LatencyHistogram("iFit send")
+        self.handshake_time = LatencyHistogram("iFit handshake", buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0))
+        self.unlock_time = LatencyHistogram("iFit scan->unlocked", buckets=(1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0))
+        self.ifit_responses = ResponseWaiter()
+        self.scan_time = LatencyHistogram("iFit scan", buckets=(0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0))
+        self.connect_time = LatencyHistogram("iFit connect", buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0))
+        # Connect -> first decoded status, split by whether service discovery was skipped
+        self.first_telemetry = {
+            kind: LatencyHistogram(f"connect->telemetry ({kind} GATT)", buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0))
+            for kind in ("cached", "discovered")
+        }
+        self.first_telemetry_pending = None  # (perf_counter at connect start, kind)
+        self.pipeline = None # TelemetryPipeline of the current iFit link
+        self.commands_sent = 0
+        self.watchdog_reconnects = 0
+        self.pacer = None # ChunkPacer for the current link (set on connect)
+        self.gatt_refresh = None # refresh_gatt_cache task of the current link
+        self.profile = profiles.default # Treadmill model profile (see profiles.py)
 
 state = BridgeState()
 
+# =============================================================================
+# CONTROL SCHEDULER
+# =============================================================================
+# Poll cadence while telemetry is flowing vs. when it has gone quiet.
+POLL_INTERVAL = 0.2
+POLL_INTERVAL_STALE = 0.05
+TELEMETRY_FRESH_S = 1.0
+WATCHDOG_S = 5.0 # Telemetry silence that counts as a dead link
+
+# Warm standby (--warm-standby): keep the unlocked link up between workouts,
+# so a phone only waits for the FTMS side. Lazy mode drops it after LAZY_IDLE_S.
+WARM_STANDBY = False
+STANDBY_POLL_INTERVAL = 2.0 # Keepalive poll while no app is connected
+STANDBY_IDLE_S = 0.0 # Give the link up after this long without an app (0 = never)
+STANDBY_RESCAN_S = 30.0 # Treadmill not found while in standby: look again this often
+LAZY_IDLE_S = 60.0
+
+def standby_wanted(now=None):
+    # Connect without waiting for a phone? Lapses once the idle policy runs out.
+    if not (WARM_STANDBY and PI_MODE):
+        return False
+    idle = (now or time.time()) - state.ftms_last_activity_time
+    return not STANDBY_IDLE_S or idle < STANDBY_IDLE_S
+
+def telemetry_window():
+    # How long telemetry may stay quiet before it counts as stale
+    return TELEMETRY_FRESH_S + (STANDBY_POLL_INTERVAL if state.standby else 0.0)
+
+class ControlScheduler:
+    """Wakes the iFit loop as soon as a control command arrives or a poll is due.
+
+    Commands are held in one latest-wins slot per command type, so a sweep of
+    incline writes collapses to the newest target before anything is serialized.
+    """
+
+    def __init__(self):
+        self.slots = {} # cmd_type -> (value, submitted)
+        self.wakeup = asyncio.Event()
+        self.last_poll_time = 0.0
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, cmd_type, value):
+        # Timestamp on arrival so the loop can measure FTMS write -> iFit write.
+        # A coalesced write keeps the oldest waiting write's time.
+        self.submitted += 1
+        pending = self.slots.get(cmd_type)
+        if pending is not None:
+            self.coalesced += 1
+            self.slots[cmd_type] = (value, pending[1])
+        else:
+            self.slots[cmd_type] = (value, time.perf_counter())
+        self.wakeup.set()
+
+    def has_commands(self):
+        return bool(self.slots)
+
+    def pop_command(self):
+        # Oldest pending type first; its value is always the newest target
+        cmd_type = next(iter(self.slots))
+        value, submitted = self.slots.pop(cmd_type)
+        return cmd_type, value, submitted
+
+    def mark_polled(self):
+        self.last_poll_time = time.time()
+
+    def poll_delay(self, now=None):
+        # Fresh telemetry: keep the normal cadence. Stale: re-poll quickly to recover.
+        # Standby: keepalive cadence only.
+        now = now or time.time()
+        fresh = (now - state.last_notify_time) < telemetry_window()
+        if not fresh:
+            interval = POLL_INTERVAL_STALE
+        else:
+            interval = STANDBY_POLL_INTERVAL if state.standby else POLL_INTERVAL
+        return max(0.0, self.last_poll_time + interval - now)
+
+    async def wait(self):
+        if self.has_commands():
+            return
+        delay = self.poll_delay()
+        if delay <= 0:
+            return
+        self.wakeup.clear()
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+scheduler = ControlScheduler()
+
 # =============================================================================
 # CONSTANTS & PROTOCOL
 # =============================================================================
@@ -205,213 +439,454 @@ TYPE_INCLINE = 0x02
 # HELPER FUNCTIONS
 # =============================================================================
 def create_control_command(type_id, value):
-    if type_id == TYPE_SPEED:
-         # Machine expects KPH (0.01 unit).
-         # FTMS sends KPH (0.01 unit).
-         # Pass raw value.
-         # 4.8 KPH (480) -> Machine (480) -> 3.0 MPH (Console) / 4.8 KPH.
-         
-         # 020402090409020101VVVV00CS
-         base = bytearray.fromhex("020402090409020101")
-         base.extend(struct.pack('<H', int(value)))
-         base.extend(bytes([0x00]))
-         cs = sum(base[4:]) & 0xFF
-         base.append(cs)
-         return base
-    elif type_id == TYPE_INCLINE:
-         # 020402090409020102VVVV00CS
-         base = bytearray.fromhex("020402090409020102")
-         base.extend(struct.pack('<H', int(value))) # Scale 100
-         base.extend(bytes([0x00]))
-         cs = sum(base[4:]) & 0xFF
-         base.append(cs)
-         return base
-    return b''
-
-async def send_chunked_robust(client, payload, char_obj=None):
-    total_len = len(payload)
-    chunks = []
-    data_slices = [payload[i:i+18] for i in range(0, total_len, 18)]
-    total_chunks = 1 + len(data_slices)
-    
-    header = bytearray([0xFE, 0x02, total_len, total_chunks]) + b'\x00'*16
-    chunks.append(header)
-    
-    for i, chunk in enumerate(data_slices):
-        seq = 0xFF if i == len(data_slices)-1 else i
-        chunks.append(bytearray([seq, len(chunk)]) + chunk)
-        
-    for pkt in chunks:
-        target = char_obj if char_obj else UUID_TX
-        await client.write_gatt_char(target, pkt)
-        await asyncio.sleep(0.1) # SLOWER: 0.02 -> 0.1 for stability
+    # Machine expects KPH (0.01 unit), same as FTMS, and incline x100.
+    # Layout comes from the treadmill profile, e.g. 020402090409020101VVVV00CS
+    return state.profile.encode_control(type_id, value)
 
-async def robust_handshake(client, write_char):
+def control_packets(type_id, value):
+    # The same command, already framed (precomputed per profile). FTMS
+    # targets are range-checked on arrival (Profile.accepts); a value the
+    # layout can't hold still gets here if the profile switched in between,
+    # and is dropped rather than taking the link down.
+    try:
+        return state.profile.codec.packets(type_id, value)
+    except struct.error:
+        logger.warning(f"Control value out of range for {state.profile.name}: type={type_id} value={value}. Dropped.")
+        return ()
+
+def apply_profile(profile, reason):
+    if profile is state.profile:
+        return
+    logger.info(f"Treadmill profile: {profile.name} ({reason})")
+    state.profile = profile
+    if state.pipeline:
+        state.pipeline.status_decoder.set_layout(profile.status)
+
+def initial_profile(address, name):
+    # Before the handshake: forced, remembered for this treadmill, or by name
+    if FORCED_PROFILE:
+        return profiles.get(FORCED_PROFILE), "forced"
+    cached = profiles.get(device_cache.get(address).get("profile"))
+    if cached:
+        return cached, "cached"
+    return profiles.select(name=name), "name"
+
+# =============================================================================
+# CHUNK PACING
+# =============================================================================
+PACING_MIN_GAP = 0.01
+PACING_START_GAP = 0.02
+PACING_MAX_GAP = 0.1 # Old fixed value, known stable on every unit we have seen
+PACING_STABLE_SENDS = 50
+
+class ChunkPacer:
+    """Per-device inter-chunk gap. Starts fast, backs off on write errors or
+    telemetry stalls, and remembers the fastest gap that stayed clean.
+
+    A write without response never fails, even when the chunk is lost, so
+    only acknowledged writes count as clean and a stall is treated like a
+    write error: back to acknowledged writes, saved gap forgotten."""
+
+    def __init__(self, address=None, cache=device_cache):
+        self.address = address
+        self.cache = cache
+        saved = cache.get(address).get("chunk_gap") if address else None
+        self.stable_gap = saved
+        self.gap = saved or PACING_START_GAP
+        self.clean_sends = 0
+        self.response = True # Write-with-response until the char says otherwise
+
+    def configure(self, char_obj):
+        props = getattr(char_obj, "properties", None) or []
+        if "write-without-response" in props and not self.cache.get(self.address).get("needs_response"):
+            self.response = False
+        logger.info(f"Chunk pacing: gap={self.gap*1000:.0f}ms response={self.response}")
+
+    def on_success(self):
+        self.clean_sends += 1
+        if self.clean_sends < PACING_STABLE_SENDS:
+            return
+        self.clean_sends = 0
+        if self.response and (self.stable_gap is None or self.gap < self.stable_gap):
+            self.stable_gap = self.gap
+            self.save()
+        # Probe a little faster; a failure sends us straight back
+        self.gap = max(PACING_MIN_GAP, self.gap * 0.8)
+
+    def on_failure(self):
+        if not self.response:
+            # Fall back to acknowledged writes before slowing down
+            self.response = True
+            self.cache.update(self.address, needs_response=True)
+        elif self.stable_gap is not None and self.gap <= self.stable_gap:
+            self.stable_gap = None # That gap was not as stable as we thought
+            self.cache.update(self.address, chunk_gap=None) # Don't reload it next connect
+        self.gap = min(PACING_MAX_GAP, self.gap * 2)
+        self.clean_sends = 0
+        logger.debug("Chunk pacing backoff: gap=%.0fms", self.gap * 1000)
+
+    def on_stall(self):
+        # Called on every loop pass while telemetry is stale; acts once per change
+        if not self.response:
+            self.response = True
+            self.cache.update(self.address, needs_response=True)
+            logger.info("Chunk pacing: telemetry stalled, back to write-with-response")
+        if self.stable_gap is not None:
+            self.stable_gap = None
+            self.cache.update(self.address, chunk_gap=None)
+        if self.gap < PACING_MAX_GAP:
+            self.gap = min(PACING_MAX_GAP, self.gap * 2)
+            logger.debug("Chunk pacing stall backoff: gap=%.0fms", self.gap * 1000)
+        self.clean_sends = 0
+
+    def save(self):
+        if self.address and self.stable_gap is not None:
+            self.cache.update(self.address, chunk_gap=round(self.stable_gap, 4))
+
+state.pacer = ChunkPacer()
+
+async def send_packets(client, packets, char_obj=None):
+    pacer = state.pacer
+    target = char_obj if char_obj else UUID_TX
+    start = time.perf_counter()
+    for pkt in packets:
+        try:
+            await client.write_gatt_char(target, pkt, response=pacer.response)
+        except Exception:
+            pacer.on_failure()
+            raise
+        await asyncio.sleep(pacer.gap)
+    pacer.on_success()
+    state.send_time.record(time.perf_counter() - start)
+
+async def robust_handshake(client, write_char, name=None):
     logger.info("Performing Robust Handshake...")
-    # Using init commands from read_telemetry.py logic
-    CMD_1 = bytes.fromhex("0204020402048187")
-    CMD_2 = bytes.fromhex("0204020404048088")
-    CMD_3 = bytes.fromhex("0204020404048890")
-    CMD_4 = bytes.fromhex("020402070207820000008B")
-    CMD_5 = bytes.fromhex("0204020602068400008C")
-    CMD_6 = bytes.fromhex("020402040204959B")
-    CMD_7 = bytes.fromhex("0204022804289007018D68492815F0E9C0BDA89988756079704D484948757069609D88B9A8D5C0A0020000AD")
-    CMD_8 = bytes.fromhex("020402150415020E000000000000000000000000001001003A")
-    CMD_9 = bytes.fromhex("020402130413020C0000000000000000000000800000A5")
+    # Pre-framed steps from the treadmill profile; each one advances as soon
+    # as the treadmill echoes its command byte (status messages don't count),
+    # or after the step's fallback wait. The capabilities reply may switch profiles: the rest of the
+    # handshake then comes from the new one.
+    responses = state.ifit_responses
+    start = time.perf_counter()
+    timings = []
+    acked = 0
+    steps = state.profile.handshake
+    i = 0
+    while i < len(steps):
+        step = steps[i]
+        i += 1
+        step_start = time.perf_counter()
+        reply = responses.expect(step.command, step.accepts)
+        msg = None
+        try:
+            await send_packets(client, step.packets, write_char)
+            msg = await asyncio.wait_for(reply, step.timeout)
+            acked += 1
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            responses.discard(step.command)
+        timings.append(f"{step.command:02X}={(time.perf_counter() - step_start) * 1000:.0f}")
+        if step.command == CAPABILITIES_COMMAND and msg and not FORCED_PROFILE:
+            codes = capability_codes(msg)
+            logger.debug("Capabilities: %s", codes.hex())
+            apply_profile(profiles.select(name, codes), f"capabilities {codes.hex()}")
+            if state.profile.handshake is not steps:
+                steps = state.profile.handshake
+                i = next((n + 1 for n, s in enumerate(steps) if s.command == CAPABILITIES_COMMAND), 0)
+    elapsed = time.perf_counter() - start
+    state.handshake_time.record(elapsed)
+    trace(tracing.HANDSHAKE, acked, elapsed)
+    logger.info(f"Handshake: {elapsed * 1000:.0f}ms, {acked}/{len(timings)} acked")
+    logger.debug(f"Handshake steps (ms): {' '.join(timings)}")
+
+async def ifit_session_loop(client, write_char):
+    # Runs while the unlocked link is up. Control commands go out first,
+    # polls fill the gaps, and the scheduler wakes us for whichever is due.
+    while client.is_connected:
+        current_time = time.time()
+        
+        # --- STANDBY ---
+        standby = WARM_STANDBY and PI_MODE and not state.ftms_client_connected
+        if standby != state.standby:
+            state.standby = standby
+            if standby:
+                logger.info(f"💤 Warm standby: no FTMS app, keepalive poll every {STANDBY_POLL_INTERVAL:g}s")
+            else:
+                # New workout on the same link: baselines restart like on a fresh connect
+                logger.info("📲 Leaving warm standby")
+                state.initial_t_raw = None
+                state.initial_cal_raw = None
+
+        # --- DISCONNECT CHECK ---
+        if not state.ftms_client_connected and PI_MODE:
+            idle_time = current_time - state.ftms_last_activity_time
+            idle_limit = STANDBY_IDLE_S if WARM_STANDBY else LAZY_IDLE_S
+            if idle_limit and idle_time > idle_limit:
+                logger.info(f"💤 Idle for {idle_time:.1f}s. Disconnecting from iFit to save power.")
+                break
+        
+        # 1. Process Commands (Priority over polls)
+        command_count = 0
+        command_sent = False
+        while scheduler.has_commands() and command_count < 5:
+            cmd_type, val, submitted = scheduler.pop_command()
+            packets = control_packets(cmd_type, val)
+            if packets:
+                logger.debug("Sending Command: Type=%s Val=%s", cmd_type, val)
+                trace(tracing.COMMAND_TX, cmd_type, val)
+                try:
+                    await send_packets(client, packets, write_char)
+                    state.control_latency.record(time.perf_counter() - submitted)
+                    state.commands_sent += 1
+                    command_sent = True
+                    command_count += 1
+                except Exception as e:
+                    logger.error(f"Command Send Error: {e}")
+                    break 
+        if not client.is_connected: break
+
+        # 2. Poll (when due, or if telemetry went quiet despite commands)
+        stale = time.time() - state.last_notify_time > telemetry_window()
+        if stale:
+            state.pacer.on_stall()
+        if (not command_sent and scheduler.poll_delay() <= 0) or stale:
+             trace(tracing.POLL_TX)
+             try:
+                await send_packets(client, state.profile.poll_packets, write_char)
+                scheduler.mark_polled()
+             except Exception as e:
+                logger.error(f"Poll Write Error: {e}")
+                break
+        
+        # 3. Watchdog Check
+        stall_limit = WATCHDOG_S + (STANDBY_POLL_INTERVAL if state.standby else 0.0)
+        if time.time() - state.last_notify_time > stall_limit:
+             logger.warning(f"Watchdog: Telemetry Stalled > {stall_limit:g}s. Reconnecting...")
+             state.watchdog_reconnects += 1
+             trace(tracing.WATCHDOG, time.time() - state.last_notify_time)
+             tracer.dump("watchdog")
+             break
+             
+        # 4. Sleep until a command arrives or the next poll is due
+        await scheduler.wait()
+
+# GATT cache: per device {"service", "tx_handle", "rx_handle", "firmware"}.
+# With an entry, BleakClient resolves only the iFit service (plus Device
+# Information for the firmware check), and the first connect attempt lets
+# bleak reuse the service tree it built on an earlier connect in this run
+# instead of waiting for BlueZ's ServicesResolved (dangerous_use_bleak_cache).
+# That wait is the discovery a reconnect still pays; BlueZ's own attribute
+# cache already spares the over-the-air part. The handles are compared with
+# what comes back to catch a layout that moved; a mismatch drops the entry.
+def gatt_services(gatt):
+    return [gatt["service"], DIS_SERVICE_UUID] if gatt else None
+
+def gatt_matches(gatt, write_char, notify_char):
+    return (write_char is not None and notify_char is not None
+            and write_char.handle == gatt.get("tx_handle")
+            and notify_char.handle == gatt.get("rx_handle"))
+
+@contextlib.asynccontextmanager
+async def ifit_connection(client, cached_services=False):
+    # `async with client` connects without options: this passes the cache flag
+    await client.connect(dangerous_use_bleak_cache=cached_services)
+    try:
+        yield client
+    finally:
+        await client.disconnect()
+
+async def refresh_gatt_cache(client, address, gatt, write_char, notify_char):
+    # Runs beside the handshake: a firmware update may move handles, so the
+    # entry is rewritten whenever the revision differs from the cached one.
+    firmware = None
+    try:
+        if client.services.get_characteristic(DIS_FIRMWARE_UUID):
+            firmware = (await client.read_gatt_char(DIS_FIRMWARE_UUID)).decode(errors="replace").strip("\x00 ")
+    except Exception as e:
+        logger.debug(f"Firmware revision read failed: {e}")
+    if gatt and gatt.get("firmware") == firmware:
+        return
+    if gatt:
+        logger.info(f"Treadmill firmware changed ({gatt.get('firmware')} -> {firmware}). Refreshing GATT cache.")
+    if notify_char is None:
+        return
+    device_cache.update(address, gatt={
+        "service": write_char.service_uuid,
+        "tx_handle": write_char.handle,
+        "rx_handle": notify_char.handle,
+        "firmware": firmware,
+    })
+
+async def find_ifit_device(use_cache=True, scanner=BleakScanner):
+    # Returns (device or address, rssi, source). The MAC never changes, so
+    # the cached address skips scanning entirely; BlueZ/bleak resolve it
+    # on connect.
+    if use_cache:
+        address = device_cache.last_address(IFIT_DEVICE_NAME)
+        if address:
+            return address, 0, "cache"
     
-    cmds = [CMD_1, CMD_2, CMD_3, CMD_4, CMD_5, CMD_6, CMD_7, CMD_8, CMD_9]
+    # Stops as soon as the treadmill advertises
+    seen = {}
+    def match(d, adv):
+        if d.name == IFIT_DEVICE_NAME or adv.local_name == IFIT_DEVICE_NAME:
+            seen["rssi"] = adv.rssi
+            return True
+        return False
+    deadline = time.monotonic() + SCAN_TIMEOUT
+    device = await scanner.find_device_by_filter(match, timeout=SCAN_TIMEOUT, adapter=IFIT_ADAPTER)
+    if device:
+        return device, seen.get("rssi", 0), "filter"
     
-    for cmd in cmds:
-        await send_chunked_robust(client, cmd, write_char)
-        if cmd == CMD_7 or cmd == CMD_8:
-            await asyncio.sleep(0.5)
-        elif cmd == CMD_9:
-            await asyncio.sleep(1.0)
-        else:
-            await asyncio.sleep(0.1)
+    # Last resort: full discovery (Handoff Strategy clears the air for this), in
+    # what the filtered scan left of the round. A filtered scan that ran its full
+    # time already saw every advertiser, so a treadmill that's off costs one
+    # SCAN_TIMEOUT per round, not a filtered scan plus a discover()
+    remaining = deadline - time.monotonic()
+    if remaining < DISCOVER_MIN_S:
+        return None, 0, None
+    devices_map = await scanner.discover(timeout=remaining, return_adv=True, adapter=IFIT_ADAPTER)
+    target_entry = next((e for e in devices_map.values() if e[0].name == IFIT_DEVICE_NAME), None)
+    if target_entry:
+        return target_entry[0], target_entry[1].rssi, "scan"
+    return None, 0, None
 
-class PacketReassembler:
+class TelemetryPipeline:
+    # UUID_RX notification handler: chunks -> message -> BridgeState -> FTMS.
+    # Shared by the real iFit client and the replay client.
     def __init__(self):
-        self.buffer = bytearray()
-        self.in_progress = False
-
-    def process_chunk(self, data):
-        if not data: return []
-        messages = []
-        seq = data[0]
-        if seq == 0xFE:
-            self.buffer = bytearray()
-            self.in_progress = True
-        elif seq == 0xFF:
-            if self.in_progress:
-                chunk_len = data[1]
-                self.buffer.extend(data[2:2+chunk_len])
-                messages.append(bytes(self.buffer))
-                self.in_progress = False
-        else:
-            if self.in_progress:
-                chunk_len = data[1]
-                self.buffer.extend(data[2:2+chunk_len])
-        return messages
+        self.reassembler = PacketReassembler()
+        self.status_decoder = StatusDecoder(state.profile.status)
 
-async def ifit_client_loop(server: BlessServer):
-    reassembler = PacketReassembler()
-    
-    def decode_telemetry(sender, data):
+    def decode_telemetry(self, sender, data):
         try:
              # Feed Watchdog
              state.last_notify_time = time.time()
+             if recorder: recorder.record(IFIT_RX, data)
+             trace(tracing.CHUNK_RX, len(data), data[0] if data else None)
              
-             for payload in reassembler.process_chunk(data):
-                if len(payload) < 30 or payload[3] != 0x2F: continue
-                
-                # Divide by 100 for units
-                s_raw = struct.unpack_from('<H', payload, 8)[0]
-                i_raw = struct.unpack_from('<H', payload, 10)[0]
-                
-                # Update State
-                # Update State
-                # Echo Strategy: Use Target Speed if set, to prevent Ramping Timeout.
-                # If Target > 0, report Target. Else report Actual.
-                
-                # Actual (Machine reports KPH x100)
-                actual_kph = s_raw / 100.0
-                
-                if state.target_speed_kph > 0:
-                    state.speed_kph = state.target_speed_kph
-                else:
-                    state.speed_kph = actual_kph
-
-                state.incline_pct = i_raw / 100.0
-                
-                # Distance Strategy: Force Calculation (Integration)
-                # Machine Distance (Offset 42) is often stuck/static in Remote Mode.
-                # We calculate distance based on Speed * Time to ensure App sees progress.
-                current_time = time.time()
-                if hasattr(state, 'last_calc_time'):
-                    dt = current_time - state.last_calc_time
-                    if dt > 0 and dt < 2.0: 
-                        m_per_s = (state.speed_kph * 1000) / 3600.0
-                        state.distance_m += (m_per_s * dt)
-                state.last_calc_time = current_time
-
-                # Optional: Log Machine Distance for debug, but don't use it
-                # if len(payload) >= 46:
-                #     d_raw = struct.unpack_from('<I', payload, 42)[0]
+             payload = self.reassembler.process_chunk(data)
+             if payload is None: return
+             trace(tracing.MSG_DECODED, len(payload), payload[6] if len(payload) > 6 else None)
+             state.ifit_responses.feed(payload)
+             rec = self.status_decoder.decode(payload)
+             if rec is None: return
+             if state.first_telemetry_pending:
+                 since, kind = state.first_telemetry_pending
+                 state.first_telemetry_pending = None
+                 state.first_telemetry[kind].record(time.perf_counter() - since)
+             if state.standby:
+                 return # Keepalive answer: the link is alive, nobody to forward it to
+             
+             # Echo Strategy: Use Target Speed if set, to prevent Ramping Timeout.
+             # If Target > 0, report Target. Else report Actual (Machine reports KPH x100).
+             if state.target_speed_kph > 0:
+                 state.speed_kph = state.target_speed_kph
+             else:
+                 state.speed_kph = rec.speed_kph
 
-                
-                # Time (Offset 27)
-                if len(payload) >= 31:
-                     t_raw = struct.unpack_from('<I', payload, 27)[0]
-                     if state.initial_t_raw is None: state.initial_t_raw = t_raw
-                     if t_raw < state.initial_t_raw: state.initial_t_raw = t_raw # Handle wrap/reset
-                     state.elapsed_time = t_raw - state.initial_t_raw
-                    
-                # Calories
-                if len(payload) >= 35:
-                     cal_raw = struct.unpack_from('<I', payload, 31)[0]
-                     if state.initial_cal_raw is None: state.initial_cal_raw = cal_raw
-                     if cal_raw < state.initial_cal_raw: state.initial_cal_raw = cal_raw
-                     state.calories = int((cal_raw - state.initial_cal_raw) / 97656.0) 
-                
-                # Notify FTMS (Fire and Forget)
-                asyncio.create_task(update_ftms(server))
-                
-                # Update Console UI
-                ui.update_status(state)
+             state.incline_pct = rec.incline_pct
+             
+             # Distance Strategy: Force Calculation (Integration)
+             # Machine Distance (Offset 42) is often stuck/static in Remote Mode.
+             # We calculate distance based on Speed * Time to ensure App sees progress.
+             current_time = time.time()
+             if hasattr(state, 'last_calc_time'):
+                 dt = current_time - state.last_calc_time
+                 if dt > 0 and dt < 2.0: 
+                     m_per_s = (state.speed_kph * 1000) / 3600.0
+                     state.distance_m += (m_per_s * dt)
+             state.last_calc_time = current_time
+             
+             # Time (Offset 27)
+             t_raw = rec.elapsed_s
+             if state.initial_t_raw is None: state.initial_t_raw = t_raw
+             if t_raw < state.initial_t_raw: state.initial_t_raw = t_raw # Handle wrap/reset
+             state.elapsed_time = t_raw - state.initial_t_raw
+                 
+             # Calories (Offset 31)
+             cal_raw = rec.calories_raw
+             if state.initial_cal_raw is None: state.initial_cal_raw = cal_raw
+             if cal_raw < state.initial_cal_raw: state.initial_cal_raw = cal_raw
+             state.calories = int((cal_raw - state.initial_cal_raw) / self.status_decoder.layout.calorie_divisor)
+             
+             # Wake the FTMS notifier
+             notifier.kick()
+             
+             # Update Console UI
+             ui.update_status(state)
         except Exception as e:
-             logger.error(f"Decode Error: {e}")
+             logger.error("Decode Error: %s", e)
+
+    def stats(self):
+        return f"{self.reassembler.stats()} checksum_errors={self.status_decoder.checksum_errors}"
 
-    logger.info("Starting iFit Client Loop (Lazy Mode - Handoff Strategy)...")
+async def ifit_client_loop(server: BlessServer, ble=BLUETOOTH):
+    pipeline = TelemetryPipeline()
+    state.pipeline = pipeline
+    decode_telemetry = pipeline.decode_telemetry
+    
+    mode = "Warm Standby" if WARM_STANDBY and PI_MODE else "Lazy Mode"
+    if split_adapters():
+        logger.info(f"Starting iFit Client Loop ({mode} - iFit on {IFIT_ADAPTER}, FTMS on {FTMS_ADAPTER})...")
+    else:
+        logger.info(f"Starting iFit Client Loop ({mode} - Handoff Strategy)...")
+    skip_cache = False
     while True:
         try:
-            # 0. LAZY WAIT: Only proceed if FTMS Client is connected (or Handoff Signaled)
-            if not state.ftms_client_connected and PI_MODE:
+            # 0. LAZY WAIT: Only proceed if FTMS Client is connected (or Handoff Signaled),
+            # unless warm standby wants the link up anyway
+            if not (state.ftms_client_connected or state.handoff_requested or standby_wanted()) and PI_MODE:
                 # Wait for client...
-                await asyncio.sleep(1.0)
+                state.ifit_wakeup.clear()
+                try:
+                    await asyncio.wait_for(state.ifit_wakeup.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
                 continue
+            state.handoff_requested = False # One connect cycle per handoff
             
             # 1. Discovery - PAUSE HCI MONITOR TO AVOID BLUEZ CONTENTION
             state.pause_hci_monitor = True
             
             # SILENCE PHASE: Stop Advertising so phone cannot reconnect while we are busy
-            if PI_MODE:
+            # (shared adapter only; a second adapter keeps the FTMS side untouched)
+            if PI_MODE and not split_adapters():
                 try:
                     logger.info("🤫 Stopping Advertising (Silence Phase via hciconfig)...")
                     # bless doesn't expose stop_advertising for BlueZ, use system tool
-                    import subprocess
-                    subprocess.run(["sudo", "hciconfig", "hci0", "noleadv"], check=False)
+                    await hci.run("sudo", "hciconfig", FTMS_ADAPTER, "noleadv")
                     await asyncio.sleep(0.5) 
                 except Exception as adv_e:
                     logger.warning(f"Failed to stop advertising: {adv_e}")
             
-            # Use Standard Scanning (Handoff Strategy clears the air for this)
-            if PI_MODE:
-                 devices_map = await BleakScanner.discover(return_adv=True)
-                 target_entry = next((e for e in devices_map.values() if e[0].name == IFIT_DEVICE_NAME), None)
-                 device = target_entry[0] if target_entry else None
-                 rssi = target_entry[1].rssi if target_entry else 0
-            else:
-                 devices = await BleakScanner.discover()
-                 device = next((d for d in devices if d.name == IFIT_DEVICE_NAME), None)
-                 rssi = getattr(device, 'rssi', 0) if device else 0
+            # Cached address first, then a scan that stops at the first match
+            scan_start = time.perf_counter()
+            device, rssi, source = await find_ifit_device(use_cache=not skip_cache, scanner=ble.scanner)
+            state.scan_time.record(time.perf_counter() - scan_start)
             
             if device:
-                # Get address - device is BLEDevice object
-                device_address = device.address
-                device_name = device.name
+                # BLEDevice from a scan, or the cached address string
+                device_address = device if isinstance(device, str) else device.address
+                device_name = IFIT_DEVICE_NAME if isinstance(device, str) else device.name
+                state.ifit_address = device_address
+                # Cached GATT layout: resolve only the services we use (none if the
+                # last fast-path attempt failed)
+                gatt = None if skip_cache else device_cache.get(device_address).get("gatt")
+                # A cached address that fails to connect gets a real scan next round
+                skip_cache = source == "cache"
                 
                 if PI_MODE:
-                    logger.info(f"Found iFit Device: {device_name} (RSSI: {rssi})")
+                    logger.info(f"Found iFit Device: {device_name} via {source} in "
+                                f"{(time.perf_counter() - scan_start) * 1000:.0f}ms (RSSI: {rssi})")
                     if rssi < -80 and rssi != 0:
                          logger.warning(f"⚠️ Weak Signal ({rssi} dBm). Move Pi closer to Treadmill!")
                 
                 # PRE-EMPTIVE ZOMBIE KILLER (Targeted)
                 if PI_MODE:
                      try:
-                         import subprocess
                          # Check if we are already 'physically' connected to the treadmill (Zombie)
-                         proc = subprocess.run(["sudo", "hcitool", "con"], capture_output=True, text=True)
+                         proc = await hci.run("sudo", "hcitool", "-i", IFIT_ADAPTER, "con", shared=True)
                          if device_address in proc.stdout:
                              # Parse handle. fmt: "> LE 61:36:1D:64:12:F3 handle 2 state 1 lm SLAVE"
                              # We look for the line with our MAC
@@ -422,9 +897,10 @@ async def ifit_client_loop(server: BlessServer):
                                          idx = parts.index('handle')
                                          handle = parts[idx+1]
                                          logger.warning(f"🧟 Zombie Detected ({device_address} hdl={handle}). Surgically removing...")
-                                         # Fix Race: Stop Adv BEFORE disconnecting
-                                         subprocess.run(["sudo", "hciconfig", "hci0", "noleadv"], check=False)
-                                         subprocess.run(["sudo", "hcitool", "ledc", handle], check=False)
+                                         # Fix Race: Stop Adv BEFORE disconnecting (shared adapter)
+                                         if not split_adapters():
+                                             await hci.run("sudo", "hciconfig", FTMS_ADAPTER, "noleadv")
+                                         await hci.run("sudo", "hcitool", "-i", IFIT_ADAPTER, "ledc", handle)
                                          await asyncio.sleep(1.5) # Wait for controller to update
                                      except: pass
                      except Exception as e:
@@ -432,100 +908,104 @@ async def ifit_client_loop(server: BlessServer):
 
                 # INNER RETRY LOOP - Skip rescan on timeout, retry with same device
                 for attempt in range(3):
+                    connect_start = time.perf_counter()
                     try:
-                        # FAIL FAST: 10s timeout
-                        async with BleakClient(device, timeout=10.0, disconnected_callback=lambda c: logger.warning("⚠️ iFit Link Lost (Callback)")) as client:
+                        # FAIL FAST: 10s timeout. Cached service tree on the first attempt only:
+                        # a retry always waits for BlueZ to resolve services afresh
+                        client = ble.client(device, services=gatt_services(gatt), timeout=10.0, adapter=IFIT_ADAPTER, disconnected_callback=lambda c: logger.warning("⚠️ iFit Link Lost (Callback)"))
+                        async with ifit_connection(client, cached_services=bool(gatt) and attempt == 0):
                             state.connected_to_ifit = True
+                            state.connect_time.record(time.perf_counter() - connect_start)
+                            skip_cache = False
                             state.initial_t_raw = None
                             state.initial_cal_raw = None
                             logger.info(f"Connected to iFit Treadmill (Attempt {attempt+1})")
+                            trace(tracing.CONNECT, attempt + 1)
                             
                             write_char = client.services.get_characteristic(UUID_TX)
+                            notify_char = client.services.get_characteristic(UUID_RX)
+                            if gatt and not gatt_matches(gatt, write_char, notify_char):
+                                logger.warning("GATT cache mismatch. Invalidating and rediscovering...")
+                                device_cache.update(device_address, gatt=None)
+                                state.connected_to_ifit = False
+                                break  # Break inner loop, rescan (full discovery)
                             if not write_char:
                                 logger.error(f"Could not find Write Char {UUID_TX}")
                                 state.connected_to_ifit = False
                                 break  # Break inner loop, rescan
 
-                            await client.start_notify(UUID_RX, decode_telemetry)
-                            await robust_handshake(client, write_char)
-                            logger.info("Handshake Complete. Loop Active.")
+                            device_cache.update(device_address, name=device_name, last_seen=int(time.time()))
+                            state.gatt_refresh = asyncio.create_task(
+                                refresh_gatt_cache(client, device_address, gatt, write_char, notify_char))
+                            state.first_telemetry_pending = (connect_start, "cached" if gatt else "discovered")
+                            state.pacer = ChunkPacer(device_address)
+                            state.pacer.configure(write_char)
+                            apply_profile(*initial_profile(device_address, device_name))
+
+                            await client.start_notify(notify_char or UUID_RX, decode_telemetry)
+                            await robust_handshake(client, write_char, device_name)
+                            if device_cache.get(device_address).get("profile") != state.profile.name:
+                                device_cache.update(device_address, profile=state.profile.name)
+                            state.unlock_time.record(time.perf_counter() - scan_start) # Scan included
+                            logger.info(f"Handshake Complete. Loop Active. ({state.unlock_time.summary()})")
                             
                             # RESUME HCI MONITOR - Connection established
                             state.pause_hci_monitor = False
+                            state.ftms_last_activity_time = time.time() # Idle timer starts once unlocked
                             
                             # WAKE UP PHASE: Restart Advertising so phone can reconnect
-                            if PI_MODE:
+                            if PI_MODE and not split_adapters():
                                 logger.info("⏳ Stabilizing Link (Wait 3s)...")
                                 await asyncio.sleep(3.0) 
                                 try:
                                     logger.info("📢 Restarting Advertising (hciconfig leadv 0)...")
-                                    import subprocess
-                                    subprocess.run(["sudo", "hciconfig", "hci0", "leadv", "0"], check=False)
+                                    await hci.run("sudo", "hciconfig", FTMS_ADAPTER, "leadv", "0")
                                 except Exception as adv_e:
                                     logger.warning(f"Failed to start advertising: {adv_e}")
                             
                             # Connection Loop
-                            while client.is_connected:
-                                current_time = time.time()
-                                
-                                # --- DISCONNECT CHECK ---
-                                if not state.ftms_client_connected and PI_MODE:
-                                    idle_time = current_time - state.ftms_last_activity_time
-                                    if idle_time > 60.0:
-                                        logger.info(f"💤 Idle for {idle_time:.1f}s. Disconnecting from iFit to save power.")
-                                        break
-                                
-                                # 1. Process Queue
-                                command_count = 0
-                                command_sent = False
-                                while not state.control_queue.empty() and command_count < 5:
-                                    cmd_type, val = await state.control_queue.get()
-                                    pkt = create_control_command(cmd_type, val)
-                                    if pkt:
-                                        logger.debug(f"Sending Command: Type={cmd_type} Val={val}")
-                                        try:
-                                            await send_chunked_robust(client, pkt, write_char)
-                                            command_sent = True
-                                            command_count += 1
-                                            await asyncio.sleep(0.1)
-                                        except Exception as e:
-                                            logger.error(f"Command Send Error: {e}")
-                                            break 
-                                if not client.is_connected: break
-
-                                # 2. Poll
-                                if not command_sent or (current_time - state.last_notify_time > 1.0):
-                                     try:
-                                        await send_chunked_robust(client, POLL_CMD, write_char)
-                                     except Exception as e:
-                                        logger.error(f"Poll Write Error: {e}")
-                                        break
-                                
-                                # 3. Watchdog Check
-                                if time.time() - state.last_notify_time > 5.0:
-                                     logger.warning("Watchdog: Telemetry Stalled > 5s. Reconnecting...")
-                                     break
-                                     
-                                await asyncio.sleep(0.2) 
+                            await ifit_session_loop(client, write_char)
+                            logger.info(f"{state.control_latency.summary()} (coalesced {scheduler.coalesced}/{scheduler.submitted})")
+                            logger.info(f"{state.send_time.summary()} (gap={state.pacer.gap*1000:.0f}ms)")
+                            logger.info(state.handshake_time.summary())
+                            logger.info(f"{state.scan_time.summary()} | {state.connect_time.summary()}")
+                            for hist in state.first_telemetry.values():
+                                if hist.count: logger.info(hist.summary())
+                            state.pacer.save()
+                            logger.info(f"Reassembler: {pipeline.stats()}")
+                            logger.info(f"FTMS notifications: sent={notifier.sent} suppressed={notifier.suppressed}")
+                            logger.info(f"Subprocesses: {hci.stats()}")
+                            logger.info(f"{loop_lag.lag.summary()} max={loop_lag.max_lag * 1000:.1f}ms")
                                 
                             state.connected_to_ifit = False
+                            state.standby = False
+                            trace(tracing.DISCONNECT)
                             logger.info("Client Disconnected (Loop Ended)")
                             break  # Success - break inner retry loop
                             
                     except asyncio.TimeoutError:
                         # Timeout! Clear ghost and retry IMMEDIATELY (no rescan)
                         logger.warning(f"⏱️ Timeout on Attempt {attempt+1}/3. Clearing line...")
-                        try:
-                            import subprocess
-                            subprocess.run(["bluetoothctl", "disconnect", device_address], check=False, timeout=2.0)
-                        except: pass
+                        trace(tracing.CONNECT_ERROR, attempt + 1, "timeout")
+                        tracer.dump("connect-timeout")
+                        await hci.run("bluetoothctl", "disconnect", device_address, timeout=2.0)
                         await asyncio.sleep(0.5)  # Brief pause
                         continue  # Retry with same device object
                         
                     except Exception as e:
                         logger.error(f"Connect Error (Att {attempt+1}): {repr(e)}")
+                        trace(tracing.CONNECT_ERROR, attempt + 1, repr(e))
+                        tracer.dump("connect-error")
                         break  # Other errors - break and rescan
                         
+            elif standby_wanted() and not state.ftms_client_connected:
+                # Treadmill probably off: don't keep the radio scanning, but a phone cuts the wait short
+                logger.debug(f"iFit Device not found, standby rescan in {STANDBY_RESCAN_S:g}s")
+                state.ifit_wakeup.clear()
+                try:
+                    await asyncio.wait_for(state.ifit_wakeup.wait(), STANDBY_RESCAN_S)
+                except asyncio.TimeoutError:
+                    pass
             else:
                 logger.debug("iFit Device not found, retrying...")
                 await asyncio.sleep(2.0) 
@@ -534,22 +1014,21 @@ async def ifit_client_loop(server: BlessServer):
             import traceback
             logger.error(f"iFit Client Error: {repr(e)}")
             logger.debug(traceback.format_exc())
+            trace(tracing.CONNECT_ERROR, 0, repr(e))
+            tracer.dump("client-error")
             state.connected_to_ifit = False
+            state.standby = False
             state.pause_hci_monitor = False  # RESUME HCI MONITOR on error
             
             # RECOVERY: Restart Advertising so we don't stay silent
-            if PI_MODE:
-                try:
-                    import subprocess
-                    subprocess.run(["sudo", "hciconfig", "hci0", "leadv", "0"], check=False)
-                except: pass
+            if PI_MODE and not split_adapters():
+                await hci.run("sudo", "hciconfig", FTMS_ADAPTER, "leadv", "0")
             
             # Zombie Killer: If we timed out, BlueZ might think we are connected. Force disconnect.
             if "TimeoutError" in repr(e) and 'device_address' in locals() and device_address:
                 try:
                     logger.warning(f"Timeout detected. Attempting to clear ghost connection to {device_address}...")
-                    import subprocess
-                    subprocess.run(["bluetoothctl", "disconnect", device_address], check=False, timeout=5.0)
+                    await hci.run("bluetoothctl", "disconnect", device_address, timeout=5.0)
                 except Exception as z:
                     logger.error(f"Zombie Killer Failed: {z}")
             
@@ -559,82 +1038,182 @@ async def ifit_client_loop(server: BlessServer):
             else:
                 await asyncio.sleep(5.0)
 
-async def update_ftms(server: BlessServer):
-    if not server or not state.connected_to_ifit: return
-    
-    # Flags: Speed (0) is implicit?, Dist (2), Inc (3)
-    # 0x01: Inst. Speed? No, usually mandatory.
-    # Standard Flags for Treadmill Data 2ACD:
-    # Bit 0: More Data
-    # Bit 1: Avg Speed
-    # Bit 2: Total Distance present
-    # Bit 3: Inclination & Ramp Angle present
-    # Bit 4: Elevation Gain present
-    # ...
-    # We want Dist(2) + Inc(3) = 0x04 + 0x08 = 0x0C (12)
-    # Plus Elapsed Time(10) = 0x0400
-    # Plus Expended Energy(7) = 0x0080
-    # Total = 0x048C
-    flags = 0x048C
-    # ... (rest of function same) ...
-    
-    # Speed: uint16, 0.01 km/h
-    speed_val = int(state.speed_kph * 100)
-    
-    # Distance: uint24, 1 meter
-    dist_val = int(state.distance_m)
-    
-    # Incline: sint16, 0.1 %
-    inc_val = int(state.incline_pct * 10)
-    
-    # Pack: Flags(H), Speed(H), Dist(3 bytes), Incline(h)
-    # Dist is tricky (3 bytes). Pack into I and take 3?
-    payload = bytearray()
-    payload.extend(struct.pack('<H', flags))
-    payload.extend(struct.pack('<H', speed_val))
-    
-    d_bytes = struct.pack('<I', dist_val)[:3]
-    payload.extend(d_bytes)
-    
-    payload.extend(struct.pack('<h', inc_val))
-    # CRITICAL FIX: If Flag Bit 3 (Inc) is set, Spec requires Ramp Angle (2 bytes) too!
-    # Send 0 instead of 0x7FFF for cleaner UI
-    payload.extend(struct.pack('<h', 0))
+# =============================================================================
+# FTMS TREADMILL DATA ENCODER
+# =============================================================================
+# Standard Flags for Treadmill Data 2ACD (Bit 0 clear = Inst. Speed present):
+# Bit 2: Total Distance, Bit 3: Inclination & Ramp Angle,
+# Bit 7: Expended Energy, Bit 10: Elapsed Time
+# Fields are packed in flag-bit order, so Energy MUST come before Elapsed Time.
+FTMS_DATA_FIELDS = ("distance", "incline", "energy", "elapsed") # Flags 0x048C
+
+class TreadmillDataEncoder:
+    """Packs Treadmill Data into a reused buffer and hands back the cached
+    bytes when the quantized field values have not changed."""
+
+    # name -> (flag bit, struct format)
+    FIELD_LAYOUT = {
+        "distance": (0x0004, "HB"),  # uint24 meters, split lo16/hi8
+        "incline": (0x0008, "hh"),   # sint16 0.1 % + Ramp Angle (spec requires it, send 0)
+        "energy": (0x0080, "HHB"),   # Total kcal, Per Hour / Per Min not available
+        "elapsed": (0x0400, "H"),    # uint16 seconds
+    }
+
+    def __init__(self, fields=FTMS_DATA_FIELDS):
+        order = sorted(fields, key=lambda f: self.FIELD_LAYOUT[f][0])
+        self.flags = sum(self.FIELD_LAYOUT[f][0] for f in order)
+        self.struct = struct.Struct("<HH" + "".join(self.FIELD_LAYOUT[f][1] for f in order))
+        self.buffer = bytearray(self.struct.size)
+        self.has_distance = "distance" in fields
+        self.has_incline = "incline" in fields
+        self.has_energy = "energy" in fields
+        self.has_elapsed = "elapsed" in fields
+        self.last_key = None
+        self.last_payload = None
+        self.encoded = 0
+        self.cache_hits = 0
+
+    def encode(self, speed_kph, distance_m, incline_pct, calories, elapsed_s):
+        # Quantize to wire resolution: 0.01 km/h, 1 m, 0.1 %, 1 kcal, 1 s
+        key = (int(speed_kph * 100), int(distance_m) & 0xFFFFFF, int(incline_pct * 10),
+               min(calories, 65535), min(elapsed_s, 65535))
+        if key == self.last_key:
+            self.cache_hits += 1
+            return self.last_payload
+
+        speed_val, dist_val, inc_val, c_val, t_val = key
+        values = [self.flags, speed_val]
+        if self.has_distance: values += (dist_val & 0xFFFF, dist_val >> 16)
+        if self.has_incline: values += (inc_val, 0)
+        if self.has_energy: values += (c_val, 0xFFFF, 0xFF)
+        if self.has_elapsed: values.append(t_val)
+        self.struct.pack_into(self.buffer, 0, *values)
+
+        self.last_key = key
+        self.last_payload = bytes(self.buffer)
+        self.encoded += 1
+        return self.last_payload
+
+ftms_encoder = TreadmillDataEncoder()
+
+# =============================================================================
+# FTMS NOTIFIER
+# =============================================================================
+FTMS_MAX_NOTIFY_HZ = 4.0 # Cap on Treadmill Data notifications
+FTMS_HEARTBEAT_S = 5.0   # Re-send unchanged data at least this often
+
+def update_ftms(server: BlessServer, heartbeat=FTMS_HEARTBEAT_S):
+    # Returns True if a notification went out
+    if not server or not state.connected_to_ifit: return False
     
-    # Flags Bit 7: Expended Energy (Total(2), PerHour(2), PerMin(1))
-    # MUST be before Elapsed Time (Bit 10)
-    if (flags & 0x0080):
-         # Total (Calories)
-         c_val = min(state.calories, 65535)
-         payload.extend(struct.pack('<H', c_val))
-         # Per Hour (Not Available)
-         payload.extend(struct.pack('<H', 0xFFFF))
-         # Per Min (Not Available)
-         payload.extend(struct.pack('<B', 0xFF))
-
-    # Flags Bit 10: Elapsed Time (2 bytes, seconds)
-    if (flags & 0x0400):
-        # Limit to 65535 (uint16 max)
-        t_val = min(state.elapsed_time, 65535)
-        payload.extend(struct.pack('<H', t_val))
+    payload = ftms_encoder.encode(state.speed_kph, state.distance_m, state.incline_pct,
+                                  state.calories, state.elapsed_time)
     
-    # Smart Update: Only notify if changed OR > 5 seconds passed
-    import time
+    # Smart Update: Only notify if changed OR heartbeat due
+    # (encoder returns the same object when nothing changed)
     now = time.time()
-    if payload == state.last_ftms_payload and (now - state.last_update_ts) < 5.0:
-         return # Skip update to save bandwidth
+    if payload is state.last_ftms_payload and (now - state.last_update_ts) < heartbeat:
+         return False # Skip update to save bandwidth
         
     state.last_ftms_payload = payload
     state.last_update_ts = now
     
-    logger.debug(f"FTMS NOTIFY: {payload.hex()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("FTMS NOTIFY: %s", Hex(payload))
     
     # Notify
     try:
-        server.get_characteristic(FTMS_DATA_CHAR_UUID).value = bytes(payload)
+        server.get_characteristic(FTMS_DATA_CHAR_UUID).value = payload
         server.update_value(FTMS_SERVICE_UUID, FTMS_DATA_CHAR_UUID)
     except Exception as e:
-        logger.debug(f"FTMS Update Error: {e}")
+        logger.debug("FTMS Update Error: %s", e)
+    return True
+
+def fan_out_ftms(server: BlessServer, heartbeat=FTMS_HEARTBEAT_S):
+    # Per-central version of update_ftms, for servers that can notify one
+    # central at a time: each gets changes at its own negotiated rate.
+    # Returns (notifications sent, seconds until a pending one is due)
+    if not server or not state.connected_to_ifit: return 0, None
+    
+    payload = ftms_encoder.encode(state.speed_kph, state.distance_m, state.incline_pct,
+                                  state.calories, state.elapsed_time)
+    now = time.monotonic()
+    targets = centrals.due(payload, now, heartbeat)
+    if targets:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("FTMS NOTIFY x%d: %s", len(targets), Hex(payload))
+        try:
+            server.get_characteristic(FTMS_DATA_CHAR_UUID).value = payload
+            server.update_value_to({c.address for c in targets}, FTMS_SERVICE_UUID, FTMS_DATA_CHAR_UUID)
+        except Exception as e:
+            logger.debug("FTMS Update Error: %s", e)
+    return len(targets), centrals.next_due(payload, now)
+
+class FtmsNotifier:
+    """The only task that sends Treadmill Data. Telemetry just kick()s it;
+    bursts collapse into one notification per rate-limit window."""
+
+    def __init__(self, max_rate=FTMS_MAX_NOTIFY_HZ, heartbeat=FTMS_HEARTBEAT_S):
+        self.changed = asyncio.Event()
+        self.configure(max_rate, heartbeat)
+        self.last_sent = 0.0
+        self.sent = 0
+        self.suppressed = 0
+
+    def configure(self, max_rate, heartbeat):
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.heartbeat = heartbeat
+
+    def kick(self):
+        if self.changed.is_set():
+            self.suppressed += 1 # Merged into the pending notification
+        self.changed.set()
+
+    async def run(self, server: BlessServer):
+        # Servers that can address one central get a per-central fan-out;
+        # bless/BlueZ only broadcast, at the fastest subscriber's rate
+        fan_out = hasattr(server, "update_value_to")
+        timeout = self.heartbeat
+        while True:
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass # Heartbeat (or a slower central's turn)
+            if state.standby:
+                # Nobody subscribed: no heartbeats either
+                self.changed.clear()
+                timeout = self.heartbeat
+                continue
+            
+            # Rate limit: hold off, letting further kicks pile onto this one
+            min_interval = self.min_interval
+            if not fan_out and len(centrals) and centrals.fastest_rate() > 0:
+                min_interval = max(min_interval, 1.0 / centrals.fastest_rate())
+            wait = self.last_sent + min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.changed.clear()
+            
+            if fan_out:
+                sent, pending = fan_out_ftms(server, self.heartbeat)
+                timeout = self.heartbeat if pending is None else min(self.heartbeat, pending)
+                if sent:
+                    self.sent += sent
+                    self.last_sent = time.monotonic()
+                    trace(tracing.NOTIFY, sent)
+                else:
+                    self.suppressed += 1
+                    trace(tracing.NOTIFY, False)
+            elif update_ftms(server, self.heartbeat):
+                self.sent += 1
+                self.last_sent = time.monotonic()
+                trace(tracing.NOTIFY, True)
+            else:
+                self.suppressed += 1
+                trace(tracing.NOTIFY, False)
+
+notifier = FtmsNotifier()
+loop_lag = LoopLagMonitor()
 
 # Global Server Reference
 ftms_server = None
@@ -644,20 +1223,17 @@ def handle_read(characteristic: BlessGATTCharacteristic, **kwargs):
     return characteristic.value
 
 def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **kwargs):
-    # Log RAW command for analysis
-    if isinstance(value, (bytes, bytearray)):
-        hex_val = value.hex()
-    else:
-        hex_val = str(value)
-        
-    logger.info(f"FTMS Control Write: {hex_val}")
+    if recorder and isinstance(value, (bytes, bytearray)):
+        recorder.record(FTMS_CONTROL, value)
+    # Log RAW command for analysis (hex only if the record is emitted)
+    logger.info("FTMS Control Write: %s", Hex(value) if isinstance(value, (bytes, bytearray)) else value)
     
     if characteristic.uuid == FTMS_CONTROL_POINT_UUID.lower(): # Fix UUID Case check here too!
         data = value
         if len(data) < 1: return
         
         opcode = data[0]
-        logger.info(f"FTMS OpCode: {opcode:#02x}")
+        logger.info("FTMS OpCode: %#02x", opcode)
         
         # Prepare Response (Default Success)
     # 0x00: Request Control
@@ -674,7 +1250,8 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
     if len(value) < 1: return
     opcode = value[0]
     
-    logger.debug(f"FTMS Control: Opcode={opcode} Val={value.hex()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("FTMS Control: Opcode=%s Val=%s", opcode, Hex(value))
     
     # Get Server from kwargs or global
     server_obj = kwargs.get('server') or ftms_server
@@ -688,6 +1265,20 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
     
     response = bytearray([0x80, opcode, 0x01]) # Default Success
     
+    # Control Point ownership: only the central that requested control sets targets
+    # (sim passes `central`; on BlueZ the patched WriteValue leaves it in centrals.writer).
+    # Unknown origin (no device option, hook not installed, macOS/Windows): None,
+    # which is accepted like before, as there is nothing to arbitrate with
+    central = kwargs.get('central') or centrals.take_writer()
+    if opcode == 0x00 and not centrals.request_control(central):
+        logger.warning(f"Control Requested by {central} -> Refused ({centrals.owner} has control)")
+        state.response_queue.put_nowait(bytearray([0x80, opcode, 0x05])) # Control Not Permitted
+        return value
+    if opcode != 0x00 and not centrals.may_control(central):
+        logger.warning(f"FTMS OpCode {opcode:#02x} from {central} -> Control Not Permitted")
+        state.response_queue.put_nowait(bytearray([0x80, opcode, 0x05]))
+        return value
+    
     if opcode == 0x00: # Request Control
         logger.info("Control Requested -> Granting")
         if server_obj:
@@ -705,8 +1296,11 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
                 server_obj.get_characteristic(FTMS_STATUS_UUID).value = val
                 server_obj.update_value(FTMS_SERVICE_UUID, FTMS_STATUS_UUID)
             except Exception as e:
-                logger.error(f"Status Update Error: {e}")
+                logger.error("Status Update Error: %s", e)
         
+    elif opcode == 0x01: # Reset (also gives up control)
+         centrals.release(central)
+         
     elif opcode == 0x07: # Start
          logger.info("🎮 FTMS Start / Resume")
          # Send Status: Started (0x04)
@@ -715,19 +1309,19 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
                  server_obj.get_characteristic(FTMS_STATUS_UUID).value = b'\x04'
                  server_obj.update_value(FTMS_SERVICE_UUID, FTMS_STATUS_UUID)
              except Exception as e:
-                 logger.warning(f"Status Update Failed (0x07): {e}")
+                 logger.warning("Status Update Failed (0x07): %s", e)
          pass
          
     elif opcode == 0x08: # Stop
          logger.info("🎮 FTMS Stop")
-         state.control_queue.put_nowait((TYPE_SPEED, 0))
+         scheduler.submit(TYPE_SPEED, 0)
          # Send Status: Stopped (0x02) + Stop (0x01)
          if server_obj:
              try:
                  server_obj.get_characteristic(FTMS_STATUS_UUID).value = b'\x02\x01'
                  server_obj.update_value(FTMS_SERVICE_UUID, FTMS_STATUS_UUID)
              except Exception as e:
-                 logger.warning(f"Status Update Failed (0x08): {e}")
+                 logger.warning("Status Update Failed (0x08): %s", e)
          
     elif opcode == 0x02 and len(value) >= 3: # Set Target Speed (MANDATORY)
          val_raw = struct.unpack_from('<H', value, 1)[0]
@@ -735,13 +1329,17 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
          # iFit: 0.01 km/h resolution (e.g. 500 = 5.0 km/h) [Based on telemetry decode]
          kph = val_raw / 100.0
          
-         logger.info(f"FTMS Set Speed: {kph} km/h")
+         logger.info("FTMS Set Speed: %s km/h", kph)
+         if not state.profile.accepts(TYPE_SPEED, val_raw):
+             logger.warning(f"FTMS Set Speed {kph} km/h outside {state.profile.name} range -> Invalid Parameter")
+             state.response_queue.put_nowait(bytearray([0x80, opcode, 0x03]))
+             return value
          
          # Update Target for Echo
          state.target_speed_kph = kph
          
          # Send to Queue (val_raw is already in iFit's 0.01 kph format)
-         state.control_queue.put_nowait((TYPE_SPEED, val_raw))
+         scheduler.submit(TYPE_SPEED, val_raw)
          
          # Send Status: Target Speed Changed (0x05) + Speed
          if server_obj:
@@ -750,7 +1348,7 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
                  server_obj.get_characteristic(FTMS_STATUS_UUID).value = val
                  server_obj.update_value(FTMS_SERVICE_UUID, FTMS_STATUS_UUID)
              except Exception as e:
-                 logger.warning(f"Status Update Failed (0x02): {e}")
+                 logger.warning("Status Update Failed (0x02): %s", e)
          
     elif opcode == 0x03 and len(value) >= 3: # Set Target Inclination (MANDATORY)
          val_raw = struct.unpack_from('<h', value, 1)[0]
@@ -759,8 +1357,12 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
          # So iFit 10.0% = 1000.
          # We need to multiply FTMS(100) by 10 to get iFit(1000).
          ifit_val = int(val_raw * 10) 
-         logger.info(f"🎮 Set Incline: {val_raw/10.0}%")
-         state.control_queue.put_nowait((TYPE_INCLINE, ifit_val))
+         logger.info("🎮 Set Incline: %s%%", val_raw / 10.0)
+         if not state.profile.accepts(TYPE_INCLINE, ifit_val):
+             logger.warning(f"FTMS Set Incline {val_raw / 10.0}% outside {state.profile.name} range -> Invalid Parameter")
+             state.response_queue.put_nowait(bytearray([0x80, opcode, 0x03]))
+             return value
+         scheduler.submit(TYPE_INCLINE, ifit_val)
          # Send Status: Target Incline Changed (0x06) + Incline
          if server_obj:
              try:
@@ -768,7 +1370,7 @@ def handle_control_point(characteristic: BlessGATTCharacteristic, value: Any, **
                  server_obj.get_characteristic(FTMS_STATUS_UUID).value = val
                  server_obj.update_value(FTMS_SERVICE_UUID, FTMS_STATUS_UUID)
              except Exception as e:
-                 logger.warning(f"Status Update Failed (0x03): {e}")
+                 logger.warning("Status Update Failed (0x03): %s", e)
          
     # To Send Indication in Bless, we need "server.update_value". But we don't have 'server' here.
     # We will use a queue to send response back to main loop to send indication.
@@ -798,13 +1400,13 @@ def handle_read(characteristic: BlessGATTCharacteristic, **kwargs):
 
     # Supported Speed Range - 2AD4
     if char_uuid == FTMS_SPEED_RANGE_UUID.lower():
-        # Min(1.0), Max(20.0), Inc(0.1)
-        return struct.pack('<HHH', 100, 2000, 10)
+        # Min, Max, Inc in 0.01 km/h (default profile: 1.0, 20.0, 0.1)
+        return state.profile.speed_range
         
     # Supported Incline Range - 2AD5
     if char_uuid == FTMS_INCLINE_RANGE_UUID.lower():
-        # Min(-6.0), Max(15.0), Inc(0.1)
-        return struct.pack('<hhh', -60, 150, 10)
+        # Min, Max, Inc in 0.1 % (default profile: -6.0, 15.0, 0.1)
+        return state.profile.incline_range
         
     # Feature (Read) - 2ACC
     if char_uuid == FTMS_FEATURE_UUID.lower():
@@ -812,15 +1414,67 @@ def handle_read(characteristic: BlessGATTCharacteristic, **kwargs):
 
     return characteristic.value
 
-async def ftms_server_loop():
+# =============================================================================
+# METRICS
+# =============================================================================
+def register_metrics():
+    # Everything is read at scrape time through `state` & co., so objects
+    # replaced per session (pipeline, pacer, histograms) are always current
+    r = registry
+    # BridgeState gauges
+    r.gauge("ifit_connected", "iFit treadmill link is up", lambda: state.connected_to_ifit)
+    r.gauge("ifit_standby", "iFit link held in warm standby", lambda: state.standby)
+    r.gauge("ftms_client_connected", "An FTMS app is connected", lambda: state.ftms_client_connected)
+    r.gauge("ftms_centrals", "Connected FTMS centrals", lambda: len(centrals))
+    r.gauge("speed_kph", "Reported speed (km/h)", lambda: state.speed_kph)
+    r.gauge("target_speed_kph", "Last FTMS target speed (km/h)", lambda: state.target_speed_kph)
+    r.gauge("incline_pct", "Reported incline (%)", lambda: state.incline_pct)
+    r.gauge("distance_m", "Session distance (m)", lambda: state.distance_m)
+    r.gauge("elapsed_seconds", "Session elapsed time (s)", lambda: state.elapsed_time)
+    r.gauge("calories_kcal", "Session energy (kcal)", lambda: state.calories)
+    r.gauge("telemetry_age_seconds", "Time since the last iFit notification",
+            lambda: time.time() - state.last_notify_time)
+    # iFit telemetry (rate() of the chunk counter gives packets/sec)
+    r.counter("ifit_rx_chunks", "iFit notification chunks received", lambda: state.pipeline.reassembler.chunks)
+    r.counter("ifit_messages", "iFit messages reassembled", lambda: state.pipeline.reassembler.messages)
+    r.counter("ifit_status_decoded", "0x2F status messages decoded", lambda: state.pipeline.status_decoder.decoded)
+    r.counter("ifit_reassembly_dropped", "Chunks dropped by the reassembler", lambda: state.pipeline.reassembler.dropped)
+    r.counter("ifit_reassembly_out_of_order", "Sequence gaps", lambda: state.pipeline.reassembler.out_of_order)
+    r.counter("ifit_reassembly_short", "Truncated chunks or messages", lambda: state.pipeline.reassembler.short)
+    r.counter("ifit_checksum_errors", "Status messages with a bad checksum", lambda: state.pipeline.status_decoder.checksum_errors)
+    r.counter("watchdog_reconnects", "Telemetry watchdog trips", lambda: state.watchdog_reconnects)
+    # FTMS notifications
+    r.counter("ftms_notifications_sent", "Treadmill Data notifications sent", lambda: notifier.sent)
+    r.counter("ftms_notifications_suppressed", "Kicks merged or unchanged payloads skipped", lambda: notifier.suppressed)
+    # Control path
+    r.counter("control_submitted", "FTMS control commands received", lambda: scheduler.submitted)
+    r.counter("control_coalesced", "Control commands replaced by a newer one", lambda: scheduler.coalesced)
+    r.counter("control_sent", "Control commands written to the treadmill", lambda: state.commands_sent)
+    r.gauge("control_queued", "Control commands waiting to be sent", lambda: len(scheduler.slots))
+    r.gauge("chunk_gap_seconds", "Current iFit chunk pacing gap", lambda: state.pacer.gap)
+    # Latencies
+    r.histogram("control_latency", "FTMS write -> iFit command sent", lambda: state.control_latency)
+    r.histogram("ifit_write", "Time to write one chunked iFit message", lambda: state.send_time)
+    r.histogram("ifit_scan", "Treadmill discovery time", lambda: state.scan_time)
+    r.histogram("ifit_connect", "BleakClient connect time", lambda: state.connect_time)
+    r.histogram("ifit_handshake", "Handshake duration", lambda: state.handshake_time)
+    r.histogram("ifit_unlock", "Scan start -> handshake complete", lambda: state.unlock_time)
+    r.histogram("event_loop_lag", "Event loop wake-up lag", lambda: loop_lag.lag)
+
+async def ftms_server_loop(ble=BLUETOOTH):
     global ftms_server
     logger.info("Starting FTMS Server...")
     
-    server = BlessServer(name=SERVER_NAME)
+    patch_write_origin() # Before any characteristic object exists
+    server = ble.server(name=SERVER_NAME, adapter=FTMS_ADAPTER)
     ftms_server = server # Expose globally
     
     server.read_request_func = handle_read
     server.write_request_func = handle_control_point
+    if hasattr(server, "on_connect"):
+        # Simulated server reports its centrals directly (BlueZ: BluezMonitor)
+        server.on_connect = lambda path, address: centrals.connect(address, path)
+        server.on_disconnect = lambda path, address: centrals.disconnect(address)
     
     # Add FTMS Service
     await server.add_new_service(FTMS_SERVICE_UUID)
@@ -992,12 +1646,11 @@ async def ftms_server_loop():
     # --- PI MODE SECURITY ENFORCEMENT ---
     # Bless/BlueZ often resets 'pairable' to on during Start. We must force it OFF now.
     if PI_MODE:
-        import subprocess
         try:
             logger.info("Enforcing LE Security: Pairable=OFF via bluetoothctl")
-            subprocess.run(["bluetoothctl", "pairable", "off"], check=False)
+            await hci.run("bluetoothctl", "pairable", "off")
             # Ensure visibility is still ON
-            subprocess.run(["bluetoothctl", "discoverable", "on"], check=False)
+            await hci.run("bluetoothctl", "discoverable", "on")
         except Exception as e:
             logger.error(f"Failed to enforce security: {e}")
     # ------------------------------------
@@ -1005,18 +1658,46 @@ async def ftms_server_loop():
     # Start Client Loop in background
     if "--mock" in sys.argv:
         asyncio.create_task(mock_client_loop(server))
+    elif REPLAY_FILE:
+        asyncio.create_task(replay_client_loop(REPLAY_FILE, REPLAY_SPEED))
     else:
-        asyncio.create_task(ifit_client_loop(server))
+        asyncio.create_task(ifit_client_loop(server, ble))
     
     # Server Keepalive & Response Processor
-    # Start Telemetry Loop
-    asyncio.create_task(ftms_telemetry_loop(server))
+    # Start Telemetry Notifier
+    asyncio.create_task(notifier.run(server))
+    
+    # Event loop lag (anything blocking the loop delays BLE callbacks)
+    asyncio.create_task(loop_lag.run())
+    
+    # Flight recorder on demand: kill -USR1 <pid>
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, tracer.dump, "sigusr1")
+    except (NotImplementedError, AttributeError):
+        pass # Windows
+    
+    # Session recorder (batched flushes)
+    if recorder:
+        asyncio.create_task(recorder.run())
+    
+    # Prometheus endpoint (--metrics-port)
+    if METRICS_PORT:
+        register_metrics()
+        asyncio.create_task(registry.serve(METRICS_HOST, METRICS_PORT))
+        logger.info(f"Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    
+    # Simulated phone on the FTMS side
+    if SIM_MODE:
+        asyncio.create_task(sim_central_loop())
+    
+    # BlueZ connection events (Pi): replaces hcitool / bluetoothctl polling
+    bluez = await start_bluez_monitor() if PI_MODE else None
     
     # Start Security Watchdog
-    asyncio.create_task(security_watchdog_loop())
+    asyncio.create_task(security_watchdog_loop(bluez))
     
     # Start Connection Monitor
-    asyncio.create_task(monitor_ftms_connection_loop())
+    asyncio.create_task(monitor_ftms_connection_loop(bluez))
     
     while True:
         # 1. Process Indications (FAST)
@@ -1033,41 +1714,55 @@ async def ftms_server_loop():
         
         await asyncio.sleep(0.05) # Low latency for control responses
 
-# Global Scope Telemetry Loop
-async def ftms_telemetry_loop(server: BlessServer):
-    while True:
-        if state.connected_to_ifit:
-            await update_ftms(server)
-        await asyncio.sleep(0.5) # Check often, update_ftms filters dupes
-
 # Security Watchdog (Persistent Enforcement)
-async def security_watchdog_loop():
+async def security_watchdog_loop(bluez=None):
     if not PI_MODE:
         return
+    
+    if bluez:
+        # Event-driven: BlueZ tells us the moment Pairable flips
+        logger.info("Starting Security Watchdog (D-Bus events)...")
+        def on_pairable(adapter_path, pairable):
+            if pairable:
+                asyncio.create_task(enforce_not_pairable(bluez, adapter_path))
+        bluez.on_pairable = on_pairable
+        for path, flags in bluez.adapters.items():
+            on_pairable(path, flags["Pairable"])
+        return
         
     logger.info("Starting Security Watchdog (Interval: 10s)...")
-    import subprocess
     
     while True:
         try:
             # Check current state
-            result = subprocess.run(["bluetoothctl", "show"], capture_output=True, text=True)
+            result = await hci.run("bluetoothctl", "show", shared=True)
             if "Pairable: yes" in result.stdout:
                 logger.warning("Watchdog: Pairable is ON. Forcing OFF.")
-                subprocess.run(["bluetoothctl", "pairable", "off"], check=False)
-                subprocess.run(["bluetoothctl", "discoverable", "on"], check=False)
+                await hci.run("bluetoothctl", "pairable", "off")
+                await hci.run("bluetoothctl", "discoverable", "on")
         except Exception as e:
             logger.error(f"Watchdog Error: {e}")
             
         await asyncio.sleep(10.0)
 
+async def enforce_not_pairable(bluez, adapter_path):
+    logger.warning("Watchdog: Pairable is ON. Forcing OFF.")
+    try:
+        await bluez.set_adapter_property(adapter_path, "Pairable", False)
+        await bluez.set_adapter_property(adapter_path, "Discoverable", True)
+    except Exception as e:
+        logger.error(f"Watchdog Error: {e}")
+
 # Connection Monitor (Lazy Connect Support)
-async def monitor_ftms_connection_loop():
+async def monitor_ftms_connection_loop(bluez=None):
     if not PI_MODE:
         return
+    
+    if bluez:
+        watch_ftms_connections(bluez)
+        return
         
     logger.info("Starting Connection Monitor (Interval: 3s)...")
-    import subprocess
     
     while True:
         try:
@@ -1079,10 +1774,12 @@ async def monitor_ftms_connection_loop():
             # Check hcitool con for SLAVE connections (Incoming from Phone)
             # Output: "> LE 61:36:1D:64:12:F3 handle 2 state 1 lm SLAVE" 
             # OR: "> LE ... lm PERIPHERAL" (Newer BlueZ)
-            result = subprocess.run(["sudo", "hcitool", "con"], capture_output=True, text=True)
+            result = await hci.run("sudo", "hcitool", "-i", FTMS_ADAPTER, "con", shared=True)
             
             # Check for either SLAVE or PERIPHERAL
             has_client = "SLAVE" in result.stdout or "PERIPHERAL" in result.stdout
+            centrals.sync(line.split()[2] for line in result.stdout.splitlines()
+                          if ("SLAVE" in line or "PERIPHERAL" in line) and len(line.split()) > 2)
 
             if has_client:
                  if not state.ftms_client_connected:
@@ -1091,7 +1788,8 @@ async def monitor_ftms_connection_loop():
                      # HANDOFF STRATEGY: 
                      # If iFit is NOT connected, we must disconnect the FTMS client first 
                      # to avoid BlueZ contention during the outgoing connection.
-                     if not state.connected_to_ifit:
+                     # (Not needed when the iFit side has its own adapter)
+                     if not state.connected_to_ifit and not split_adapters():
                          logger.info("📲 FTMS Client Detected but iFit Disconnected. Starting Handoff...")
                          
                          # 1. Parse Handle to Kill
@@ -1108,19 +1806,28 @@ async def monitor_ftms_connection_loop():
                          # 2. Reject Connection (Force Disconnect)
                          if handle:
                              logger.info(f"🚫 Rejecting Client (hdl={handle}) to free radio for iFit Connect...")
-                             subprocess.run(["sudo", "hciconfig", "hci0", "noleadv"], check=False)
-                             subprocess.run(["sudo", "hcitool", "ledc", handle], check=False)
+                             await hci.run("sudo", "hciconfig", FTMS_ADAPTER, "noleadv")
+                             await hci.run("sudo", "hcitool", "-i", FTMS_ADAPTER, "ledc", handle)
                          
                          # 3. Signal iFit Loop to Connect
                          logger.info("Signal: iFit Connect Requested")
                          state.ftms_client_connected = True
                          state.ftms_last_activity_time = time.time()
+                         state.ifit_wakeup.set()
+                         
+                     elif not state.connected_to_ifit:
+                         # Own adapter for iFit: keep the phone, connect beside it
+                         logger.info(f"📲 FTMS Client Connected! (Connecting iFit on {IFIT_ADAPTER})")
+                         state.ftms_client_connected = True
+                         state.ftms_last_activity_time = time.time()
+                         state.ifit_wakeup.set()
                          
                      else:
                          # iFit already connected, accept client normally
                          logger.info(f"📲 FTMS Client Connected! (iFit already active)")
                          state.ftms_client_connected = True
                          state.ftms_last_activity_time = time.time()
+                         scheduler.wakeup.set() # Out of standby without waiting for the keepalive
             elif "Connections:" in result.stdout and len(result.stdout) > 20:
                  # Debug: Show us what it sees if not SLAVE but has content
                  logger.info(f"HCI Output (Non-SLAVE/Debug): {result.stdout.strip()}")
@@ -1130,6 +1837,7 @@ async def monitor_ftms_connection_loop():
                 logger.info("📲 FTMS Client Connected! (Waking up...)")
                 state.ftms_client_connected = True
                 state.ftms_last_activity_time = time.time()
+                state.ifit_wakeup.set()
                 
             elif not has_client and state.ftms_client_connected:
                 logger.info("📲 FTMS Client Disconnected (Starting Timer...)")
@@ -1148,6 +1856,118 @@ async def monitor_ftms_connection_loop():
         await asyncio.sleep(3.0)
 
 
+def watch_ftms_connections(bluez):
+    # Event-driven version of the loop above: BlueZ signals a central's
+    # Connected flag directly, so there is nothing to poll or parse.
+    logger.info("Starting Connection Monitor (D-Bus events)...")
+    kicked = set()
+    handoffs = set() # Keep the kick tasks referenced until they finish
+
+    async def kick(path):
+        # Advertising off first, or the phone reconnects straight away
+        await hci.run("sudo", "hciconfig", FTMS_ADAPTER, "noleadv")
+        try:
+            await bluez.disconnect(path)
+        except Exception as e:
+            logger.warning(f"Handoff disconnect failed: {e}")
+
+    def on_connect(path, address):
+        state.ftms_last_activity_time = time.time()
+        centrals.connect(address, path)
+        if not state.connected_to_ifit and split_adapters():
+            logger.info(f"📲 FTMS Client Connected! ({address}, connecting iFit on {IFIT_ADAPTER})")
+        elif not state.connected_to_ifit:
+            # HANDOFF STRATEGY: free the radio for the outgoing iFit connection
+            logger.info(f"📲 FTMS Client Detected ({address}) but iFit Disconnected. Starting Handoff...")
+            logger.info(f"🚫 Rejecting Client ({address}) to free radio for iFit Connect...")
+            kicked.add(path)
+            task = asyncio.create_task(kick(path))
+            handoffs.add(task)
+            task.add_done_callback(handoffs.discard)
+            logger.info("Signal: iFit Connect Requested")
+            state.handoff_requested = True
+        else:
+            logger.info(f"📲 FTMS Client Connected! ({address}, iFit already active)")
+            scheduler.wakeup.set() # Out of standby without waiting for the keepalive
+        state.ftms_client_connected = True
+        state.ifit_wakeup.set()
+
+    def on_disconnect(path, address):
+        centrals.disconnect(address)
+        if path in kicked:
+            kicked.discard(path) # Our own handoff kick, not the user leaving
+        else:
+            logger.info(f"📲 FTMS Client Disconnected ({address}, Starting Timer...)")
+        state.ftms_client_connected = bool(bluez.centrals)
+        state.ftms_last_activity_time = time.time() # Start timer from disconnect
+
+    bluez.on_connect = on_connect
+    bluez.on_disconnect = on_disconnect
+    # A phone may already be connected when we start
+    for path in list(bluez.centrals):
+        on_connect(path, bluez.devices[path]["Address"])
+
+def patch_write_origin():
+    # bless drops WriteValue's options, which carry the writing central's
+    # object path. Wrap it so handle_control_point can tell centrals apart
+    # (centrals.writer is set only for the duration of the synchronous call).
+    # This reaches into bless internals, so it checks what it replaces and
+    # backs off when that doesn't look like bless 0.2's WriteValue: writes
+    # then stay anonymous and Control Point ownership isn't enforced.
+    try:
+        from dbus_next.service import method
+        from bless.backends.bluezdbus.dbus.characteristic import BlueZGattCharacteristic
+    except ImportError:
+        return False # macOS / Windows: writes stay anonymous
+    original_write_value = getattr(BlueZGattCharacteristic, "WriteValue", None)
+    if getattr(original_write_value, "tracks_origin", False):
+        return True
+    dbus_method = getattr(original_write_value, "__dict__", {}).get("__DBUS_METHOD")
+    if getattr(dbus_method, "in_signature", None) != "aya{sv}":
+        logger.warning("bless WriteValue not recognised: FTMS writes stay anonymous (no control arbitration)")
+        return False
+
+    @method(name="WriteValue")
+    def write_value(self, value: "ay", options: "a{sv}"):  # type: ignore # noqa: F722 F821
+        centrals.writer = write_origin(options)
+        try:
+            original_write_value(self, value, options)
+        finally:
+            centrals.writer = None
+
+    write_value.tracks_origin = True
+    BlueZGattCharacteristic.WriteValue = write_value
+    return True
+
+def write_origin(options):
+    # BlueZ WriteValue options -> writing central's address, None if absent
+    try:
+        device = options.get("device")
+        device = getattr(device, "value", device)
+        if isinstance(device, str) and "/dev_" in device:
+            return device.rsplit("dev_", 1)[-1].replace("_", ":").upper()
+    except Exception:
+        pass
+    return None
+
+def split_adapters():
+    return IFIT_ADAPTER != FTMS_ADAPTER
+
+def is_ifit_device(address, name):
+    return name == IFIT_DEVICE_NAME or (state.ifit_address is not None and address.upper() == state.ifit_address.upper())
+
+async def start_bluez_monitor():
+    try:
+        from bluez_monitor import BluezMonitor
+        bluez = await BluezMonitor.connect_system_bus(is_ignored=is_ifit_device, adapter=FTMS_ADAPTER)
+        await bluez.start()
+        logger.info(f"BlueZ D-Bus monitor active ({len(bluez.centrals)} central(s) connected)")
+        return bluez
+    except Exception as e:
+        logger.warning(f"BlueZ D-Bus monitor unavailable ({e}). Falling back to polling.")
+        return None
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
@@ -1163,22 +1983,107 @@ async def mock_client_loop(server: BlessServer):
         state.distance_m += 1
         
         # Process Controls (Log only)
-        while not state.control_queue.empty():
-             cmd, val = await state.control_queue.get()
+        while scheduler.has_commands():
+             cmd, val, submitted = scheduler.pop_command()
+             state.control_latency.record(time.perf_counter() - submitted)
              logger.info(f"MOCK CTRL: Type={cmd} Val={val}")
              
         # Trigger FTMS update
-        await update_ftms(server)
+        notifier.kick()
         await asyncio.sleep(1.0)
 
+async def sim_central_loop(interval=10.0):
+    # --sim: a fake FTMS app that subscribes, takes control and changes the
+    # target speed now and then, so the whole bridge keeps cycling.
+    central = SimFtmsCentral()
+    await central.connect()
+    logger.info("SIM: FTMS central connected")
+    await central.write(FTMS_CONTROL_POINT_UUID, b'\x00')
+    speeds = (400, 600, 800, 600)
+    i = 0
+    while True:
+        await central.write(FTMS_CONTROL_POINT_UUID, struct.pack('<BH', 0x02, speeds[i % len(speeds)]))
+        i += 1
+        await asyncio.sleep(interval)
+        logger.info(f"SIM: central received {central.received} notifications "
+                    f"(dropped up={central.up.dropped} down={central.down.dropped})")
+
+class _ReplayControlPoint:
+    uuid = FTMS_CONTROL_POINT_UUID.lower()
+
+async def replay_client_loop(path, speed=1.0, emulator=None):
+    # Stands in for ifit_client_loop: recorded UUID_RX chunks go through the
+    # real decode path, recorded Control Point writes through the real FTMS
+    # handler, and the resulting iFit commands to a TreadmillEmulator.
+    logger.info(f"Starting REPLAY Client Loop ({path} at {'max' if speed <= 0 else f'{speed:g}x'} speed)...")
+    pipeline = TelemetryPipeline()
+    state.pipeline = pipeline
+    emulator = emulator or TreadmillEmulator(answer_polls=False)
+    state.pacer = ChunkPacer()
+    await emulator.start_notify(UUID_RX, pipeline.decode_telemetry)
+    state.connected_to_ifit = True
+    await robust_handshake(emulator, None)
+    # From here the recording is the only RX source; emulator echoes would
+    # interleave with recorded chunks and make runs non-deterministic
+    await emulator.stop_notify(UUID_RX)
+    
+    async def send_controls():
+        while scheduler.has_commands():
+            cmd_type, val, submitted = scheduler.pop_command()
+            packets = control_packets(cmd_type, val)
+            if packets:
+                await send_packets(emulator, packets)
+                state.control_latency.record(time.perf_counter() - submitted)
+    
+    # Commands go out beside the replay so chunk pacing never stalls it
+    sender = None
+    start = time.perf_counter()
+    frames = 0
+    async for kind, data in replay_frames(path, speed):
+        frames += 1
+        if kind == IFIT_RX:
+            pipeline.decode_telemetry(UUID_RX, data)
+        elif kind == FTMS_CONTROL:
+            handle_control_point(_ReplayControlPoint, data)
+            if sender is None or sender.done():
+                sender = asyncio.create_task(send_controls())
+    if sender:
+        await sender
+    
+    elapsed = time.perf_counter() - start
+    logger.info(f"Replay done: {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.0f} frames/s)")
+    logger.info(f"Reassembler: {pipeline.stats()} | emulator controls={emulator.controls}")
+    state.connected_to_ifit = False
+    return pipeline
+
 if __name__ == "__main__":
-    global MOCK_MODE
     import argparse
     parser = argparse.ArgumentParser(description='iFit to FTMS Bridge')
     parser.add_argument('--mock', action='store_true', help='Run in simulation mode')
     parser.add_argument('--debug', action='store_true', help='Enable verbose logging')
     parser.add_argument('--name', type=str, default="mytm", help='Bluetooth name to advertise (default: mytm)')
+    parser.add_argument('--ifit-adapter', type=str, default=IFIT_ADAPTER, help=f'HCI adapter for the treadmill link (default: {IFIT_ADAPTER}, env IFIT_ADAPTER)')
+    parser.add_argument('--ftms-adapter', type=str, default=FTMS_ADAPTER, help=f'HCI adapter the FTMS server advertises on (default: {FTMS_ADAPTER}, env FTMS_ADAPTER)')
     parser.add_argument('--pi-mode', action='store_true', help='Enable Raspberry Pi optimizations (Ghost Patch, LomaPi, No-Pair)')
+    parser.add_argument('--profile', choices=sorted(profiles.profiles), help='Treadmill model profile (default: auto-select from the capabilities reply)')
+    parser.add_argument('--warm-standby', action='store_true', help='Pi mode: keep the treadmill link unlocked while no app is connected')
+    parser.add_argument('--standby-poll', type=float, default=STANDBY_POLL_INTERVAL, help=f'Keepalive poll interval in warm standby, seconds (default: {STANDBY_POLL_INTERVAL:g})')
+    parser.add_argument('--standby-idle', type=float, default=STANDBY_IDLE_S / 60.0, help='Drop the standby link after N minutes without an app, 0 = never (default: 0)')
+    parser.add_argument('--notify-rate', type=float, default=FTMS_MAX_NOTIFY_HZ, help=f'Max FTMS notifications per second (default: {FTMS_MAX_NOTIFY_HZ:g})')
+    parser.add_argument('--central-rate', action='append', metavar='ADDRESS=HZ', help='Notification rate for one FTMS central, repeatable (default: --notify-rate)')
+    parser.add_argument('--heartbeat', type=float, default=FTMS_HEARTBEAT_S, help=f'Re-send unchanged FTMS data every N seconds (default: {FTMS_HEARTBEAT_S:g})')
+    parser.add_argument('--record', type=str, metavar='FILE', help='Record raw iFit/FTMS frames to FILE (read with recorder.py)')
+    parser.add_argument('--record-max-mb', type=float, default=8.0, help='Rotate the recording after N MB (default: 8)')
+    parser.add_argument('--replay', type=str, metavar='FILE', help='Replay a recording instead of connecting to the treadmill')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay speed multiplier, 0 = as fast as possible (default: 1)')
+    parser.add_argument('--status-format', choices=['text', 'json'], default='text', help='Status/log output: text, or JSON lines for log shippers (default: text)')
+    parser.add_argument('--status-fps', type=float, default=ConsoleUI.FPS, help=f'Status line redraws per second on a terminal (default: {ConsoleUI.FPS:g})')
+    parser.add_argument('--metrics-port', type=int, default=0, help='Serve Prometheus metrics on this port (default: off)')
+    parser.add_argument('--metrics-host', type=str, default="127.0.0.1", help='Metrics bind address (default: 127.0.0.1)')
+    parser.add_argument('--sim', action='store_true', help='Run both BLE sides in-process (simulated treadmill and phone)')
+    parser.add_argument('--sim-latency', type=float, default=10.0, help='Simulated one-way link latency in ms (default: 10)')
+    parser.add_argument('--sim-jitter', type=float, default=0.0, help='Simulated latency jitter in ms (default: 0)')
+    parser.add_argument('--sim-loss', type=float, default=0.0, help='Simulated packet loss ratio 0..1 (default: 0)')
     
     args = parser.parse_args()
     
@@ -1186,6 +2091,44 @@ if __name__ == "__main__":
     DEBUG_MODE = args.debug
     SERVER_NAME = os.environ.get("IFIT_BRIDGE_NAME", "iFitPi") if args.pi_mode else args.name # Default iFitPi for Pi (or env var)
     PI_MODE = args.pi_mode
+    IFIT_ADAPTER = args.ifit_adapter
+    FTMS_ADAPTER = args.ftms_adapter
+    if split_adapters():
+        logger.info(f"Split adapters: iFit on {IFIT_ADAPTER}, FTMS on {FTMS_ADAPTER} (no handoff)")
+    FORCED_PROFILE = args.profile
+    if FORCED_PROFILE:
+        apply_profile(profiles.get(FORCED_PROFILE), "forced")
+    WARM_STANDBY = args.warm_standby and PI_MODE
+    STANDBY_POLL_INTERVAL = args.standby_poll
+    STANDBY_IDLE_S = args.standby_idle * 60.0
+    if args.warm_standby and not PI_MODE:
+        logger.warning("--warm-standby only applies to --pi-mode (the bridge already stays connected)")
+    elif WARM_STANDBY:
+        idle = f"{args.standby_idle:g} min" if STANDBY_IDLE_S else "never"
+        logger.info(f"Warm standby: keepalive every {STANDBY_POLL_INTERVAL:g}s, idle disconnect {idle}")
+    notifier.configure(args.notify_rate, args.heartbeat)
+    centrals.configure(args.notify_rate, parse_rates(args.central_rate))
+    ui.configure(args.status_format, args.status_fps)
+    ui.start()
+    REPLAY_FILE = args.replay
+    REPLAY_SPEED = args.replay_speed
+    SIM_MODE = args.sim
+    METRICS_HOST = args.metrics_host
+    METRICS_PORT = args.metrics_port
+    ble = BLUETOOTH
+    if SIM_MODE:
+        radio = SimRadio(LinkProfile(
+            latency=args.sim_latency / 1000.0, jitter=args.sim_jitter / 1000.0, loss=args.sim_loss))
+        radio.add_peripheral(SimIfitPeripheral(IFIT_DEVICE_NAME))
+        ble = sim_transport(radio)
+        # Keep the simulated treadmill out of the real cache, and the real
+        # treadmill's address, GATT layout and pacing out of the simulation
+        device_cache.path = None
+        device_cache.entries = {}
+        logger.warning("!!! SIMULATED BLE TRANSPORT - NO RADIO !!!")
+    if args.record:
+        recorder = SessionRecorder(args.record, max_bytes=int(args.record_max_mb * 1024 * 1024))
+        logger.info(f"Recording session to {args.record}")
     
     if DEBUG_MODE:
         logger.setLevel(logging.DEBUG)
@@ -1202,10 +2145,14 @@ if __name__ == "__main__":
         # Handle mock args if needed
         
     try:
-        asyncio.run(ftms_server_loop())
+        asyncio.run(ftms_server_loop(ble))
     except KeyboardInterrupt:
         logger.info("\nStopped by User")
     except Exception as e:
         logger.error(f"Fatal Error: {e}")
     finally:
-        print() # Newline on exit
+        if recorder:
+            recorder.close()
+            logger.info(f"Recording closed: {recorder.stats()}")
+        stop_queue_logging() # Drain the log queue into the UI
+        ui.stop() # Last frame + newline on exit
@@ -0,0 +1,140 @@
+"""
+Lightweight in-process metrics for the bridge.
+
+Recording never touches the network or the event loop; the hot paths only
+append to small fixed-size structures so it is cheap on a Pi Zero. The
+optional /metrics endpoint reads everything at scrape time.
+"""
+import asyncio
+import bisect
+from collections import deque
+
+# Bucket upper bounds in seconds (roughly 1-2-5 spaced, 1 ms .. 5 s)
+DEFAULT_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts plus a window of recent samples for percentiles."""
+
+    def __init__(self, name, buckets=DEFAULT_BUCKETS, window=1024):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def summary(self):
+        return (f"{self.name}: n={self.count} "
+                f"p50={self.percentile(50) * 1000:.1f}ms "
+                f"p95={self.percentile(95) * 1000:.1f}ms "
+                f"p99={self.percentile(99) * 1000:.1f}ms")
+
+
+class LoopLagMonitor:
+    """Measures event loop blocking as the overshoot of a periodic sleep."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.lag = LatencyHistogram("event loop lag")
+        self.max_lag = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.lag.record(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+
+# =============================================================================
+# PROMETHEUS TEXT EXPOSITION
+# =============================================================================
+# Pull-based: the registry holds callables and histograms and only reads
+# them when /metrics is scraped, so the BLE hot paths pay nothing extra.
+def _format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="ifit_bridge"):
+        self.prefix = prefix
+        self.metrics = []  # (kind, name, help, source)
+
+    def counter(self, name, help_text, fn):
+        self.metrics.append(("counter", f"{self.prefix}_{name}_total", help_text, fn))
+
+    def gauge(self, name, help_text, fn):
+        self.metrics.append(("gauge", f"{self.prefix}_{name}", help_text, fn))
+
+    def histogram(self, name, help_text, fn):
+        # fn returns the LatencyHistogram (objects get replaced across sessions)
+        self.metrics.append(("histogram", f"{self.prefix}_{name}_seconds", help_text, fn))
+
+    def render(self):
+        lines = []
+        for kind, name, help_text, source in self.metrics:
+            try:
+                value = source()
+            except Exception:
+                continue # Source not there yet (no session so far)
+            if value is None:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind != "histogram":
+                lines.append(f"{name} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(value.buckets, value.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {value.count}')
+            lines.append(f"{name}_sum {_format_value(value.total)}")
+            lines.append(f"{name}_count {value.count}")
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            parts = request.decode("latin-1").split()
+            while (await asyncio.wait_for(reader.readline(), 5.0)) not in (b"\r\n", b"\n", b""):
+                pass # Skip headers
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(f"HTTP/1.0 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=9105):
+        server = await asyncio.start_server(self._handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,200 @@
+"""
+Treadmill model profiles.
+
+Everything that differs between iFit consoles lives in one JSON file per
+model under profiles/ (repo root, or $IFIT_PROFILE_DIR): FTMS speed and
+incline ranges, where the status fields sit and how they scale, the poll
+and control command layouts, and the unlock handshake with its fallback
+waits. See profiles/default.json for the format.
+
+Files are compiled once at startup: a StatusLayout (one Struct for all
+fields), framed handshake and poll packets, packed FTMS range values and
+a ControlCodec holding the framed packets for every speed/incline target
+in the model's range. Supporting another model adds a file, not a branch
+on the packet path.
+
+Selection: --profile forces one. Otherwise a connect starts with the
+profile remembered for that treadmill (or one matching its BLE name), and
+the SupportedCapabilities (0x80) reply during the handshake picks again:
+the profile whose required capability codes are all present wins, the
+most specific first. "default" is the fallback.
+"""
+import json
+import logging
+import os
+import struct
+
+from ifit_protocol import STATUS_FIELDS, HandshakeStep, StatusLayout, frame_message
+
+logger = logging.getLogger("IFIT-FTMS")
+
+DEFAULT_PROFILE_DIR = os.environ.get(
+    "IFIT_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles"),
+)
+DEFAULT_PROFILE = "default"
+
+# Control command ids the bridge uses (ControlScheduler slots); each profile
+# maps them to its own type byte
+CONTROL_TYPES = {"speed": 0x01, "incline": 0x02}
+
+
+class ControlCodec:
+    """Control commands as ready-to-write chunk packets, one table per type.
+
+    Every target FTMS can send (the model's range in its advertised step)
+    is encoded and framed once when the profile is compiled, so a control
+    write is a dict lookup; see benchmarks/bench_control_codec.py for the
+    size. Values off the table are built on the spot and not kept.
+    """
+
+    def __init__(self, encode, ranges):
+        self.encode = encode
+        self.tables = {}
+        for type_id, values in ranges.items():
+            self.tables[type_id] = {value: frame_message(encode(type_id, value)) for value in values}
+
+    def packets(self, type_id, value):
+        try:
+            return self.tables[type_id][value]
+        except KeyError:
+            msg = self.encode(type_id, value)
+            return frame_message(msg) if msg else ()
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+
+def _clamped(profile, key, spec, value_struct):
+    # Range spec limited to what value_struct holds in 0.01 units
+    bits = 8 * value_struct.size
+    signed = value_struct.format[-1].islower()
+    lo, hi = (-(1 << (bits - 1)), (1 << (bits - 1)) - 1) if signed else (0, (1 << bits) - 1)
+    clamped = dict(spec, min=max(spec["min"], lo / 100), max=min(spec["max"], hi / 100))
+    if clamped != spec:
+        logger.warning(f"Treadmill profile {profile}: {key} {spec['min']}..{spec['max']} doesn't fit "
+                       f"control value {value_struct.format!r}, advertising {clamped['min']}..{clamped['max']}")
+    return clamped
+
+
+def _range(spec, scale, fmt):
+    # FTMS Supported Range: min, max, increment in the characteristic's units
+    return struct.pack(fmt, *(round(spec[k] * scale) for k in ("min", "max", "step")))
+
+
+class Profile:
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.description = spec.get("description", "")
+        match = spec.get("match", {})
+        self.names = tuple(match.get("names", ()))
+        self.capabilities = frozenset(bytes.fromhex(match.get("capabilities", "")))
+
+        status = spec["status"]
+        fields = status["fields"]
+        self.status = StatusLayout(status["length"], {
+            name: (fields[name]["offset"], fields[name]["type"], fields[name]["divisor"])
+            for name in STATUS_FIELDS})
+
+        self.poll_packets = frame_message(bytes.fromhex(spec["poll"]))
+        self.handshake = tuple(HandshakeStep(bytes.fromhex(step["message"]), step["wait"],
+                                             step.get("reply_length"), self.status.len_byte)
+                               for step in spec["handshake"])
+
+        # cmd id -> (message head incl. type byte, checksum of head[4:] + trailer, value Struct, trailer)
+        control = spec["control"]
+        header, trailer = bytes.fromhex(control["header"]), bytes.fromhex(control["trailer"])
+        value = struct.Struct(control["value"])
+        self.control = {}
+        for kind, type_byte in control["types"].items():
+            head = header + bytes([type_byte])
+            self.control[CONTROL_TYPES[kind]] = (head, sum(head[4:]) + sum(trailer), value, trailer)
+
+        # Targets arrive in 0.01 km/h and 0.01 % whatever the model. FTMS only
+        # advertises what the value field can carry, so a target the app
+        # may send is never one the treadmill can't be told about.
+        speed = _clamped(self.name, "speed_kph", spec["speed_kph"], value)
+        incline = _clamped(self.name, "incline_pct", spec["incline_pct"], value)
+        self.speed_range = _range(speed, 100, "<HHH")  # 0.01 km/h
+        self.incline_range = _range(incline, 10, "<hhh")  # 0.1 %
+        # cmd id -> (lowest, highest) accepted target; speed 0 = stop
+        self.limits = {
+            CONTROL_TYPES["speed"]: (0, round(speed["max"] * 100)),
+            CONTROL_TYPES["incline"]: (round(incline["min"] * 100), round(incline["max"] * 100)),
+        }
+        # FTMS writes come in 0.1 km/h and 0.1 % steps: only those are framed ahead
+        steps = {CONTROL_TYPES["speed"]: round(speed["step"] * 100),
+                 CONTROL_TYPES["incline"]: round(incline["step"] * 100)}
+        self.codec = ControlCodec(self.encode_control, {
+            t: range(lo, hi + 1, steps[t]) for t, (lo, hi) in self.limits.items() if t in self.control})
+
+    def accepts(self, type_id, value):
+        """Is value (0.01 units) a target this model advertises and can encode?"""
+        limits = self.limits.get(type_id)
+        return limits is not None and type_id in self.control and limits[0] <= value <= limits[1]
+
+    def encode_control(self, type_id, value):
+        entry = self.control.get(type_id)
+        if entry is None:
+            return b''
+        head, head_sum, value_struct, trailer = entry
+        packed = value_struct.pack(int(value))
+        msg = bytearray(head)
+        msg += packed
+        msg += trailer
+        msg.append((head_sum + sum(packed)) & 0xFF)
+        return msg
+
+    def matches(self, name=None, capabilities=None):
+        if self.names and name not in self.names:
+            return False
+        if self.capabilities and not (capabilities and self.capabilities <= set(capabilities)):
+            return False
+        return True
+
+    def __repr__(self):
+        return f"Profile({self.name!r})"
+
+
+class ProfileSet:
+    def __init__(self, directory=DEFAULT_PROFILE_DIR):
+        self.directory = directory
+        self.profiles = {}
+        self.load()
+
+    def load(self):
+        try:
+            files = sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+        except FileNotFoundError:
+            files = []
+        for filename in files:
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path, "r") as f:
+                    spec = json.load(f)
+                profile = Profile(spec)
+            except Exception as e:
+                logger.warning(f"Treadmill profile {filename} skipped: {e!r}")
+                continue
+            self.profiles[profile.name] = profile
+        if DEFAULT_PROFILE not in self.profiles:
+            raise RuntimeError(f"No '{DEFAULT_PROFILE}' treadmill profile in {self.directory}")
+
+    @property
+    def default(self):
+        return self.profiles[DEFAULT_PROFILE]
+
+    def get(self, name):
+        return self.profiles.get(name) if name else None
+
+    def select(self, name=None, capabilities=None):
+        """Most specific profile matching a BLE name and/or capability codes."""
+        best, best_score = self.default, (0, False)
+        for profile in self.profiles.values():
+            score = (len(profile.capabilities), bool(profile.names))
+            if score > best_score and profile.matches(name, capabilities):
+                best, best_score = profile, score
+        return best
+
+
+profiles = ProfileSet()
@@ -6,6 +6,8 @@ import sys
 
 import logging
 
+from ifit_protocol import PacketReassembler, StatusDecoder
+
 # Configure Logging
 # logging.basicConfig(level=logging.INFO)
 # logger = logging.getLogger("bleak")
@@ -30,60 +32,32 @@ CMD_8_UNK = bytes.fromhex("020402150415020E000000000000000000000000001001003A")
 CMD_9_START = bytes.fromhex("020402130413020C0000000000000000000000800000A5")
 CMD_POLL_STATUS = bytes.fromhex("02040210041002000A13943300104010008018F2")
 
-class PacketReassembler:
-    def __init__(self):
-        self.buffer = bytearray()
-        self.expected_length = 0
-
-    def process_chunk(self, data):
-        payloads = []
-        if data[0] == 0xFE and len(data) >= 4:
-            self.expected_length = data[2]
-            self.buffer = bytearray()
-            return []
-        if len(data) > 2:
-            self.buffer.extend(data[2:2+data[1]])
-            if data[0] == 0xFF:
-                if len(self.buffer) == self.expected_length:
-                    payloads.append(bytes(self.buffer))
-                self.buffer = bytearray()
-        return payloads
-
 reassembler = PacketReassembler()
 
 global START_DIST
 START_DIST = None
 
+status_decoder = StatusDecoder()
+
 def decode_status(payload):
     global START_DIST
-    # Expecting: 01 04 02 2F 04 2F ...
-    if len(payload) < 30 or payload[3] != 0x2F:
+    # Expecting: 01 04 02 2F 04 2F ... (checksum validated by the decoder)
+    rec = status_decoder.decode(payload)
+    if rec is None:
         return
 
     try:
-        # Offsets...
         # Distance (Offset 42) - Cumulative Meters (Scale 100cm)
-        if len(payload) >= 42 + 4:
-            dist_raw = struct.unpack_from('<I', payload, 42)[0]
-            total_km = dist_raw / 100.0 / 1000.0
-            total_mi = total_km * 0.621371
-        else:
-            total_mi = 0.0
+        total_mi = rec.distance_m / 1000.0 * 0.621371
 
-        # ... other decoding ...
         # Speed (8), Incline (10), Time (27), Calories (31)
-        speed_raw = struct.unpack_from('<H', payload, 8)[0]
-        speed_mph = (speed_raw / 100.0) * 0.621371
-        
-        incline_raw = struct.unpack_from('<H', payload, 10)[0]
-        incline_pct = incline_raw / 100.0
+        speed_mph = rec.speed_kph * 0.621371
+        incline_pct = rec.incline_pct
         
-        time_sec = struct.unpack_from('<I', payload, 27)[0]
-        m, s = divmod(time_sec, 60)
+        m, s = divmod(rec.elapsed_s, 60)
         h, m = divmod(m, 60)
         
-        cal_raw = struct.unpack_from('<I', payload, 31)[0]
-        cal_val = cal_raw / 97656.0
+        cal_val = rec.calories
 
         output = (f"\r🏃 {speed_mph:4.1f} MPH | ⛰️  {incline_pct:4.1f}% | "
                   f"⏱️  {h:02}:{m:02}:{s:02} | 📏 {total_mi:6.3f} mi | 🔥 {cal_val:4.1f} cal")
@@ -105,8 +79,9 @@ def notification_handler(sender, data):
     # Check for Reassembly
     # Debug: Confirm verify we get ANY data
     if DEBUG_MODE: print(f"RX: {data.hex().upper()}") # Debug
-    for p in reassembler.process_chunk(data):
-        decode_status(p)
+    payload = reassembler.process_chunk(data)
+    if payload is not None:
+        decode_status(payload)
 
 async def send_chunked_message(client, payload, char_obj=None):
     total_len = len(payload)
@@ -157,12 +132,13 @@ async def main():
 
         
         
-        # Always Print Services for Debugging
-        print("Discovered Services:")
-        for service in client.services:
-            print(f"Service: {service.uuid}")
-            for char in service.characteristics:
-                    print(f"  Char: {char.uuid} ({char.properties})")
+        # Service tree only with --debug (it is the same every connect)
+        if DEBUG_MODE:
+            print("Discovered Services:")
+            for service in client.services:
+                print(f"Service: {service.uuid}")
+                for char in service.characteristics:
+                        print(f"  Char: {char.uuid} ({char.properties})")
         
         await client.start_notify(NOTIFY_CHAR_UUID, notification_handler)
         
@@ -0,0 +1,184 @@
+"""
+Binary session recorder: raw iFit and FTMS frames, timestamped, on disk.
+
+File layout (little endian):
+
+    File header:  b"IFR1" <start wall time: float64>
+    Frame:        <len: u8> <kind: u8> <ms since start: u32> <len bytes>
+
+Frames are packed into an in-memory buffer and written in batches (when
+the buffer fills, and once a second from run()), so the 5 Hz telemetry
+path only pays for a struct pack and a bytearray append. Files rotate by
+size like logging.RotatingFileHandler: session.ifr -> session.ifr.1 -> ...
+A recording left by an earlier run is rotated out the same way at start,
+not overwritten. If the disk goes away mid-session, recording stops and
+the bridge carries on.
+
+    python recorder.py session.ifr   # Dump a recording
+"""
+import asyncio
+import logging
+import os
+import struct
+import sys
+import time
+
+logger = logging.getLogger("IFIT-FTMS")
+
+MAGIC = b"IFR1"
+FILE_HEADER = struct.Struct("<4sd")
+FRAME_HEADER = struct.Struct("<BBI")
+
+# Frame kinds
+IFIT_RX = 1       # Notification chunk from the treadmill (UUID_RX)
+FTMS_CONTROL = 2  # Control Point write from the FTMS app
+
+KIND_NAMES = {IFIT_RX: "ifit-rx", FTMS_CONTROL: "ftms-cp"}
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+FLUSH_INTERVAL = 1.0
+FLUSH_BYTES = 16 * 1024
+
+
+class SessionRecorder:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.file = None
+        self.file_size = 0
+        self.t0 = 0.0
+        self.frames = 0
+        self.flushes = 0
+        self.rotations = 0
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self._shift() # Keep the previous session
+        self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.path, "wb", buffering=0)
+        self.t0 = time.monotonic()
+        self.file.write(FILE_HEADER.pack(MAGIC, time.time()))
+        self.file_size = FILE_HEADER.size
+
+    def record(self, kind, data):
+        # Hot path: no I/O unless the batch is full
+        if self.file is None:
+            return
+        size = len(data)
+        if size > 255:
+            data = data[:255]
+            size = 255
+        ms = int((time.monotonic() - self.t0) * 1000)
+        self.buffer += FRAME_HEADER.pack(size, kind, ms)
+        self.buffer += data
+        self.frames += 1
+        if len(self.buffer) >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer or self.file is None:
+            return
+        try:
+            self.file.write(self.buffer)
+            self.file_size += len(self.buffer)
+            self.flushes += 1
+        except (OSError, ValueError) as e:
+            logger.warning(f"Recorder write failed ({e}). Frames dropped.")
+        self.buffer.clear()
+        if self.file_size >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.file.close()
+        try:
+            self._shift()
+            self._open()
+        except OSError as e:
+            # Never let the recorder take telemetry down with it
+            logger.error(f"Recorder rotation failed ({e}). Recording stopped.")
+            self.file = None
+            self.buffer.clear()
+            return
+        self.rotations += 1
+
+    def _shift(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                self.flush()
+        finally:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def stats(self):
+        return f"frames={self.frames} flushes={self.flushes} rotations={self.rotations}"
+
+
+def session_files(path):
+    """The recording at path plus its rotated backups, oldest first."""
+    backups = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        backups.append(f"{path}.{i}")
+        i += 1
+    files = backups[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_frames(path):
+    """Yields (wall time, kind, bytes) from one recording file, lazily.
+
+    A truncated final frame (crash mid-flush) ends the stream quietly.
+    """
+    with open(path, "rb") as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            return
+        magic, start = FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a session recording")
+        while True:
+            head = f.read(FRAME_HEADER.size)
+            if len(head) < FRAME_HEADER.size:
+                return
+            size, kind, ms = FRAME_HEADER.unpack(head)
+            data = f.read(size)
+            if len(data) < size:
+                return
+            yield start + ms / 1000.0, kind, data
+
+
+def read_session(path):
+    """Frames from a recording and its rotated backups, in order."""
+    for name in session_files(path):
+        yield from read_frames(name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python recorder.py <session.ifr>")
+        sys.exit(1)
+    for ts, kind, data in read_session(sys.argv[1]):
+        stamp = time.strftime("%H:%M:%S", time.localtime(ts)) + f".{int(ts * 1000) % 1000:03d}"
+        print(f"{stamp} {KIND_NAMES.get(kind, kind):>8} {data.hex()}")
@@ -0,0 +1,154 @@
+"""
+Replay and emulation helpers for running the bridge without a treadmill.
+
+replay_frames() paces a recording (see recorder.py) at real time, N x
+speed, or as fast as possible (speed 0). Timing comes only from the
+recorded timestamps, so two runs feed the bridge the same frames in the
+same order.
+
+TreadmillEmulator stands in for the BleakClient connected to the iFit
+console: it reassembles what the bridge writes and answers like the
+treadmill does (handshake echoes, the capabilities list, control commands,
+0x2F status for polls).
+"""
+import asyncio
+import time
+
+from ifit_protocol import (CALORIE_DIVISOR, CAPABILITIES_COMMAND, COMMAND_INDEX, PacketReassembler,
+                           build_status_message, checksum, frame_message)
+from recorder import read_session
+
+FAST_YIELD_EVERY = 64 # Frames between loop yields when replaying at full speed
+
+# Control command layout: 02 04 02 09 04 09 02 01 <type> <value u16> 00 <cs>
+CONTROL_LEN_BYTE = 0x09
+POLL_LEN_BYTE = 0x10
+TYPE_SPEED = 0x01
+TYPE_INCLINE = 0x02
+KCAL_PER_KM = 70.0 # ~1 kcal/kg/km for a 70 kg runner
+# SupportedCapabilities (0x80) reply from doc/packet_inventory.md
+CAPABILITIES_REPLY = bytes.fromhex("01040210041080020A4C474D4E40464F51414277")
+
+
+async def replay_frames(path, speed=1.0):
+    """Async generator of (kind, data) from a recording, paced by its timestamps."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first_ts = None
+    for n, (ts, kind, data) in enumerate(read_session(path)):
+        if first_ts is None:
+            first_ts = ts
+        if speed > 0:
+            delay = (ts - first_ts) / speed - (loop.time() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif n % FAST_YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+        yield kind, data
+
+
+class _Services:
+    def get_characteristic(self, uuid):
+        return uuid
+
+
+class TreadmillEmulator:
+    """BleakClient-shaped fake iFit console.
+
+    Replies go out as notification chunks after reply_latency. With
+    answer_polls=False, polls are swallowed (telemetry comes from a replay).
+    """
+
+    def __init__(self, reply_latency=0.01, answer_polls=True):
+        self.reply_latency = reply_latency
+        self.answer_polls = answer_polls
+        self.reassembler = PacketReassembler()
+        self.services = _Services()
+        self.is_connected = True
+        self.callback = None
+
+        self.speed_raw = 0
+        self.incline_raw = 0
+        self.distance_m = 0.0
+        self.calories = 0.0
+        self.started = time.monotonic()
+        self.last_tick = self.started
+
+        self.messages = 0
+        self.polls = 0
+        self.controls = 0
+
+    # --- BleakClient surface ---
+    async def start_notify(self, char, callback):
+        self.callback = callback
+
+    async def stop_notify(self, char):
+        self.callback = None
+
+    async def write_gatt_char(self, char, data, response=None):
+        self.receive(data)
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    # --- Treadmill behaviour ---
+    def receive(self, data):
+        msg = self.reassembler.process_chunk(data)
+        if msg is not None:
+            self.handle_message(bytes(msg))
+
+    def handle_message(self, msg):
+        self.messages += 1
+        if len(msg) <= COMMAND_INDEX:
+            return
+        command = msg[COMMAND_INDEX]
+        if command == 0x02 and msg[3] == POLL_LEN_BYTE:
+            self.polls += 1
+            if self.answer_polls:
+                self.send(self.status_message())
+            return
+        if command == 0x02 and msg[3] == CONTROL_LEN_BYTE and len(msg) >= 11:
+            self.controls += 1
+            value = msg[9] | (msg[10] << 8)
+            if msg[8] == TYPE_SPEED:
+                self.tick()
+                self.speed_raw = value
+            elif msg[8] == TYPE_INCLINE:
+                self.incline_raw = value
+        if command == CAPABILITIES_COMMAND:
+            self.send(CAPABILITIES_REPLY)
+            return
+        # Handshake steps and controls: echo the command byte
+        reply = bytearray([0x01, 0x04, 0x02, 0x04, 0x04, 0x04, command, 0x00])
+        reply[-1] = checksum(reply)
+        self.send(bytes(reply))
+
+    def tick(self):
+        now = time.monotonic()
+        km = self.speed_raw / 100.0 * (now - self.last_tick) / 3600.0
+        self.distance_m += km * 1000.0
+        self.calories += km * KCAL_PER_KM
+        self.last_tick = now
+
+    def status_message(self):
+        self.tick()
+        return build_status_message(
+            speed_raw=self.speed_raw,
+            incline_raw=self.incline_raw,
+            elapsed_s=int(self.last_tick - self.started),
+            calories_raw=int(self.calories * CALORIE_DIVISOR),
+            distance_raw=int(self.distance_m * 100),
+        )
+
+    def send(self, msg):
+        if self.callback is None:
+            return
+        packets = frame_message(msg)
+        asyncio.get_running_loop().call_later(self.reply_latency, self._deliver, packets)
+
+    def _deliver(self, packets):
+        if self.callback is None or not self.is_connected:
+            return
+        for pkt in packets:
+            self.callback(None, bytearray(pkt))
+
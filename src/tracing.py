@@ -0,0 +1,98 @@
+"""
+Always-on flight recorder for the bridge's hot paths.
+
+Events are plain tuples (perf_counter, kind, a, b) appended to a bounded
+deque, so recording one costs a clock read and an append: no formatting, no
+I/O, no locks. The buffer only turns into text when it is dumped, which
+happens on watchdog reconnects, connect errors and SIGUSR1:
+
+    kill -USR1 $(pgrep -f main.py)
+    ls ~/.cache/treadmill-connect/traces/
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger("IFIT-FTMS")
+
+DEFAULT_CAPACITY = 4096  # ~15 s of traffic at 5 Hz polling with controls
+DEFAULT_TRACE_DIR = os.environ.get(
+    "IFIT_TRACE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "treadmill-connect", "traces"),
+)
+MAX_DUMPS = 20
+
+# Event kinds: (a, b) meaning in the comments
+CHUNK_RX = 1       # chunk length, first byte (seq / FE header)
+MSG_DECODED = 2    # message length, command byte
+POLL_TX = 3        # -, -
+COMMAND_TX = 4     # command type, value
+NOTIFY = 5         # sent (bool, or centrals reached when fanned out), -
+SUBPROCESS = 6     # return code (None on timeout), argv tuple
+CONNECT = 7        # attempt, -
+DISCONNECT = 8     # -, -
+CONNECT_ERROR = 9  # attempt, exception
+WATCHDOG = 10      # seconds since last telemetry, -
+HANDSHAKE = 11     # acked steps, duration
+
+KIND_NAMES = {
+    CHUNK_RX: "chunk_rx", MSG_DECODED: "msg_decoded", POLL_TX: "poll_tx", COMMAND_TX: "command_tx",
+    NOTIFY: "notify", SUBPROCESS: "subprocess", CONNECT: "connect", DISCONNECT: "disconnect",
+    CONNECT_ERROR: "connect_error", WATCHDOG: "watchdog", HANDSHAKE: "handshake",
+}
+
+
+class FlightRecorder:
+    def __init__(self, capacity=DEFAULT_CAPACITY, directory=DEFAULT_TRACE_DIR):
+        self.events = deque(maxlen=capacity)
+        self.directory = directory
+        self.dumps = 0
+        append = self.events.append
+        clock = time.perf_counter
+
+        # A closure instead of a method: one less attribute lookup per event
+        def record(kind, a=0, b=0):
+            append((clock(), kind, a, b))
+        self.record = record
+
+    def dump(self, reason):
+        """Snapshot now, format and write off the event loop. Returns the path."""
+        snapshot = list(self.events)
+        now = time.perf_counter()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"flight-{stamp}-{self.dumps:03d}-{reason}.log")
+        self.dumps += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(path, reason, snapshot, now)
+            return path
+        loop.run_in_executor(None, self._write, path, reason, snapshot, now)
+        return path
+
+    def _write(self, path, reason, snapshot, now):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"# flight recorder dump: {reason} at {time.strftime('%Y-%m-%d %H:%M:%S')}, "
+                        f"{len(snapshot)} events\n")
+                f.write("# t_ms (relative to dump)  kind  a  b\n")
+                for ts, kind, a, b in snapshot:
+                    if isinstance(b, (bytes, bytearray, memoryview)):
+                        b = bytes(b).hex()
+                    f.write(f"{(ts - now) * 1000:10.1f}  {KIND_NAMES.get(kind, kind):<13} {a} {b}\n")
+            self._prune()
+            logger.warning(f"Flight recorder dumped to {path}")
+        except Exception as e:
+            logger.error(f"Flight recorder dump failed: {e}")
+
+    def _prune(self):
+        dumps = sorted(f for f in os.listdir(self.directory) if f.startswith("flight-"))
+        for name in dumps[:-MAX_DUMPS]:
+            os.remove(os.path.join(self.directory, name))
+
+
+tracer = FlightRecorder()
+trace = tracer.record
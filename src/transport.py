@@ -0,0 +1,404 @@
+"""
+In-memory BLE transport: the whole bridge in one process, no radio.
+
+Drop-in stand-ins for the three classes the bridge touches:
+
+    SimBleakScanner / SimBleakClient  -> iFit side (bleak)
+    SimBlessServer                    -> FTMS side (bless)
+
+plus the devices on the other end of each link: SimIfitPeripheral (a
+TreadmillEmulator speaking the handshake / poll / control protocol) and
+SimFtmsCentral (a phone app subscribing to Treadmill Data and writing the
+Control Point). Every hop goes through a LinkProfile with latency, jitter
+and loss; jitter never reorders packets (BLE links are in-order).
+
+The bridge never imports these by name: ftms_server_loop and
+ifit_client_loop take a BleTransport naming the classes to use (main
+passes bleak's and bless's unless told otherwise).
+
+    radio = SimRadio(LinkProfile(latency=0.01, jitter=0.005, loss=0.01))
+    radio.add_peripheral(SimIfitPeripheral("I_TL"))
+    asyncio.run(main.ftms_server_loop(sim_transport(radio)))
+"""
+import asyncio
+import random
+import time
+
+from ifit_protocol import frame_message
+from replay import TreadmillEmulator
+
+SIM_ADDRESS = "00:00:5E:00:53:01" # Documentation range, never a real device
+SIM_CENTRAL_PREFIX = "00:00:5E:00:53:" # Phones get :10, :11, ...
+
+# The simulated console's GATT table (same UUIDs as the real one)
+IFIT_SERVICE_UUID = "00001533-1412-efde-1523-785feabcd123"
+IFIT_TX_UUID = "00001534-1412-efde-1523-785feabcd123"
+IFIT_RX_UUID = "00001535-1412-efde-1523-785feabcd123"
+DIS_FIRMWARE_UUID = "00002a26-0000-1000-8000-00805f9b34fb"
+
+
+class SimLinkError(Exception):
+    pass
+
+
+class LinkProfile:
+    """Delay/loss model for one direction of one link."""
+
+    def __init__(self, latency=0.005, jitter=0.0, loss=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.last_due = 0.0
+        self.delivered = 0
+        self.dropped = 0
+
+    def copy(self):
+        return LinkProfile(self.latency, self.jitter, self.loss, self.rng.random())
+
+    def delay(self):
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def lost(self):
+        if self.loss > 0 and self.rng.random() < self.loss:
+            self.dropped += 1
+            return True
+        return False
+
+    def deliver(self, fn, *args):
+        # In-order delivery: a packet never overtakes the previous one
+        if self.lost():
+            return False
+        loop = asyncio.get_running_loop()
+        due = max(loop.time() + self.delay(), self.last_due)
+        self.last_due = due
+        loop.call_at(due, fn, *args)
+        self.delivered += 1
+        return True
+
+    async def hop(self):
+        # Acknowledged operation: one round trip, or SimLinkError if lost
+        await asyncio.sleep(self.delay() * 2)
+        if self.lost():
+            raise SimLinkError("ATT request lost")
+        self.delivered += 1
+
+
+class SimRadio:
+    """Everything in range: peripherals to scan/connect, started servers."""
+
+    def __init__(self, profile=None):
+        self.profile = profile or LinkProfile()
+        self.peripherals = {}  # address -> SimIfitPeripheral
+        self.servers = []
+        self.connect_time = 0.05
+        self.discovery_time = 0.0 # BlueZ resolving services after a connect
+        self.resolved = set()     # Addresses bleak has a service tree for (dangerous_use_bleak_cache)
+
+    def add_peripheral(self, peripheral):
+        self.peripherals[peripheral.address.upper()] = peripheral
+        return peripheral
+
+
+radio = SimRadio()
+
+
+# =============================================================================
+# IFIT SIDE (bleak)
+# =============================================================================
+class SimCharacteristic:
+    def __init__(self, uuid, handle, service_uuid, properties):
+        self.uuid = uuid
+        self.handle = handle
+        self.service_uuid = service_uuid
+        self.properties = properties
+
+
+class SimServices:
+    def __init__(self, chars):
+        self.chars = {c.uuid.lower(): c for c in chars}
+
+    def get_characteristic(self, uuid):
+        return self.chars.get(str(getattr(uuid, "uuid", uuid)).lower())
+
+
+class SimIfitPeripheral(TreadmillEmulator):
+    """The treadmill console at the far end of a (lossy) link."""
+
+    def __init__(self, name="I_TL", address=SIM_ADDRESS, firmware="sim-1.0", rssi=-55):
+        super().__init__(reply_latency=0.0)
+        self.name = name
+        self.address = address
+        self.firmware = firmware
+        self.rssi = rssi
+        self.link = None
+        self.client = None
+        self.is_connected = False
+        self.gatt = [
+            SimCharacteristic(IFIT_TX_UUID, 13, IFIT_SERVICE_UUID, ["write", "write-without-response"]),
+            SimCharacteristic(IFIT_RX_UUID, 15, IFIT_SERVICE_UUID, ["notify"]),
+            SimCharacteristic(DIS_FIRMWARE_UUID, 22, "0000180a-0000-1000-8000-00805f9b34fb", ["read"]),
+        ]
+
+    def send(self, msg):
+        if self.callback is None or self.link is None:
+            return
+        for pkt in frame_message(msg):
+            self.link.deliver(self._deliver, (pkt,))
+
+    def drop(self):
+        """Supervision timeout: the link dies without either side asking."""
+        client, self.client = self.client, None
+        self.is_connected = False
+        self.callback = None
+        if client is not None:
+            client.peripheral = None
+            if client.disconnected_callback:
+                client.disconnected_callback(client)
+
+
+class SimBLEDevice:
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+
+
+class SimAdvertisement:
+    def __init__(self, local_name, rssi):
+        self.local_name = local_name
+        self.rssi = rssi
+
+
+class SimBleakScanner:
+    """Class-level API subset of BleakScanner used by the bridge."""
+
+    @staticmethod
+    async def discover(timeout=5.0, return_adv=False, **kwargs):
+        await asyncio.sleep(min(timeout, 0.2))
+        found = {p.address: (SimBLEDevice(p.address, p.name), SimAdvertisement(p.name, p.rssi))
+                 for p in radio.peripherals.values()}
+        return found if return_adv else [d for d, _adv in found.values()]
+
+    @staticmethod
+    async def find_device_by_filter(filterfunc, timeout=10.0, **kwargs):
+        await asyncio.sleep(radio.profile.latency)
+        for p in radio.peripherals.values():
+            device, adv = SimBLEDevice(p.address, p.name), SimAdvertisement(p.name, p.rssi)
+            if filterfunc(device, adv):
+                return device
+        return None
+
+
+class SimBleakClient:
+    def __init__(self, address_or_ble_device, disconnected_callback=None, services=None,
+                 timeout=10.0, **kwargs):
+        self.address = getattr(address_or_ble_device, "address", address_or_ble_device)
+        self.disconnected_callback = disconnected_callback
+        self.timeout = timeout
+        self.peripheral = None
+        self.services = SimServices([])
+        self.write_link = radio.profile.copy()
+
+    @property
+    def is_connected(self):
+        return self.peripheral is not None and self.peripheral.is_connected
+
+    async def connect(self, dangerous_use_bleak_cache=False, **kwargs):
+        address = str(self.address).upper()
+        peripheral = radio.peripherals.get(address)
+        await asyncio.sleep(radio.connect_time)
+        if peripheral is None:
+            raise SimLinkError(f"Device with address {self.address} was not found")
+        if not (dangerous_use_bleak_cache and address in radio.resolved):
+            await asyncio.sleep(radio.discovery_time)
+            radio.resolved.add(address)
+        peripheral.is_connected = True
+        peripheral.link = radio.profile.copy()
+        peripheral.client = self
+        self.peripheral = peripheral
+        self.services = SimServices(peripheral.gatt)
+        return True
+
+    async def disconnect(self):
+        if self.peripheral is not None:
+            self.peripheral.is_connected = False
+            self.peripheral.callback = None
+            self.peripheral.client = None
+            self.peripheral = None
+            if self.disconnected_callback:
+                self.disconnected_callback(self)
+        return True
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+
+    async def start_notify(self, char, callback, **kwargs):
+        await self.write_link.hop() # CCCD write
+        self.peripheral.callback = callback
+
+    async def stop_notify(self, char):
+        self.peripheral.callback = None
+
+    async def write_gatt_char(self, char, data, response=False):
+        if not self.is_connected:
+            raise SimLinkError("Not connected")
+        peripheral = self.peripheral
+        if not response:
+            # Queued on the link; the caller does not wait (lost = silently gone)
+            self.write_link.deliver(self._arrive, peripheral, bytes(data))
+            return
+        await self.write_link.hop()
+        if not peripheral.is_connected:
+            raise SimLinkError("Disconnected during write")
+        peripheral.receive(bytes(data))
+
+    @staticmethod
+    def _arrive(peripheral, data):
+        if peripheral.is_connected:
+            peripheral.receive(data)
+
+    async def read_gatt_char(self, char):
+        await self.write_link.hop()
+        return self.peripheral.firmware.encode()
+
+
+# =============================================================================
+# FTMS SIDE (bless)
+# =============================================================================
+class SimServerCharacteristic:
+    def __init__(self, uuid, properties, value):
+        self.uuid = uuid.lower()
+        self.properties = properties
+        self.value = value
+
+
+class SimBlessServer:
+    def __init__(self, name, loop=None, **kwargs):
+        self.name = name
+        self.chars = {}
+        self.centrals = []
+        self.advertising = False
+        self.read_request_func = None
+        self.write_request_func = None
+        self.on_connect = None    # fn(path, address), like BluezMonitor
+        self.on_disconnect = None
+        radio.servers.append(self)
+
+    async def add_new_service(self, uuid):
+        pass
+
+    async def add_new_characteristic(self, service_uuid, char_uuid, properties, value, permissions):
+        self.chars[char_uuid.lower()] = SimServerCharacteristic(char_uuid, properties, value)
+
+    async def start(self, **kwargs):
+        self.advertising = True
+        return True
+
+    async def stop(self):
+        self.advertising = False
+        return True
+
+    async def is_connected(self):
+        return bool(self.centrals)
+
+    def get_characteristic(self, uuid):
+        return self.chars.get(str(uuid).lower())
+
+    def update_value(self, service_uuid, char_uuid):
+        char = self.get_characteristic(char_uuid)
+        if char is None or char.value is None:
+            return False
+        data = bytes(char.value)
+        for central in self.centrals:
+            central.push(char.uuid, data)
+        return True
+
+    def update_value_to(self, addresses, service_uuid, char_uuid):
+        # Per-central notify; BlueZ (through bless) can only broadcast
+        char = self.get_characteristic(char_uuid)
+        if char is None or char.value is None:
+            return False
+        data = bytes(char.value)
+        for central in self.centrals:
+            if central.address in addresses:
+                central.push(char.uuid, data)
+        return True
+
+
+class SimFtmsCentral:
+    """A phone app: subscribes to everything and writes the Control Point."""
+
+    count = 0
+
+    def __init__(self, profile=None, address=None):
+        if address is None:
+            address = f"{SIM_CENTRAL_PREFIX}{0x10 + SimFtmsCentral.count:02X}"
+            SimFtmsCentral.count += 1
+        self.address = address
+        self.path = f"/sim/dev_{address.replace(':', '_')}"
+        self.profile = profile or radio.profile
+        self.server = None
+        self.up = None   # Central -> bridge
+        self.down = None # Bridge -> central
+        self.callbacks = []  # fn(uuid, data, arrival perf_counter)
+        self.received = 0
+
+    async def connect(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not any(s.advertising for s in radio.servers):
+            if time.monotonic() > deadline:
+                raise SimLinkError("No FTMS server advertising")
+            await asyncio.sleep(0.01)
+        self.server = next(s for s in radio.servers if s.advertising)
+        self.up = self.profile.copy()
+        self.down = self.profile.copy()
+        await asyncio.sleep(radio.connect_time)
+        self.server.centrals.append(self)
+        if self.server.on_connect:
+            self.server.on_connect(self.path, self.address)
+
+    async def disconnect(self):
+        if self.server and self in self.server.centrals:
+            self.server.centrals.remove(self)
+            if self.server.on_disconnect:
+                self.server.on_disconnect(self.path, self.address)
+
+    def push(self, uuid, data):
+        self.down.deliver(self._arrive, uuid, data)
+
+    def _arrive(self, uuid, data):
+        self.received += 1
+        now = time.perf_counter()
+        for callback in list(self.callbacks):
+            callback(uuid, data, now)
+
+    async def write(self, uuid, data):
+        await self.up.hop()
+        char = self.server.get_characteristic(uuid)
+        if self.server.write_request_func:
+            self.server.write_request_func(char, bytearray(data), central=self.address)
+
+
+class BleTransport:
+    """The BLE classes the bridge builds on, passed in rather than imported.
+
+    client/scanner are used like bleak's BleakClient/BleakScanner, server
+    like bless's BlessServer.
+    """
+
+    def __init__(self, client, scanner, server):
+        self.client = client
+        self.scanner = scanner
+        self.server = server
+
+
+def sim_transport(sim_radio=None):
+    """BleTransport over the in-memory radio (sim_radio becomes the current one)."""
+    global radio
+    if sim_radio is not None:
+        radio = sim_radio
+    return BleTransport(SimBleakClient, SimBleakScanner, SimBlessServer)
@@ -0,0 +1,26 @@
+"""
+Shared fixtures. Tests import the bridge straight from src/, like the
+benchmarks, and never touch a radio.
+"""
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    """main with fresh per-run globals (state, scheduler, centrals, cache)."""
+    main = pytest.importorskip("main") # Needs bless/bleak
+    from centrals import CentralRegistry
+
+    monkeypatch.setattr(main, "state", main.BridgeState())
+    monkeypatch.setattr(main, "scheduler", main.ControlScheduler())
+    monkeypatch.setattr(main, "centrals", CentralRegistry())
+    monkeypatch.setattr(main.device_cache, "path", None)
+    monkeypatch.setattr(main.device_cache, "entries", {})
+    return main
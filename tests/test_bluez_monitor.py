@@ -0,0 +1,82 @@
+"""BluezMonitor driven by FakeBluezBus: connection and adapter signals."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("dbus_next")
+
+from bluez_monitor import ADAPTER_IFACE, BluezMonitor, FakeBluezBus
+
+PHONE = "11:22:33:44:55:66"
+TREADMILL = "AA:BB:CC:DD:EE:FF"
+
+
+def monitor_for(bus, **kwargs):
+    monitor = BluezMonitor(bus, **kwargs)
+    events = []
+    monitor.on_connect = lambda path, address: events.append(("connect", address))
+    monitor.on_disconnect = lambda path, address: events.append(("disconnect", address))
+    monitor.on_pairable = lambda path, pairable: events.append(("pairable", pairable))
+    asyncio.run(monitor.start())
+    del events[:] # Initial snapshot
+    return monitor, events
+
+
+def test_snapshot_picks_up_centrals_already_connected():
+    bus = FakeBluezBus()
+    path = bus.add_device(PHONE, "Pixel", connected=True)
+    monitor, _events = monitor_for(bus)
+    assert monitor.centrals == {path}
+    assert monitor.devices[path]["Address"] == PHONE
+    assert monitor.adapters[bus.adapter_path] == {"Pairable": False, "Discoverable": True}
+
+
+def test_connect_disconnect_and_removal():
+    bus = FakeBluezBus()
+    monitor, events = monitor_for(bus)
+    path = bus.add_device(PHONE, "Pixel")
+    assert events == []
+    bus.set_connected(path, True)
+    bus.set_connected(path, True) # Repeated signal, no second callback
+    assert events == [("connect", PHONE)]
+    bus._emit("/", "org.freedesktop.DBus.ObjectManager", "InterfacesRemoved", [path, ["org.bluez.Device1"]])
+    assert events == [("connect", PHONE), ("disconnect", PHONE)]
+    assert path not in monitor.devices and not monitor.centrals
+
+
+def test_ignored_devices_and_other_adapters_never_count():
+    bus = FakeBluezBus()
+    monitor, events = monitor_for(bus, adapter="hci0",
+                                  is_ignored=lambda address, name: address == TREADMILL)
+    bus.set_connected(bus.add_device(TREADMILL, "I_TL"), True)
+    other = "/org/bluez/hci1/dev_11_22_33_44_55_77"
+    bus.set_property(other, "org.bluez.Device1", "Address", "11:22:33:44:55:77")
+    bus.set_connected(other, True)
+    assert events == [] and not monitor.centrals
+
+
+def test_pairable_changes_and_actions():
+    bus = FakeBluezBus()
+    monitor, events = monitor_for(bus)
+    path = bus.add_device(PHONE, connected=True)
+
+    asyncio.run(monitor.set_adapter_property(bus.adapter_path, "Pairable", True))
+    assert monitor.adapters[bus.adapter_path]["Pairable"] is True
+    asyncio.run(monitor.disconnect(path))
+    assert events == [("connect", PHONE), ("pairable", True), ("disconnect", PHONE)]
+    assert bus.objects[bus.adapter_path][ADAPTER_IFACE]["Pairable"] is True
+
+
+def test_bridge_tracks_centrals_from_signals(bridge):
+    bus = FakeBluezBus()
+    monitor = BluezMonitor(bus)
+    asyncio.run(monitor.start())
+    bridge.state.connected_to_ifit = True
+    bridge.watch_ftms_connections(monitor)
+
+    path = bus.add_device(PHONE, connected=True)
+    assert bridge.state.ftms_client_connected
+    assert PHONE in bridge.centrals.centrals
+    bus.set_connected(path, False)
+    assert not bridge.state.ftms_client_connected
+    assert PHONE not in bridge.centrals.centrals
@@ -0,0 +1,150 @@
+"""CentralRegistry, and Control Point ownership through the sim transport."""
+import asyncio
+import struct
+
+import pytest
+
+from centrals import CentralRegistry, parse_rates
+
+PHONE = "00:00:5E:00:54:10"
+WATCH = "00:00:5E:00:54:11"
+
+
+def test_rates_are_negotiated_down_to_the_cap():
+    registry = CentralRegistry(4.0, parse_rates([f"{PHONE.lower()}=2", f"{WATCH}=10"]))
+    assert registry.connect(PHONE).rate == 2.0
+    assert registry.connect(WATCH).rate == 4.0
+    assert registry.connect("00:00:5E:00:54:12").rate == 4.0
+    assert registry.fastest_rate() == 4.0
+
+
+def test_due_paces_each_central_and_sends_every_change():
+    registry = CentralRegistry(4.0, {PHONE: 1.0})
+    registry.connect(PHONE)
+    registry.connect(WATCH)
+    first, second = b"a", b"b"
+    assert {c.address for c in registry.due(first, 100.0, 5.0)} == {PHONE, WATCH}
+    assert {c.address for c in registry.due(second, 100.3, 5.0)} == {WATCH}
+    assert registry.next_due(second, 100.3) == pytest.approx(0.7) # The phone still owes it
+    assert {c.address for c in registry.due(second, 101.0, 5.0)} == {PHONE}
+    assert registry.next_due(second, 101.0) is None
+    assert registry.due(second, 102.0, 5.0) == [] # Unchanged, heartbeat not due
+
+
+def test_only_the_requesting_central_sets_targets():
+    registry = CentralRegistry()
+    registry.sync([PHONE, WATCH])
+    assert registry.request_control(PHONE.lower())
+    assert registry.may_control(PHONE)
+    assert not registry.request_control(WATCH)
+    assert not registry.may_control(WATCH)
+    registry.release(PHONE)
+    assert registry.request_control(WATCH)
+
+
+def test_control_is_released_on_disconnect():
+    registry = CentralRegistry()
+    registry.sync([PHONE, WATCH])
+    registry.request_control(PHONE)
+    registry.sync([WATCH])
+    assert registry.owner is None and len(registry) == 1
+    assert registry.request_control(WATCH)
+
+
+def test_unknown_origin_is_never_arbitrated():
+    registry = CentralRegistry()
+    registry.sync([PHONE])
+    registry.request_control(PHONE)
+    assert registry.request_control(None)
+    assert registry.may_control(None)
+    assert registry.owner == PHONE
+
+
+def test_write_origin_is_consumed_once():
+    registry = CentralRegistry()
+    registry.writer = PHONE
+    assert registry.take_writer() == PHONE
+    assert registry.take_writer() is None
+
+
+# --- Through the bridge's Control Point handler ---
+@pytest.fixture
+def sim(bridge, monkeypatch):
+    transport = pytest.importorskip("transport")
+    radio = transport.SimRadio(transport.LinkProfile(latency=0.0))
+    radio.connect_time = 0.0
+    monkeypatch.setattr(transport, "radio", radio)
+    monkeypatch.setattr(bridge, "ftms_server", None)
+    return transport
+
+
+def control_session(bridge, transport, writes):
+    """writes: (central index, payload); returns every Control Point response."""
+    async def run():
+        server = transport.SimBlessServer("test")
+        await server.add_new_characteristic(bridge.FTMS_SERVICE_UUID, bridge.FTMS_CONTROL_POINT_UUID,
+                                            None, None, None)
+        server.write_request_func = bridge.handle_control_point
+        server.on_connect = lambda path, address: bridge.centrals.connect(address, path)
+        server.on_disconnect = lambda path, address: bridge.centrals.disconnect(address)
+        await server.start()
+        phones = [transport.SimFtmsCentral(address=a) for a in (PHONE, WATCH)]
+        for phone in phones:
+            await phone.connect()
+        for index, payload in writes:
+            if payload is None:
+                await phones[index].disconnect()
+            else:
+                await phones[index].write(bridge.FTMS_CONTROL_POINT_UUID, payload)
+        queue = bridge.state.response_queue
+        return [bytes(queue.get_nowait()) for _ in range(queue.qsize())]
+    return asyncio.run(run())
+
+
+SPEED_10 = struct.pack("<BH", 0x02, 1000)
+
+
+def test_second_central_is_refused_control(bridge, sim):
+    responses = control_session(bridge, sim, [(0, b"\x00"), (1, b"\x00"), (1, SPEED_10), (0, SPEED_10)])
+    assert responses == [b"\x80\x00\x01", b"\x80\x00\x05", b"\x80\x02\x05", b"\x80\x02\x01"]
+    assert bridge.scheduler.pop_command()[:2] == (bridge.TYPE_SPEED, 1000)
+    assert not bridge.scheduler.has_commands()
+
+
+def test_control_passes_on_after_reset_or_disconnect(bridge, sim):
+    responses = control_session(bridge, sim, [
+        (0, b"\x00"), (0, b"\x01"), (1, b"\x00"), # Reset gives it up
+        (1, None), (0, b"\x00"), (0, SPEED_10),   # So does leaving
+    ])
+    assert responses == [b"\x80\x00\x01", b"\x80\x01\x01", b"\x80\x00\x01", b"\x80\x00\x01", b"\x80\x02\x01"]
+
+
+def test_anonymous_writes_are_accepted_even_with_an_owner(bridge, sim):
+    control_session(bridge, sim, [(0, b"\x00")])
+    bridge.handle_control_point(sim.SimServerCharacteristic(bridge.FTMS_CONTROL_POINT_UUID, None, None),
+                                bytearray(SPEED_10))
+    assert bytes(bridge.state.response_queue.get_nowait()) == b"\x80\x02\x01"
+
+
+def test_bluez_hook_credits_only_the_write_it_belongs_to(bridge, monkeypatch):
+    characteristic = pytest.importorskip("bless.backends.bluezdbus.dbus.characteristic")
+    from dbus_next import Variant
+    cls = characteristic.BlueZGattCharacteristic
+    monkeypatch.setattr(cls, "WriteValue", cls.WriteValue) # Undone after the test
+    assert bridge.patch_write_origin()
+    assert bridge.patch_write_origin() # Idempotent
+
+    seen = []
+
+    class App:
+        def Write(self, char, value):
+            seen.append(bridge.centrals.writer)
+
+    class Service:
+        app = App()
+
+    char = type("Char", (), {"_service": Service()})()
+    cls.WriteValue(char, b"\x00", {"device": Variant("o", f"/org/bluez/hci0/dev_{WATCH.replace(':', '_')}")})
+    cls.WriteValue(char, b"\x00", {})
+    assert seen == [WATCH, None]
+    assert bridge.centrals.writer is None
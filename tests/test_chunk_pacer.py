@@ -0,0 +1,67 @@
+"""ChunkPacer: what gets learned, persisted and forgotten per treadmill."""
+import pytest
+
+from device_cache import DeviceCache
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+
+class Char:
+    properties = ["write", "write-without-response"]
+
+
+@pytest.fixture
+def cache():
+    return DeviceCache(path=None)
+
+
+def clean_sends(pacer, main):
+    for _ in range(main.PACING_STABLE_SENDS):
+        pacer.on_success()
+
+
+def test_acknowledged_clean_sends_persist_the_gap(bridge, cache):
+    pacer = bridge.ChunkPacer(ADDRESS, cache)
+    clean_sends(pacer, bridge)
+    assert cache.get(ADDRESS)["chunk_gap"] == bridge.PACING_START_GAP
+    assert pacer.gap < bridge.PACING_START_GAP # Probing faster
+
+
+def test_unacknowledged_sends_never_persist_a_gap(bridge, cache):
+    pacer = bridge.ChunkPacer(ADDRESS, cache)
+    pacer.configure(Char)
+    assert not pacer.response
+    clean_sends(pacer, bridge)
+    assert "chunk_gap" not in cache.get(ADDRESS)
+
+
+def test_stall_goes_back_to_acknowledged_writes_and_forgets_the_gap(bridge, cache):
+    cache.update(ADDRESS, chunk_gap=0.01)
+    pacer = bridge.ChunkPacer(ADDRESS, cache)
+    pacer.configure(Char)
+    pacer.on_stall()
+    assert pacer.response
+    assert pacer.stable_gap is None
+    assert pacer.gap == 0.02
+    assert cache.get(ADDRESS) == {"chunk_gap": None, "needs_response": True}
+
+    # Next connect: acknowledged writes, default start gap
+    again = bridge.ChunkPacer(ADDRESS, cache)
+    again.configure(Char)
+    assert again.response
+    assert again.gap == bridge.PACING_START_GAP
+
+
+def test_repeated_stalls_back_off_to_the_cap(bridge, cache):
+    pacer = bridge.ChunkPacer(ADDRESS, cache)
+    for _ in range(10):
+        pacer.on_stall()
+    assert pacer.gap == bridge.PACING_MAX_GAP
+
+
+def test_failure_at_the_saved_gap_forgets_it(bridge, cache):
+    cache.update(ADDRESS, chunk_gap=0.015)
+    pacer = bridge.ChunkPacer(ADDRESS, cache)
+    pacer.on_failure()
+    assert pacer.stable_gap is None
+    assert cache.get(ADDRESS)["chunk_gap"] is None
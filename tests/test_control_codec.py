@@ -0,0 +1,127 @@
+"""
+ControlCodec against the encoder main.py used before treadmill profiles.
+
+The legacy encoder is the oracle: every precomputed packet, and every
+value built on the spot outside the table, has to match it byte for byte,
+including the values it rejects (negative incline into its unsigned field).
+"""
+import struct
+
+import pytest
+
+from ifit_protocol import frame_message
+from profiles import CONTROL_TYPES, profiles
+
+TYPE_SPEED = CONTROL_TYPES["speed"]
+TYPE_INCLINE = CONTROL_TYPES["incline"]
+
+
+def legacy_create_control_command(type_id, value):
+    """create_control_command as main.py had it before profiles."""
+    if type_id == TYPE_SPEED:
+         base = bytearray.fromhex("020402090409020101")
+         base.extend(struct.pack('<H', int(value)))
+         base.extend(bytes([0x00]))
+         cs = sum(base[4:]) & 0xFF
+         base.append(cs)
+         return base
+    elif type_id == TYPE_INCLINE:
+         base = bytearray.fromhex("020402090409020102")
+         base.extend(struct.pack('<H', int(value))) # Scale 100
+         base.extend(bytes([0x00]))
+         cs = sum(base[4:]) & 0xFF
+         base.append(cs)
+         return base
+    return b''
+
+
+def legacy_packets(type_id, value):
+    return frame_message(legacy_create_control_command(type_id, value))
+
+
+@pytest.fixture(scope="module")
+def codec():
+    return profiles.default.codec
+
+
+@pytest.mark.parametrize("type_id", [TYPE_SPEED, TYPE_INCLINE])
+def test_table_matches_legacy(codec, type_id):
+    table = codec.tables[type_id]
+    assert table
+    for value, packets in table.items():
+        assert packets == legacy_packets(type_id, value), value
+
+
+@pytest.mark.parametrize("type_id, values", [
+    (TYPE_SPEED, range(2001, 2300)),        # Above the profile's 20 km/h
+    (TYPE_SPEED, [0xFFFF]),
+    (TYPE_INCLINE, range(1501, 1800)),      # Above 15 %
+])
+def test_values_outside_table_match_legacy(codec, type_id, values):
+    for value in values:
+        assert value not in codec.tables[type_id]
+        assert codec.packets(type_id, value) == legacy_packets(type_id, value), value
+
+
+@pytest.mark.parametrize("type_id", [TYPE_SPEED, TYPE_INCLINE])
+def test_off_step_values_match_legacy(codec, type_id):
+    # FTMS sends 0.1 steps; anything finer is built on the spot
+    for value in range(1, 1000, 7):
+        assert codec.packets(type_id, value) == legacy_packets(type_id, value), value
+
+
+def test_table_holds_ftms_steps_only(codec):
+    assert list(codec.tables[TYPE_SPEED]) == list(range(0, 2001, 10))
+    assert list(codec.tables[TYPE_INCLINE]) == list(range(0, 1501, 10))
+
+
+def test_advertised_range_is_encodable():
+    profile = profiles.default
+    assert struct.unpack("<hhh", profile.incline_range) == (0, 150, 1)
+    assert struct.unpack("<HHH", profile.speed_range) == (100, 2000, 10)
+    assert profile.accepts(TYPE_INCLINE, 0) and profile.accepts(TYPE_INCLINE, 1500)
+    assert not profile.accepts(TYPE_INCLINE, -10)
+    assert not profile.accepts(TYPE_SPEED, 2010)
+    assert profile.accepts(TYPE_SPEED, 0) # Stop
+
+
+@pytest.mark.parametrize("value", [-1, -150, -600, 0x10000])
+def test_unrepresentable_values_raise_like_legacy(codec, value):
+    with pytest.raises(struct.error):
+        legacy_packets(TYPE_INCLINE, value)
+    with pytest.raises(struct.error):
+        codec.packets(TYPE_INCLINE, value)
+
+
+def test_unknown_type_has_no_packets(codec):
+    assert legacy_create_control_command(0x7F, 100) == b''
+    assert codec.packets(0x7F, 100) == ()
+
+
+def test_packets_are_framed_chunks(codec):
+    header, *chunks = codec.packets(TYPE_SPEED, 1000)
+    assert header[:4] == bytes([0xFE, 0x02, 13, 1 + len(chunks)])
+    assert chunks[-1][0] == 0xFF
+    assert b"".join(chunk[2:] for chunk in chunks) == legacy_create_control_command(TYPE_SPEED, 1000)
+
+
+def test_bridge_drops_unrepresentable_values(bridge):
+    main = bridge
+    assert main.control_packets(TYPE_INCLINE, -150) == ()
+    assert main.control_packets(TYPE_INCLINE, 150) == legacy_packets(TYPE_INCLINE, 150)
+
+
+@pytest.mark.parametrize("write, result, queued", [
+    (b"\x03" + struct.pack("<h", -10), 0x03, False), # -1.0 %: not advertised, not encodable
+    (b"\x03" + struct.pack("<h", 20), 0x01, True),
+    (b"\x02" + struct.pack("<H", 2500), 0x03, False), # 25 km/h
+])
+def test_bridge_rejects_targets_outside_the_advertised_range(bridge, write, result, queued):
+    main = bridge
+
+    class ControlPoint:
+        uuid = main.FTMS_CONTROL_POINT_UUID.lower()
+
+    main.handle_control_point(ControlPoint, bytearray(write))
+    assert main.state.response_queue.get_nowait() == bytearray([0x80, write[0], result])
+    assert main.scheduler.has_commands() == queued
@@ -0,0 +1,56 @@
+"""ControlScheduler: latest-wins slots and the poll cadence."""
+import asyncio
+
+import pytest
+
+
+def test_latest_write_wins_and_keeps_the_first_arrival(bridge):
+    scheduler = bridge.scheduler
+    scheduler.submit(bridge.TYPE_INCLINE, 100)
+    first = scheduler.slots[bridge.TYPE_INCLINE][1]
+    for value in (200, 300, 400):
+        scheduler.submit(bridge.TYPE_INCLINE, value)
+    assert scheduler.submitted == 4
+    assert scheduler.coalesced == 3
+    assert scheduler.pop_command() == (bridge.TYPE_INCLINE, 400, first)
+    assert not scheduler.has_commands()
+
+
+def test_types_keep_separate_slots_oldest_first(bridge):
+    scheduler = bridge.scheduler
+    scheduler.submit(bridge.TYPE_INCLINE, 100)
+    scheduler.submit(bridge.TYPE_SPEED, 500)
+    scheduler.submit(bridge.TYPE_INCLINE, 150)
+    assert scheduler.coalesced == 1
+    assert scheduler.pop_command()[:2] == (bridge.TYPE_INCLINE, 150)
+    assert scheduler.pop_command()[:2] == (bridge.TYPE_SPEED, 500)
+
+
+def test_poll_cadence_follows_telemetry(bridge):
+    scheduler, state = bridge.scheduler, bridge.state
+    now = 1000.0
+    scheduler.last_poll_time = now
+    state.last_notify_time = now # Fresh
+    assert scheduler.poll_delay(now) == pytest.approx(bridge.POLL_INTERVAL)
+    state.standby = True
+    assert scheduler.poll_delay(now) == pytest.approx(bridge.STANDBY_POLL_INTERVAL)
+    state.last_notify_time = 0.0 # Stale
+    assert scheduler.poll_delay(now) == pytest.approx(bridge.POLL_INTERVAL_STALE)
+    assert scheduler.poll_delay(now + 3600) == 0.0
+
+
+def test_submit_wakes_a_waiting_loop(bridge):
+    scheduler = bridge.scheduler
+    scheduler.mark_polled()
+    bridge.state.last_notify_time = scheduler.last_poll_time
+    bridge.state.standby = True # Long keepalive delay
+
+    async def run():
+        waiter = asyncio.create_task(scheduler.wait())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        scheduler.submit(bridge.TYPE_SPEED, 800)
+        await asyncio.wait_for(waiter, 1.0)
+
+    asyncio.run(run())
+    assert scheduler.has_commands()
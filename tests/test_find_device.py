@@ -0,0 +1,85 @@
+"""find_ifit_device: cached address first, one time budget for scanning."""
+import asyncio
+import time
+
+import pytest
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+
+class Device:
+    def __init__(self, name, address=ADDRESS):
+        self.name = name
+        self.address = address
+
+
+class Adv:
+    def __init__(self, local_name, rssi=-60):
+        self.local_name = local_name
+        self.rssi = rssi
+
+
+class Scanner:
+    """Times out like bleak: a filtered scan that matches nothing runs its full timeout."""
+
+    def __init__(self, devices=(), filter_stops_after=None):
+        self.devices = list(devices)
+        self.filter_stops_after = filter_stops_after # Backend ending the scan early
+        self.calls = []
+
+    async def find_device_by_filter(self, match, timeout, **kwargs):
+        self.calls.append(("filter", timeout))
+        for device in self.devices:
+            if match(device, Adv(device.name)):
+                return device
+        await asyncio.sleep(timeout if self.filter_stops_after is None else self.filter_stops_after)
+        return None
+
+    async def discover(self, timeout=5.0, return_adv=False, **kwargs):
+        self.calls.append(("discover", timeout))
+        await asyncio.sleep(timeout)
+        return {d.address: (d, Adv(d.name)) for d in self.devices}
+
+
+@pytest.fixture
+def find(bridge, monkeypatch):
+    monkeypatch.setattr(bridge, "SCAN_TIMEOUT", 0.3)
+    monkeypatch.setattr(bridge, "DISCOVER_MIN_S", 0.1)
+
+    def find(scanner, use_cache=True):
+        start = time.monotonic()
+        result = asyncio.run(bridge.find_ifit_device(use_cache=use_cache, scanner=scanner))
+        return result, time.monotonic() - start
+    return find
+
+
+def test_cached_address_skips_scanning(bridge, find):
+    bridge.device_cache.update(ADDRESS, name=bridge.IFIT_DEVICE_NAME)
+    scanner = Scanner()
+    (device, _rssi, source), _elapsed = find(scanner)
+    assert (device, source) == (ADDRESS, "cache")
+    assert scanner.calls == []
+
+
+def test_filtered_scan_returns_the_treadmill(bridge, find):
+    scanner = Scanner([Device("Phone", "11:22:33:44:55:66"), Device(bridge.IFIT_DEVICE_NAME)])
+    (device, rssi, source), _elapsed = find(scanner, use_cache=False)
+    assert (device.address, rssi, source) == (ADDRESS, -60, "filter")
+    assert [kind for kind, _ in scanner.calls] == ["filter"]
+
+
+def test_treadmill_off_costs_one_budget(bridge, find):
+    scanner = Scanner([Device("Phone", "11:22:33:44:55:66")])
+    (device, _rssi, source), elapsed = find(scanner, use_cache=False)
+    assert (device, source) == (None, None)
+    assert [kind for kind, _ in scanner.calls] == ["filter"] # No discover() after a full scan
+    assert elapsed < 0.3 + 0.1
+
+
+def test_discovery_gets_what_an_early_stop_left(bridge, find):
+    scanner = Scanner([Device("Phone", "11:22:33:44:55:66")], filter_stops_after=0.05)
+    (device, _rssi, _source), elapsed = find(scanner, use_cache=False)
+    assert device is None
+    kind, timeout = scanner.calls[-1]
+    assert kind == "discover" and timeout <= 0.25
+    assert elapsed < 0.3 + 0.1
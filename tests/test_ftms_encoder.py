@@ -0,0 +1,45 @@
+"""TreadmillDataEncoder: FTMS Treadmill Data flags, layout and caching."""
+import struct
+
+import pytest
+
+
+def test_default_flags_and_layout(bridge):
+    encoder = bridge.TreadmillDataEncoder()
+    payload = encoder.encode(12.34, 70000.9, 3.56, 250, 61)
+    assert payload[:2] == b"\x8c\x04" # Flags 0x048C, little endian
+    assert len(payload) == 2 + 2 + 3 + 4 + 5 + 2
+    # Speed 0.01 km/h, distance uint24 m, incline + ramp angle, energy, elapsed
+    assert struct.unpack("<HH", payload[:4]) == (0x048C, 1234)
+    assert int.from_bytes(payload[4:7], "little") == 70000
+    assert struct.unpack("<hh", payload[7:11]) == (35, 0)
+    assert struct.unpack("<HHB", payload[11:16]) == (250, 0xFFFF, 0xFF)
+    assert struct.unpack("<H", payload[16:]) == (61,)
+
+
+@pytest.mark.parametrize("fields, flags", [
+    ((), 0x0000),
+    (("incline",), 0x0008),
+    (("elapsed", "distance"), 0x0404),
+])
+def test_flags_follow_the_fields(bridge, fields, flags):
+    encoder = bridge.TreadmillDataEncoder(fields)
+    payload = encoder.encode(5.0, 100, -2.0, 10, 5)
+    assert struct.unpack_from("<HH", payload) == (flags, 500)
+    assert len(payload) == encoder.struct.size
+
+
+def test_negative_incline_and_saturating_counters(bridge):
+    payload = bridge.TreadmillDataEncoder(("incline", "energy", "elapsed")).encode(0, 0, -3.0, 70000, 70000)
+    assert struct.unpack("<HHhhHHBH", payload)[2:] == (-30, 0, 65535, 0xFFFF, 0xFF, 65535)
+
+
+def test_unchanged_quantized_values_reuse_the_payload(bridge):
+    encoder = bridge.TreadmillDataEncoder()
+    first = encoder.encode(10.0, 500.2, 1.0, 20, 30)
+    assert encoder.encode(10.0, 500.7, 1.0, 20, 30) is first # Same metre
+    assert encoder.cache_hits == 1
+    changed = encoder.encode(10.0, 501.0, 1.0, 20, 30)
+    assert changed != first
+    assert first[4:7] == (500).to_bytes(3, "little") # Earlier payload untouched
+    assert encoder.encoded == 2
@@ -0,0 +1,99 @@
+"""CommandExecutor: timeouts, sharing and rate limiting, on real child processes."""
+import asyncio
+import sys
+
+from hci_exec import CommandExecutor
+
+PY = sys.executable
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_captures_output_and_exit_status():
+    hci = CommandExecutor()
+    result = run(hci.run(PY, "-c", "import sys; print('hci0'); sys.exit(3)"))
+    assert (result.returncode, result.stdout.strip(), result.ok) == (3, "hci0", False)
+
+
+def test_timeout_kills_the_child():
+    hci = CommandExecutor()
+    result = run(hci.run(PY, "-c", "import time; time.sleep(30)", timeout=0.3))
+    assert result.timed_out and result.returncode is None
+    assert hci.timeouts == 1
+
+
+def test_missing_binary_is_a_failed_result():
+    result = run(CommandExecutor().run("/nonexistent/hciconfig"))
+    assert not result.ok and result.stderr
+
+
+def test_shared_queries_fork_once():
+    hci = CommandExecutor()
+    argv = (PY, "-c", "import time; time.sleep(0.2); print('con')")
+
+    async def burst():
+        return await asyncio.gather(*(hci.run(*argv, shared=True) for _ in range(5)))
+
+    results = run(burst())
+    assert hci.runs == 1 and hci.deduped == 4
+    assert all(r is results[0] for r in results)
+
+
+def test_shared_repeats_reuse_the_last_result_within_min_interval():
+    hci = CommandExecutor(min_interval=60)
+    argv = (PY, "-c", "print('show')")
+
+    async def twice():
+        return await hci.run(*argv, shared=True), await hci.run(*argv, shared=True)
+
+    first, second = run(twice())
+    assert first is second
+    assert (hci.runs, hci.rate_limited) == (1, 1)
+    assert run(hci.run(*argv, shared=True, min_interval=0)) is not first
+
+
+def test_state_changing_commands_always_run():
+    hci = CommandExecutor(min_interval=60)
+    argv = (PY, "-c", "pass")
+
+    async def twice():
+        await asyncio.gather(hci.run(*argv), hci.run(*argv))
+
+    run(twice())
+    assert hci.runs == 2 and hci.deduped == 0
+
+
+def test_one_waiter_cancelling_leaves_the_shared_call_running():
+    hci = CommandExecutor()
+    argv = (PY, "-c", "import time; time.sleep(0.3); print('done')")
+
+    async def scenario():
+        first = asyncio.create_task(hci.run(*argv, shared=True))
+        second = asyncio.create_task(hci.run(*argv, shared=True))
+        await asyncio.sleep(0.1)
+        first.cancel()
+        result = await second
+        return first.cancelled(), result
+
+    cancelled, result = run(scenario())
+    assert cancelled and result.stdout.strip() == "done"
+    assert not hci.inflight and not hci.waiters
+
+
+def test_last_waiter_cancelling_kills_the_child():
+    hci = CommandExecutor()
+    argv = (PY, "-c", "import time; time.sleep(30)")
+
+    async def scenario():
+        task = asyncio.create_task(hci.run(*argv, shared=True))
+        await asyncio.sleep(0.2)
+        inner = hci.inflight[argv]
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.gather(inner, return_exceptions=True)
+        return inner.cancelled()
+
+    assert run(scenario())
+    assert not hci.inflight
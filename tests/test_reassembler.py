@@ -0,0 +1,86 @@
+"""PacketReassembler: chunk framing edge cases."""
+import pytest
+
+from ifit_protocol import MAX_MESSAGE_LEN, PacketReassembler, build_status_message, frame_message
+
+STATUS = build_status_message(800, 200, 30, 1000, 250)
+
+
+def feed(reassembler, packets):
+    return [bytes(msg) for msg in map(reassembler.process_chunk, packets) if msg is not None]
+
+
+@pytest.mark.parametrize("length", [1, 17, 18, 19, 36, 51, MAX_MESSAGE_LEN])
+def test_round_trips_framed_messages(length):
+    msg = bytes(range(length))
+    reassembler = PacketReassembler()
+    assert feed(reassembler, frame_message(msg)) == [msg]
+    assert (reassembler.messages, reassembler.dropped, reassembler.short) == (1, 0, 0)
+
+
+def test_back_to_back_messages_reuse_the_buffer():
+    reassembler = PacketReassembler()
+    other = bytes.fromhex("01040210041080020A4C474D4E40464F51414277")
+    assert feed(reassembler, frame_message(STATUS) + frame_message(other) + frame_message(STATUS)) == [
+        STATUS, other, STATUS]
+
+
+def test_returned_view_is_overwritten_by_the_next_message():
+    reassembler = PacketReassembler()
+    *_, view = map(reassembler.process_chunk, frame_message(STATUS))
+    kept = bytes(view)
+    feed(reassembler, frame_message(bytes(len(STATUS))))
+    assert kept == STATUS
+    assert bytes(view) != STATUS
+
+
+def test_new_header_abandons_a_partial_message():
+    reassembler = PacketReassembler()
+    packets = frame_message(STATUS)
+    assert feed(reassembler, packets[:2] + packets) == [STATUS]
+    assert reassembler.dropped == 1
+
+
+def test_data_without_header_is_dropped():
+    reassembler = PacketReassembler()
+    assert feed(reassembler, frame_message(STATUS)[1:]) == []
+    assert reassembler.dropped == len(frame_message(STATUS)) - 1
+
+
+def test_sequence_gap_resets():
+    reassembler = PacketReassembler()
+    packets = frame_message(STATUS)
+    assert feed(reassembler, (packets[0], packets[2], packets[3])) == []
+    assert reassembler.out_of_order == 1
+    assert feed(reassembler, packets) == [STATUS] # Recovers on the next header
+
+
+def test_truncated_chunk_resets():
+    reassembler = PacketReassembler()
+    packets = list(frame_message(STATUS))
+    packets[1] = packets[1][:10] # Claims 18 bytes, carries 8
+    assert feed(reassembler, packets) == []
+    assert reassembler.short == 1
+
+
+def test_message_shorter_than_the_header_promised():
+    reassembler = PacketReassembler()
+    packets = list(frame_message(STATUS))
+    packets[0] = bytes([0xFE, 0x02, len(STATUS) + 5]) + packets[0][3:]
+    assert feed(reassembler, packets) == []
+    assert reassembler.short == 1
+
+
+def test_data_past_the_promised_length_is_dropped():
+    reassembler = PacketReassembler()
+    packets = list(frame_message(STATUS))
+    packets[0] = bytes([0xFE, 0x02, 20]) + packets[0][3:]
+    assert feed(reassembler, packets) == []
+    assert reassembler.dropped == 2 # The overflowing chunk, then the orphaned last one
+
+
+@pytest.mark.parametrize("packet", [b"", b"\xfe", b"\xfe\x02\x10"])
+def test_runt_packets_are_counted_short(packet):
+    reassembler = PacketReassembler()
+    assert reassembler.process_chunk(packet) is None
+    assert reassembler.short == 1
@@ -0,0 +1,91 @@
+"""SessionRecorder and the recording readers."""
+import os
+
+import pytest
+
+from recorder import FTMS_CONTROL, IFIT_RX, SessionRecorder, read_frames, read_session, session_files
+
+
+def frames(path):
+    return [(kind, data) for _, kind, data in read_session(path)]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "session.ifr")
+    recorder = SessionRecorder(path)
+    recorder.record(IFIT_RX, b"\xfe\x02\x33\x04")
+    recorder.record(FTMS_CONTROL, bytearray(b"\x02\xe8\x03"))
+    recorder.record(IFIT_RX, memoryview(bytes(300))) # Clipped to 255
+    recorder.close()
+    assert frames(path) == [(IFIT_RX, b"\xfe\x02\x33\x04"), (FTMS_CONTROL, b"\x02\xe8\x03"),
+                            (IFIT_RX, bytes(255))]
+    assert recorder.frames == 3
+
+
+def test_nothing_hits_disk_until_flush(tmp_path):
+    path = str(tmp_path / "session.ifr")
+    recorder = SessionRecorder(path)
+    recorder.record(IFIT_RX, b"\x00\x01")
+    assert frames(path) == []
+    recorder.flush()
+    assert frames(path) == [(IFIT_RX, b"\x00\x01")]
+    recorder.close()
+
+
+def test_truncated_last_frame_ends_the_stream(tmp_path):
+    path = str(tmp_path / "session.ifr")
+    recorder = SessionRecorder(path)
+    recorder.record(IFIT_RX, b"\x01\x02\x03")
+    recorder.record(IFIT_RX, b"\x04\x05\x06")
+    recorder.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+    assert frames(path) == [(IFIT_RX, b"\x01\x02\x03")]
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "session.ifr"
+    path.write_bytes(b"NOPE" + bytes(8))
+    with pytest.raises(ValueError):
+        list(read_frames(str(path)))
+
+
+def test_previous_recording_is_kept(tmp_path):
+    path = str(tmp_path / "session.ifr")
+    first = SessionRecorder(path)
+    first.record(IFIT_RX, b"first")
+    first.close()
+    second = SessionRecorder(path)
+    second.record(IFIT_RX, b"second")
+    second.close()
+    assert session_files(path) == [path + ".1", path]
+    assert frames(path) == [(IFIT_RX, b"first"), (IFIT_RX, b"second")]
+
+
+def test_rotation_keeps_the_newest_backups_in_order(tmp_path):
+    path = str(tmp_path / "session.ifr")
+    recorder = SessionRecorder(path, max_bytes=64, backups=2)
+    for i in range(6):
+        recorder.record(IFIT_RX, bytes([i]) * 60)
+        recorder.flush()
+    recorder.close()
+    assert recorder.rotations == 6
+    assert session_files(path) == [path + ".2", path + ".1", path]
+    kept = [data[0] for _, data in frames(path)]
+    assert kept == [4, 5]
+
+
+def test_failed_rotation_stops_recording(tmp_path, monkeypatch):
+    path = str(tmp_path / "session.ifr")
+    recorder = SessionRecorder(path, max_bytes=16)
+
+    def fail(*args):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(os, "replace", fail)
+    recorder.record(IFIT_RX, bytes(32))
+    recorder.flush()
+    assert recorder.file is None
+    recorder.record(IFIT_RX, b"dropped") # No-op from now on
+    recorder.close()
+    assert recorder.frames == 1
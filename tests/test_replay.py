@@ -0,0 +1,85 @@
+"""Replay pacing, the treadmill emulator, and a recording through the bridge."""
+import asyncio
+import struct
+import time
+
+from ifit_protocol import PacketReassembler, StatusDecoder, build_status_message, frame_message
+from recorder import FILE_HEADER, FRAME_HEADER, FTMS_CONTROL, IFIT_RX, MAGIC
+from replay import CAPABILITIES_REPLY, TreadmillEmulator, replay_frames
+
+
+def write_recording(path, frames):
+    """frames: (ms, kind, data) -- a recording with exact timestamps."""
+    with open(path, "wb") as f:
+        f.write(FILE_HEADER.pack(MAGIC, 1_700_000_000.0))
+        for ms, kind, data in frames:
+            f.write(FRAME_HEADER.pack(len(data), kind, ms) + data)
+    return str(path)
+
+
+def collect(path, speed):
+    async def run():
+        start = time.perf_counter()
+        frames = [frame async for frame in replay_frames(path, speed)]
+        return frames, time.perf_counter() - start
+    return asyncio.run(run())
+
+
+def test_full_speed_keeps_order(tmp_path):
+    path = write_recording(tmp_path / "s.ifr", [(i * 200, IFIT_RX, bytes([i])) for i in range(200)])
+    frames, elapsed = collect(path, 0)
+    assert frames == [(IFIT_RX, bytes([i])) for i in range(200)]
+    assert elapsed < 1.0
+
+
+def test_paced_by_recorded_timestamps(tmp_path):
+    path = write_recording(tmp_path / "s.ifr", [(0, IFIT_RX, b"a"), (1000, IFIT_RX, b"b")])
+    frames, elapsed = collect(path, 10)
+    assert [data for _, data in frames] == [b"a", b"b"]
+    assert 0.09 <= elapsed < 1.0
+
+
+def emulator_session(*messages):
+    async def run():
+        emulator = TreadmillEmulator(reply_latency=0.0)
+        reassembler, replies = PacketReassembler(), []
+
+        def on_notify(_char, data):
+            msg = reassembler.process_chunk(data)
+            if msg is not None:
+                replies.append(bytes(msg))
+
+        await emulator.start_notify(None, on_notify)
+        for msg in messages:
+            for packet in frame_message(msg):
+                await emulator.write_gatt_char(None, packet)
+            await asyncio.sleep(0.01)
+        return emulator, replies
+    return asyncio.run(run())
+
+
+def test_emulator_answers_like_the_console():
+    capabilities = bytes.fromhex("0204020404048088")
+    speed = bytes.fromhex("020402090409020101E80300FC") # Speed 10.00 km/h
+    poll = bytes.fromhex("02040210041002000A13943300104010008018F2") # profiles/default.json
+    emulator, replies = emulator_session(capabilities, speed, poll)
+    assert replies[0] == CAPABILITIES_REPLY
+    assert replies[1][6] == 0x02 # Echo of the control command
+    record = StatusDecoder().decode(replies[2])
+    assert record.speed_raw == 1000
+    assert (emulator.controls, emulator.polls) == (1, 1)
+
+
+def test_recording_drives_the_bridge(bridge, tmp_path):
+    status = build_status_message(speed_raw=850, incline_raw=150, elapsed_s=42)
+    set_speed = struct.pack("<BH", 0x02, 1200) # FTMS Set Target Speed 12.00 km/h
+    frames = [(i * 200, IFIT_RX, bytes(chunk)) for i, chunk in enumerate(frame_message(status))]
+    frames.append((1000, FTMS_CONTROL, set_speed))
+    path = write_recording(tmp_path / "s.ifr", frames)
+
+    emulator = TreadmillEmulator(reply_latency=0.0, answer_polls=False)
+    pipeline = asyncio.run(bridge.replay_client_loop(path, speed=0, emulator=emulator))
+    assert pipeline.status_decoder.decoded == 1
+    assert bridge.state.speed_kph == 8.5
+    assert emulator.speed_raw == 1200
+    assert emulator.controls == 1
@@ -0,0 +1,103 @@
+"""StatusDecoder: checksum rule, rejection and field scaling.
+
+The repo holds no captured 0x2F status frames yet. The checksum rule is
+checked against the real console replies in doc/packet_inventory.md, and
+any recording dropped into tests/data/*.ifr (python main.py --record) is
+replayed through the reassembler and must decode without a single
+checksum error.
+"""
+import glob
+import logging
+import os
+import random
+
+import pytest
+
+from ifit_protocol import (STATUS_MSG_LEN, PacketReassembler, StatusDecoder,
+                           build_status_message, checksum)
+from recorder import IFIT_RX, read_session
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+RECORDINGS = sorted(glob.glob(os.path.join(DATA_DIR, "*.ifr")))
+
+# Captured from the console (doc/packet_inventory.md)
+CAPTURED = (
+    "01040210041080020A4C474D4E40464F51414277", # 0x80 capabilities reply
+    "0204020404048088",                         # 0x80 capabilities request
+)
+
+
+@pytest.mark.parametrize("frame", CAPTURED)
+def test_checksum_matches_captured_frames(frame):
+    msg = bytes.fromhex(frame)
+    assert checksum(msg) == msg[-1]
+
+
+def test_checksum_is_the_byte_sum():
+    rng = random.Random(0x2F)
+    for length in (5, 6, 51, 255):
+        for _ in range(200):
+            msg = bytes(rng.randrange(256) for _ in range(length))
+            assert checksum(msg) == sum(msg[4:-1]) & 0xFF
+
+
+def test_decodes_and_scales_fields():
+    decoder = StatusDecoder()
+    record = decoder.decode(build_status_message(1234, 350, 61, 2 ** 20, 1500))
+    assert (record.speed_raw, record.incline_raw, record.elapsed_s) == (1234, 350, 61)
+    assert (record.speed_kph, record.incline_pct, record.distance_m) == (12.34, 3.5, 15.0)
+    assert decoder.decoded == 1
+
+
+def test_trailing_bytes_are_ignored():
+    # Reassembler views can be longer than the message
+    assert StatusDecoder().decode(build_status_message(500) + b"\x00\x00").speed_raw == 500
+
+
+@pytest.mark.parametrize("payload", [
+    build_status_message(500)[:-1],                               # Short
+    b"\x01\x04\x02\x10" + bytes(STATUS_MSG_LEN - 4),              # Other message
+])
+def test_ignores_other_messages(payload):
+    decoder = StatusDecoder()
+    assert decoder.decode(payload) is None
+    assert decoder.checksum_errors == 0
+
+
+def test_rejects_bad_checksum_and_warns_once(caplog):
+    decoder = StatusDecoder()
+    bad = bytearray(build_status_message(500, 100))
+    bad[10] ^= 0x01
+    with caplog.at_level(logging.WARNING, logger="IFIT-FTMS"):
+        assert decoder.decode(bad) is None
+        assert decoder.decode(bad) is None
+    assert decoder.checksum_errors == 2
+    assert decoder.decoded == 0
+    warnings = [r for r in caplog.records if "checksum" in r.getMessage()]
+    assert len(warnings) == 1
+    assert bytes(bad).hex() in warnings[0].getMessage()
+
+
+def test_decodes_reassembled_chunks():
+    msg = build_status_message(800, 200, 30, 1000, 250)
+    chunks = [bytes([0xFE, 0x02, len(msg), 4])]
+    for seq, offset in enumerate(range(0, len(msg), 18)):
+        part = msg[offset:offset + 18]
+        chunks.append(bytes([0xFF if offset + 18 >= len(msg) else seq, len(part)]) + part)
+    reassembler = PacketReassembler()
+    for chunk in chunks:
+        message = reassembler.process_chunk(chunk)
+    assert StatusDecoder().decode(message).speed_raw == 800
+
+
+@pytest.mark.skipif(not RECORDINGS, reason="no recordings in tests/data")
+@pytest.mark.parametrize("path", RECORDINGS, ids=os.path.basename)
+def test_recorded_status_frames_decode(path):
+    reassembler, decoder = PacketReassembler(), StatusDecoder()
+    for _, kind, data in read_session(path):
+        if kind == IFIT_RX:
+            message = reassembler.process_chunk(data)
+            if message is not None:
+                decoder.decode(message)
+    assert decoder.checksum_errors == 0
+    assert decoder.decoded > 0
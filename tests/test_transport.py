@@ -0,0 +1,67 @@
+"""The bridge over the in-memory BLE transport, with no radio."""
+import asyncio
+
+import pytest
+
+transport = pytest.importorskip("transport")
+
+
+async def wait_for(predicate, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_client_loop_runs_on_a_passed_in_transport(bridge, monkeypatch):
+    monkeypatch.setattr(bridge.ui, "update_status", lambda state: None)
+    monkeypatch.setattr(transport, "radio", transport.radio) # sim_transport() replaces it
+    radio = transport.SimRadio(transport.LinkProfile(latency=0.001))
+    radio.connect_time = 0.0
+    peripheral = radio.add_peripheral(transport.SimIfitPeripheral(bridge.IFIT_DEVICE_NAME))
+    peripheral.speed_raw = 650
+    ble = transport.sim_transport(radio)
+
+    async def run():
+        server = ble.server("test")
+        loop = asyncio.create_task(bridge.ifit_client_loop(server, ble))
+        try:
+            await wait_for(lambda: bridge.state.speed_kph == 6.5)
+            bridge.scheduler.submit(bridge.TYPE_INCLINE, 250)
+            await wait_for(lambda: peripheral.incline_raw == 250)
+        finally:
+            loop.cancel()
+            await asyncio.gather(loop, return_exceptions=True)
+
+    asyncio.run(run())
+    assert bridge.state.ifit_address == transport.SIM_ADDRESS
+    # Nothing in main was rebound to the sim
+    assert bridge.BLUETOOTH.client.__module__.startswith("bleak")
+    assert bridge.BLUETOOTH.server is bridge.BlessServer
+
+
+def test_reconnect_reuses_the_resolved_service_tree(bridge, monkeypatch):
+    monkeypatch.setattr(bridge.ui, "update_status", lambda state: None)
+    monkeypatch.setattr(transport, "radio", transport.radio)
+    radio = transport.SimRadio(transport.LinkProfile(latency=0.001))
+    radio.connect_time = 0.0
+    radio.discovery_time = 0.3
+    peripheral = radio.add_peripheral(transport.SimIfitPeripheral(bridge.IFIT_DEVICE_NAME))
+    ble = transport.sim_transport(radio)
+    first = bridge.state.first_telemetry
+
+    async def run():
+        loop = asyncio.create_task(bridge.ifit_client_loop(ble.server("test"), ble))
+        try:
+            await wait_for(lambda: first["discovered"].count == 1)
+            await wait_for(lambda: bridge.device_cache.get(transport.SIM_ADDRESS).get("gatt"))
+            peripheral.drop()
+            await wait_for(lambda: first["cached"].count == 1)
+        finally:
+            loop.cancel()
+            await asyncio.gather(loop, return_exceptions=True)
+
+    asyncio.run(run())
+    discovered, cached = first["discovered"].samples[0], first["cached"].samples[0]
+    assert discovered >= radio.discovery_time
+    assert cached < discovered - 0.2